@@ -0,0 +1,120 @@
+import asyncio
+import json
+from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage
+from src.utils.config import Config
+from src.services.llm_registry import get_llm, llm_registry
+from src.agents.prompts import COMBINED
+from src.utils.deadline import Deadline
+from src.utils.tracing import span, traced, state_attributes
+
+
+class CombinedScore(BaseModel):
+    """Structured output of the single-call scoring prompt"""
+    tradfi_score: int = Field(description="0-1000, higher = more creditworthy")
+    onchain_score: int = Field(description="0-100, higher = better on-chain reputation")
+    combined_risk_score: int = Field(description="0-100, lower = less risky")
+    max_borrow_amount_tokens: int = Field(description="1000-50000 tokens")
+    apr_basis_points: int = Field(description="300-600 basis points")
+    reasoning: str = Field(description="Brief explanation")
+
+
+class CombinedScoringAgent:
+    """
+    Scores TradFi, on-chain and risk in one structured-output LLM call
+    instead of the three sequential agent calls. Uses the agents' clamps
+    and falls back to their rule-based scoring when the call fails.
+    """
+
+    def __init__(self, tradfi_agent, onchain_agent, risk_agent, llm_cache=None):
+        self.tradfi = tradfi_agent
+        self.onchain = onchain_agent
+        self.risk = risk_agent
+        self.llm_cache = llm_cache
+        # include_raw keeps the AIMessage so its token usage can be recorded
+        self.llm = get_llm(temperature=0.1).with_structured_output(CombinedScore, include_raw=True)
+
+    @traced('agent.combined.score', state_attributes)
+    async def score(self, state, deadline=None):
+        """
+        Score a state already filled by TradFiAgent.fetch_data(score=False)
+        and OnChainAgent.analyze(score=False), then finish with RiskAgent.
+        deadline: optional Deadline; the single LLM call may use all of it.
+        """
+        print("Combined Agent: Scoring in a single LLM call...")
+
+        result, source = await self._score_with_llm(state, deadline)
+        state['tradfi_source'] = state['onchain_source'] = state['risk_source'] = source
+
+        if result:
+            state['tradfi_score'] = max(0, min(1000, int(result['tradfi_score'])))
+            state['onchain_score'] = max(0, min(100, int(result['onchain_score'])))
+            terms = self.risk.clamp_terms(result)
+        else:
+            state['tradfi_score'] = self.tradfi._calculate_score(state)
+            state['onchain_score'] = self.onchain._calculate_score(state)
+            terms = None
+
+        print(f"  TradFi Score: {state['tradfi_score']}/1000")
+        print(f"  OnChain Score: {state['onchain_score']}/100")
+
+        # Jitter, approved amount, validity and USD values as usual
+        return await self.risk.calculate_risk(state, assessment=terms, use_llm=False)
+
+    async def _score_with_llm(self, state, deadline=None):
+        """
+        One structured-output call for all five numbers. Returns (result,
+        source): result is None on failure, source as for the agents.
+        """
+        try:
+            requested_amount = state.get('requested_amount', 0)
+            wallet_data = self.onchain.wallet_data(state)
+            borrower = {
+                "experian": state['experian_data'],
+                "plaid": state['plaid_data'],
+                "payment_history": state['payment_data'],
+                "wallet": wallet_data,
+                "requested_amount_tokens": requested_amount / 10**18 if requested_amount > 0 else "not specified",
+            }
+
+            messages = [
+                COMBINED.system_message(),
+                HumanMessage(content=f"Borrower Data: {json.dumps(borrower)}"),
+            ]
+
+            cache_key = None
+            result = None
+            if self.llm_cache:
+                cache_key = self.llm_cache.key(
+                    Config.BEDROCK_MODEL_ID, COMBINED.version,
+                    dict(borrower, wallet=self.onchain.cache_input(wallet_data)),
+                )
+                result = await self.llm_cache.get(cache_key)
+
+            from_cache = result is not None
+            if not from_cache:
+                with span('llm.invoke', model=Config.BEDROCK_MODEL_ID, prompt=COMBINED.version, label='Combined'):
+                    response = await asyncio.wait_for(
+                        llm_registry.breaker.call(self.llm.ainvoke, messages),
+                        Deadline.timeout_for(deadline),
+                    )
+                    llm_registry.record_usage(COMBINED.version, response['raw'].usage_metadata)
+                if response['parsed'] is None:
+                    raise ValueError(f"Unparseable structured output: {response['parsing_error']}")
+                result = response['parsed'].model_dump()
+
+            # Malformed output raises here and takes the fallback path
+            self.risk.clamp_terms(result)
+
+            if cache_key and not from_cache:
+                self.llm_cache.put(cache_key, result)
+
+            print(f"  [Combined] Claude reasoning: {result.get('reasoning', 'N/A')}")
+            return result, 'cache' if from_cache else 'llm'
+
+        except asyncio.TimeoutError:
+            print("  [Combined] LLM missed its latency budget, using rule-based scoring")
+            return None, 'deadline'
+        except Exception as e:
+            print(f"  [Combined] LLM call failed ({e}), falling back to rule-based scoring")
+            return None, 'rules'
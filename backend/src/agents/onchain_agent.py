@@ -1,34 +1,44 @@
+import asyncio
 import json
-from langchain_aws import ChatBedrockConverse
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
 from src.utils.config import Config
+from src.services.llm_registry import get_llm
+from src.agents.prompts import ONCHAIN, ONCHAIN_BATCH
+from src.utils.deadline import Deadline
+from src.utils.llm_json import complete_json
+from src.utils.llm_batch import complete_batch
+from src.utils.tracing import traced, set_attributes, state_attributes
 
 
 class OnChainAgent:
     """Analyzes on-chain blockchain behavior and scores with Claude"""
 
-    def __init__(self, blockchain_service):
+    def __init__(self, blockchain_service, llm_cache=None, distiller=None):
         self.blockchain = blockchain_service
-        self.llm = ChatBedrockConverse(
-            model=Config.BEDROCK_MODEL_ID,
-            region_name=Config.AWS_REGION,
-            temperature=0.1,
-        )
+        self.llm_cache = llm_cache
+        self.distiller = distiller
+        self.llm = get_llm(temperature=0.1)
 
-    def analyze(self, state):
-        """Analyze wallet's on-chain reputation"""
+    @traced('agent.onchain.analyze', state_attributes)
+    async def analyze(self, state, score=True, deadline=None):
+        """
+        Analyze wallet's on-chain reputation.
+        score=False only gathers the metrics (combined scoring mode).
+        deadline: optional Deadline; the LLM gets half of what is left.
+        """
         user_address = state['user_address']
 
         print("OnChain Agent: Analyzing wallet...")
 
-        # Get on-chain data
-        data = self.blockchain.get_onchain_data(user_address)
+        # Get on-chain data and FTSO prices for USD valuation together
+        data, ftso_prices = await asyncio.gather(
+            self.blockchain.get_onchain_data(user_address),
+            self.blockchain.get_ftso_prices(),
+        )
 
         state['balance_eth'] = data['balance_eth']
         state['transaction_count'] = data['transaction_count']
 
-        # Fetch FTSO prices for USD valuation
-        ftso_prices = self.blockchain.get_ftso_prices()
         if ftso_prices:
             state['flr_price_usd'] = ftso_prices['flr_usd']
             state['xrp_price_usd'] = ftso_prices['xrp_usd']
@@ -42,16 +52,36 @@ class OnChainAgent:
         state['wallet_age_days'] = self._estimate_wallet_age(user_address, data['transaction_count'])
         state['is_active_user'] = data['transaction_count'] > 0
 
-        # Calculate on-chain score via LLM or fallback
-        state['onchain_score'] = self._score_with_llm(state)
-
         print(f"  Balance: {state['balance_eth']:.4f} FLR")
         print(f"  Transactions: {state['transaction_count']}")
         print(f"  Est. Wallet Age: {state['wallet_age_days']} days")
-        print(f"  OnChain Score: {state['onchain_score']}/100")
 
+        if score:
+            await self.score(state, deadline)
+
+        return state
+
+    @traced('agent.onchain.score', state_attributes)
+    async def score(self, state, deadline=None):
+        """Score wallet metrics already in state via distilled model, LLM or fallback"""
+        state['onchain_score'], state['onchain_source'] = await self._score(state, deadline)
+        set_attributes(score=state['onchain_score'], source=state['onchain_source'])
+        print(f"  OnChain Score: {state['onchain_score']}/100 ({state['onchain_source']})")
         return state
 
+    async def batch_features(self, addresses, flr_usd=None):
+        """
+        Columnar on-chain features for the batch scoring kernels.
+        balance_usd is NaN for everyone when no FLR/USD price is given.
+        """
+        data = await self.blockchain.get_onchain_batch(addresses)
+        balance_eth = [d['balance_eth'] for d in data]
+        return {
+            'tx_count': [d['transaction_count'] for d in data],
+            'balance_eth': balance_eth,
+            'balance_usd': [b * flr_usd if flr_usd is not None else float('nan') for b in balance_eth],
+        }
+
     def _estimate_wallet_age(self, address, tx_count):
         """Estimate wallet age based on transaction count"""
         if tx_count == 0:
@@ -59,43 +89,147 @@ class OnChainAgent:
         estimated_days = min(tx_count * 7, 730)  # Cap at 2 years
         return estimated_days
 
-    def _score_with_llm(self, state):
-        """Use Claude to score on-chain data, with rule-based fallback"""
+    @staticmethod
+    def wallet_data(state):
+        """Wallet metrics as presented to the LLM"""
+        return {
+            "balance_flr": round(state['balance_eth'], 4),
+            "balance_usd": round(state['balance_usd'], 2) if 'balance_usd' in state else None,
+            "transaction_count": state['transaction_count'],
+            "wallet_age_days": state['wallet_age_days'],
+            "is_active_user": state['is_active_user'],
+        }
+
+    @staticmethod
+    def cache_input(wallet_data):
+        """
+        Balances drift every block with the FTSO price; key the LLM cache on
+        coarser values so an otherwise unchanged wallet still hits
+        """
+        return dict(
+            wallet_data,
+            balance_flr=round(wallet_data['balance_flr'], 1),
+            balance_usd=round(wallet_data['balance_usd']) if wallet_data['balance_usd'] is not None else None,
+        )
+
+    async def _score(self, state, deadline=None):
+        """Distilled model when SCORER=model, else LLM (logged for distillation)"""
+        if not self.distiller:
+            return await self._score_with_llm(state, deadline)
+
+        features = self.distiller.features('onchain', state)
+        if Config.SCORER == 'model':
+            predicted = self.distiller.predict('onchain', features)
+            if predicted:
+                return predicted['onchain_score'], 'model'
+
+        score, source = await self._score_with_llm(state, deadline)
+        if source == 'llm':
+            self.distiller.observe('onchain', features, {'onchain_score': score})
+        return score, source
+
+    @traced('agent.onchain.score_batch', lambda self, states: {'wallets': len(states)})
+    async def score_batch(self, states):
+        """
+        Background path: score many states already filled by
+        analyze(score=False), LLM_BATCH_SIZE wallets per request. Sets
+        onchain_score / onchain_source on each; wallets missing from the
+        batch answer are retried on their own.
+        """
+        pending = {}
+        for state in states:
+            if self.distiller and Config.SCORER == 'model':
+                predicted = self.distiller.predict('onchain', self.distiller.features('onchain', state))
+                if predicted:
+                    state['onchain_score'], state['onchain_source'] = predicted['onchain_score'], 'model'
+                    continue
+            cached = (await self.llm_cache.get(self._cache_key(state))) if self.llm_cache else None
+            if cached is not None:
+                state['onchain_score'] = max(0, min(100, int(cached['onchain_score'])))
+                state['onchain_source'] = 'cache'
+                continue
+            pending[state['user_address']] = state
+
+        results = {}
+        if pending:
+            results = await complete_batch(
+                self.llm, ONCHAIN_BATCH,
+                {address: self.wallet_data(state) for address, state in pending.items()},
+                ('onchain_score',), 'OnChain',
+            )
+
+        retry = []
+        for address, state in pending.items():
+            result = results.get(address)
+            if result is None:
+                retry.append(state)
+                continue
+            score = max(0, min(100, result['onchain_score']))
+            state['onchain_score'], state['onchain_source'] = score, 'llm_batch'
+            if self.llm_cache:
+                self.llm_cache.put(self._cache_key(state), result)
+            if self.distiller:
+                self.distiller.observe('onchain', self.distiller.features('onchain', state), {'onchain_score': score})
+
+        if retry:
+            print(f"  [OnChain] Retrying {len(retry)} wallet(s) singly")
+            scored = await asyncio.gather(*(self._score(state) for state in retry))
+            for state, (score, source) in zip(retry, scored):
+                state['onchain_score'], state['onchain_source'] = score, source
+
+        return states
+
+    def _cache_key(self, state):
+        return self.llm_cache.key(
+            Config.BEDROCK_MODEL_ID, ONCHAIN.version, self.cache_input(self.wallet_data(state))
+        )
+
+    async def _score_with_llm(self, state, deadline=None):
+        """
+        Use Claude to score on-chain data, with rule-based fallback.
+        Returns (score, source) with source 'llm', 'cache', 'rules' or 'deadline'.
+        """
+        # Computed up front so a missed deadline costs nothing extra
+        fallback = self._calculate_score(state)
         try:
-            wallet_data = {
-                "balance_flr": round(state['balance_eth'], 4),
-                "balance_usd": round(state['balance_usd'], 2) if 'balance_usd' in state else None,
-                "transaction_count": state['transaction_count'],
-                "wallet_age_days": state['wallet_age_days'],
-                "is_active_user": state['is_active_user'],
-            }
+            wallet_data = self.wallet_data(state)
 
             messages = [
-                SystemMessage(content=(
-                    "You are a blockchain reputation analyst. Analyze this wallet data and return "
-                    "a JSON object with exactly two fields:\n"
-                    '- "onchain_score": an integer from 0 to 100 (higher = better reputation)\n'
-                    '- "reasoning": a brief explanation of your score\n\n'
-                    "Consider wallet balance (in FLR and USD if available), transaction count (activity level), "
-                    "wallet age, and whether the user is active. If balance_usd is provided, use it to "
-                    "gauge real economic value. A wallet with high balance, many transactions, "
-                    "and long history should score near 100. An empty or new wallet should score low.\n\n"
-                    "Return ONLY valid JSON, no markdown formatting."
-                )),
+                ONCHAIN.system_message(),
                 HumanMessage(content=f"Wallet Data: {json.dumps(wallet_data)}"),
             ]
 
-            response = self.llm.invoke(messages)
-            result = json.loads(response.content.strip().removeprefix("```json").removesuffix("```").strip())
+            cache_key = None
+            if self.llm_cache:
+                cache_key = self._cache_key(state)
+                result = await self.llm_cache.get(cache_key)
+            else:
+                result = None
+
+            from_cache = result is not None
+            if not from_cache:
+                # Numbers come first in the output, so a streamed completion
+                # can be used before the reasoning has been generated
+                result = await asyncio.wait_for(
+                    complete_json(self.llm, messages, ('onchain_score',), 'OnChain', prompt=ONCHAIN.version),
+                    Deadline.timeout_for(deadline, 0.5),
+                )
             score = int(result['onchain_score'])
             score = max(0, min(100, score))
 
-            print(f"  [OnChain] Claude reasoning: {result.get('reasoning', 'N/A')}")
-            return score
+            if cache_key and not from_cache:
+                self.llm_cache.put(cache_key, result)
+
+            if 'reasoning' in result:
+                print(f"  [OnChain] Claude reasoning: {result['reasoning']}")
+            return score, 'cache' if from_cache else 'llm'
 
+        except asyncio.TimeoutError:
+            print("  [OnChain] LLM missed its latency budget, using rule-based score")
+            return fallback, 'deadline'
         except Exception as e:
             print(f"  [OnChain] LLM call failed ({e}), falling back to rule-based scoring")
-            return self._calculate_score(state)
+            return fallback, 'rules'
 
     def _calculate_score(self, state):
         """Fallback: Calculate 0-100 reputation score with enhanced factors"""
@@ -1,30 +1,42 @@
+import asyncio
 import json
 import time
-from langchain_aws import ChatBedrockConverse
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
 from src.utils.config import Config
+from src.services.llm_registry import get_llm
+from src.agents.prompts import RISK, RISK_BATCH
+from src.utils.deadline import Deadline
+from src.utils.llm_json import complete_json
+from src.utils.llm_batch import complete_batch
+from src.utils.tracing import traced, set_attributes, state_attributes
 
 
 class RiskAgent:
     """Combines TradFi + OnChain into risk assessment using Claude"""
 
-    def __init__(self, blockchain_service=None):
+    def __init__(self, blockchain_service=None, llm_cache=None, distiller=None):
         self.blockchain_service = blockchain_service
-        self.llm = ChatBedrockConverse(
-            model=Config.BEDROCK_MODEL_ID,
-            region_name=Config.AWS_REGION,
-            temperature=0.1,
-        )
-
-    def calculate_risk(self, state):
-        """Calculate final risk metrics via Claude or fallback"""
+        self.llm_cache = llm_cache
+        self.distiller = distiller
+        self.llm = get_llm(temperature=0.1)
+
+    @traced('agent.risk.calculate_risk', state_attributes)
+    async def calculate_risk(self, state, assessment=None, use_llm=True, deadline=None):
+        """
+        Calculate final risk metrics via Claude or fallback.
+        assessment: risk terms already produced elsewhere (combined scoring
+        mode), already clamped; use_llm=False goes straight to the rules.
+        deadline: optional Deadline; the LLM may use all that is left.
+        """
 
         print("Risk Agent: Calculating risk scores...")
 
         requested_amount = state.get('requested_amount', 0)
 
         # Try LLM-based risk assessment
-        llm_result = self._assess_with_llm(state)
+        llm_result = assessment
+        if llm_result is None and use_llm:
+            llm_result, state['risk_source'] = await self._assess(state, deadline)
 
         if llm_result:
             state['combined_risk_score'] = llm_result['combined_risk_score']
@@ -35,7 +47,7 @@ class RiskAgent:
             self._calculate_rule_based(state)
 
         # Apply Flare RNG jitter to APR (±50 basis points)
-        self._apply_rng_jitter(state)
+        await self._apply_rng_jitter(state)
 
         # Approved amount logic
         if requested_amount > 0:
@@ -52,6 +64,11 @@ class RiskAgent:
             state['loan_value_usd'] = (state['approved_amount'] / 10**18) * xrp_price
             state['max_borrow_usd'] = (state['max_borrow_amount'] / 10**18) * xrp_price
 
+        set_attributes(
+            risk_score=state['combined_risk_score'],
+            apr=state['apr'],
+            source=state.get('risk_source'),
+        )
         print(f"  Risk Score: {state['combined_risk_score']}/100")
         print(f"  Max Borrow: {state['max_borrow_amount'] / 10**18:.0f} tokens")
 
@@ -68,13 +85,33 @@ class RiskAgent:
 
         return state
 
-    def _apply_rng_jitter(self, state):
-        """Apply ±50 bps jitter to APR using Flare Secure RNG"""
+    @traced('agent.risk.prefetch_rng', state_attributes)
+    async def prefetch_rng(self, state):
+        """
+        Read Flare Secure RNG ahead of calculate_risk (it doesn't depend on
+        the scores). Stores state['rng'], None if the call failed.
+        """
+        if not self.blockchain_service:
+            return state
+        try:
+            state['rng'] = await self.blockchain_service.get_secure_random()
+        except Exception as e:
+            print(f"  [Risk] Flare RNG call failed ({e}), skipping jitter")
+            state['rng'] = None
+        return state
+
+    async def _apply_rng_jitter(self, state):
+        """Apply ±50 bps jitter to APR using Flare Secure RNG (prefetched if in state)"""
         if not self.blockchain_service:
             return
 
         try:
-            rng = self.blockchain_service.get_secure_random()
+            if 'rng' in state:
+                rng = state['rng']
+                if rng is None:
+                    return
+            else:
+                rng = await self.blockchain_service.get_secure_random()
             random_number = rng['random_number']
             jitter = (random_number % 101) - 50  # range: -50 to +50 bps
             base_apr = state['apr']
@@ -85,60 +122,172 @@ class RiskAgent:
         except Exception as e:
             print(f"  [Risk] Flare RNG call failed ({e}), skipping jitter")
 
-    def _assess_with_llm(self, state):
-        """Use Claude for risk assessment, returns dict or None on failure"""
+    async def _assess(self, state, deadline=None):
+        """Distilled model when SCORER=model, else LLM (logged for distillation)"""
+        if not self.distiller:
+            return await self._assess_with_llm(state, deadline)
+
+        features = self.distiller.features('risk', state)
+        if Config.SCORER == 'model':
+            predicted = self.distiller.predict('risk', features)
+            if predicted:
+                return self.clamp_terms(predicted), 'model'
+
+        terms, source = await self._assess_with_llm(state, deadline)
+        if source == 'llm':
+            self.distiller.observe('risk', features, self._distill_targets(terms))
+        return terms, source
+
+    @traced('agent.risk.assess_batch', lambda self, states: {'wallets': len(states)})
+    async def assess_batch(self, states):
+        """
+        Background path: risk terms for many scored states,
+        LLM_BATCH_SIZE borrowers per request. Returns [(terms, source)]
+        in state order (terms None = use the rules) and sets risk_source;
+        finish each state with calculate_risk(state, assessment=terms,
+        use_llm=False).
+        """
+        assessed = {}
+        pending = {}
+        for state in states:
+            address = state['user_address']
+            if self.distiller and Config.SCORER == 'model':
+                predicted = self.distiller.predict('risk', self.distiller.features('risk', state))
+                if predicted:
+                    assessed[address] = (self.clamp_terms(predicted), 'model')
+                    continue
+            cached = (await self.llm_cache.get(self._cache_key(state))) if self.llm_cache else None
+            if cached is not None:
+                assessed[address] = (self.clamp_terms(cached), 'cache')
+                continue
+            pending[address] = state
+
+        results = {}
+        if pending:
+            results = await complete_batch(
+                self.llm, RISK_BATCH,
+                {
+                    address: {
+                        'tradfi_score': state['tradfi_score'],
+                        'onchain_score': state['onchain_score'],
+                        'requested_amount_tokens': self._llm_input(state)['requested_amount_tokens'],
+                    }
+                    for address, state in pending.items()
+                },
+                ('combined_risk_score', 'max_borrow_amount_tokens', 'apr_basis_points'), 'Risk',
+            )
+
+        retry = []
+        for address, state in pending.items():
+            result = results.get(address)
+            if result is None:
+                retry.append(state)
+                continue
+            terms = self.clamp_terms(result)
+            assessed[address] = (terms, 'llm_batch')
+            if self.llm_cache:
+                self.llm_cache.put(self._cache_key(state), result)
+            if self.distiller:
+                self.distiller.observe('risk', self.distiller.features('risk', state), self._distill_targets(terms))
+
+        if retry:
+            print(f"  [Risk] Retrying {len(retry)} borrower(s) singly")
+            retried = await asyncio.gather(*(self._assess(state) for state in retry))
+            for state, outcome in zip(retry, retried):
+                assessed[state['user_address']] = outcome
+
+        outcomes = []
+        for state in states:
+            terms, state['risk_source'] = assessed[state['user_address']]
+            outcomes.append((terms, state['risk_source']))
+        return outcomes
+
+    @staticmethod
+    def _llm_input(state):
+        """Borrower data as presented to the LLM"""
+        requested_amount = state.get('requested_amount', 0)
+        return {
+            "tradfi_score": state['tradfi_score'],
+            "tradfi_score_range": "0-1000 (higher = more creditworthy)",
+            "onchain_score": state['onchain_score'],
+            "onchain_score_range": "0-100 (higher = better reputation)",
+            "requested_amount_tokens": requested_amount / 10**18 if requested_amount > 0 else "not specified",
+        }
+
+    def _cache_key(self, state):
+        return self.llm_cache.key(Config.BEDROCK_MODEL_ID, RISK.version, self._llm_input(state))
+
+    @staticmethod
+    def _distill_targets(terms):
+        """Clamped terms in the distiller's target units"""
+        return {
+            'combined_risk_score': terms['combined_risk_score'],
+            'max_borrow_amount_tokens': terms['max_borrow_amount'] // 10**18,
+            'apr_basis_points': terms['apr'],
+        }
+
+    async def _assess_with_llm(self, state, deadline=None):
+        """
+        Use Claude for risk assessment. Returns (terms, source): terms is
+        None on failure, source is 'llm', 'cache', 'rules' or 'deadline'.
+        """
         try:
-            requested_amount = state.get('requested_amount', 0)
-            input_data = {
-                "tradfi_score": state['tradfi_score'],
-                "tradfi_score_range": "0-1000 (higher = more creditworthy)",
-                "onchain_score": state['onchain_score'],
-                "onchain_score_range": "0-100 (higher = better reputation)",
-                "requested_amount_tokens": requested_amount / 10**18 if requested_amount > 0 else "not specified",
-            }
+            input_data = self._llm_input(state)
 
             messages = [
-                SystemMessage(content=(
-                    "You are a DeFi risk assessor. Given a borrower's TradFi credit score and "
-                    "on-chain reputation score, determine their risk level and loan terms.\n\n"
-                    "Return a JSON object with exactly these fields:\n"
-                    '- "combined_risk_score": integer 0-100 (lower = less risky, better borrower)\n'
-                    '- "max_borrow_amount_tokens": integer, max tokens the user can borrow '
-                    "(range: 1000-50000 based on risk)\n"
-                    '- "apr_basis_points": integer, annual percentage rate in basis points '
-                    "(e.g. 500 = 5%). Range 300-600 based on risk. Low risk ~300, high risk ~600.\n"
-                    '- "reasoning": brief explanation\n\n'
-                    "Risk mapping guide:\n"
-                    "- Excellent (risk 0-20): tradfi > 800, onchain > 70 → max 50000 tokens, APR ~300-350\n"
-                    "- Good (risk 21-40): tradfi 600-800, onchain 50-70 → max 25000 tokens, APR ~350-420\n"
-                    "- Fair (risk 41-60): tradfi 400-600, onchain 30-50 → max 10000 tokens, APR ~420-500\n"
-                    "- Poor (risk 61-80): tradfi 200-400, onchain 15-30 → max 5000 tokens, APR ~500-550\n"
-                    "- High risk (81-100): tradfi < 200, onchain < 15 → max 1000 tokens, APR ~550-600\n\n"
-                    "If a requested amount is specified, factor the utilization ratio into APR "
-                    "(higher utilization = slightly higher APR, up to +200 basis points).\n\n"
-                    "Return ONLY valid JSON, no markdown formatting."
-                )),
+                RISK.system_message(),
                 HumanMessage(content=f"Borrower Data: {json.dumps(input_data)}"),
             ]
 
-            response = self.llm.invoke(messages)
-            result = json.loads(response.content.strip().removeprefix("```json").removesuffix("```").strip())
-
-            combined_risk = max(0, min(100, int(result['combined_risk_score'])))
-            max_borrow_tokens = max(1000, min(50000, int(result['max_borrow_amount_tokens'])))
-            apr = max(300, min(600, int(result['apr_basis_points'])))
-
-            print(f"  [Risk] Claude reasoning: {result.get('reasoning', 'N/A')}")
-
-            return {
-                'combined_risk_score': combined_risk,
-                'max_borrow_amount': max_borrow_tokens * 10**18,
-                'apr': apr,
-            }
-
+            cache_key = None
+            if self.llm_cache:
+                cache_key = self._cache_key(state)
+                result = await self.llm_cache.get(cache_key)
+            else:
+                result = None
+
+            from_cache = result is not None
+            if not from_cache:
+                # Numbers come first in the output, so a streamed completion
+                # can be used before the reasoning has been generated
+                result = await asyncio.wait_for(
+                    complete_json(
+                        self.llm, messages,
+                        ('combined_risk_score', 'max_borrow_amount_tokens', 'apr_basis_points'),
+                        'Risk', prompt=RISK.version,
+                    ),
+                    Deadline.timeout_for(deadline),
+                )
+
+            terms = self.clamp_terms(result)
+
+            if cache_key and not from_cache:
+                self.llm_cache.put(cache_key, result)
+
+            if 'reasoning' in result:
+                print(f"  [Risk] Claude reasoning: {result['reasoning']}")
+
+            return terms, 'cache' if from_cache else 'llm'
+
+        except asyncio.TimeoutError:
+            print("  [Risk] LLM missed its latency budget, using rule-based scoring")
+            return None, 'deadline'
         except Exception as e:
             print(f"  [Risk] LLM call failed ({e}), falling back to rule-based scoring")
-            return None
+            return None, 'rules'
+
+    @staticmethod
+    def clamp_terms(result):
+        """Clamp raw LLM risk output into policy bounds (wei max borrow)"""
+        combined_risk = max(0, min(100, int(result['combined_risk_score'])))
+        max_borrow_tokens = max(1000, min(50000, int(result['max_borrow_amount_tokens'])))
+        apr = max(300, min(600, int(result['apr_basis_points'])))
+
+        return {
+            'combined_risk_score': combined_risk,
+            'max_borrow_amount': max_borrow_tokens * 10**18,
+            'apr': apr,
+        }
 
     def _calculate_rule_based(self, state):
         """Fallback rule-based risk calculation"""
@@ -1,14 +1,34 @@
+import asyncio
+from src.utils.config import Config
+from src.utils.tracing import traced, set_attributes, state_attributes
+
+
 class SubmissionAgent:
     """Submits score to oracle contract"""
-    
-    def __init__(self, blockchain_service):
+
+    def __init__(self, blockchain_service, max_batch=None, batch_window_ms=None):
         self.blockchain = blockchain_service
-    
-    def submit(self, state):
-        """Submit to blockchain"""
-        
+
+        # Micro-batching: gather up to max_batch scores or batch_window_ms,
+        # whichever comes first, then send them as one oracle transaction
+        self.max_batch = max_batch or Config.SUBMISSION_MAX_BATCH
+        self.batch_window = (batch_window_ms or Config.SUBMISSION_BATCH_WINDOW_MS) / 1000
+        self._batch = []
+        self._flush_timer = None
+        # Keeps sender tasks referenced until they finish
+        self._send_tasks = set()
+
+    @traced('agent.submission.submit', state_attributes)
+    async def submit(self, state, batched=False):
+        """
+        Submit to blockchain.
+        batched=True joins the next micro-batch instead of sending a
+        transaction of its own (for background paths where throughput
+        matters more than a few hundred ms of latency).
+        """
+
         print("Submission Agent: Sending to oracle...")
-        
+
         score_data = {
             'tradfi_score': state['tradfi_score'],
             'onchain_score': state['onchain_score'],
@@ -17,13 +37,75 @@ class SubmissionAgent:
             'apr': state['apr'],
             'valid_until': state['valid_until']
         }
-        
-        receipt = self.blockchain.submit_credit_score(
-            state['user_address'],
-            score_data
-        )
-        
+
+        if batched and self.max_batch > 1:
+            receipt = await self._submit_batched(state['user_address'], score_data)
+        else:
+            receipt = await self.blockchain.submit_credit_score(
+                state['user_address'],
+                score_data
+            )
+
         state['tx_hash'] = receipt['transactionHash'].hex()
+        set_attributes(tx_hash=state['tx_hash'], batched=batched)
         state['completed'] = True
-        
-        return state
\ No newline at end of file
+
+        return state
+
+    async def _submit_batched(self, user_address, score_data):
+        """Queue one score for the next batch and wait for that batch's receipt"""
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((user_address, score_data, future))
+
+        if len(self._batch) >= self.max_batch:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                self.batch_window, self._flush
+            )
+
+        return await future
+
+    def _flush(self):
+        """Hand the current batch off to a sender task"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._send_batch(batch))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _send_batch(self, batch):
+        """Send one submitCreditScores transaction and map the receipt back to each caller"""
+        print(f"Submission Agent: Flushing batch of {len(batch)} scores")
+
+        try:
+            receipt = await self.blockchain.submit_credit_scores(
+                [(user_address, score_data) for user_address, score_data, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        tx_hash = receipt['transactionHash'].hex()
+        if receipt['status'] != 1:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(Exception(f"Batch transaction {tx_hash} reverted"))
+            return
+
+        scored = {user.lower() for user in self.blockchain.scored_users_in_receipt(receipt)}
+        for user_address, _, future in batch:
+            if future.done():
+                continue
+            if user_address.lower() not in scored:
+                future.set_exception(Exception(
+                    f"No CreditScoreSubmitted event for {user_address} in {tx_hash}"
+                ))
+            else:
+                future.set_result(receipt)
@@ -1,28 +1,38 @@
+import asyncio
 import json
-from langchain_aws import ChatBedrockConverse
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
 from src.utils.config import Config
+from src.services.llm_registry import get_llm
+from src.agents.prompts import TRADFI, TRADFI_BATCH
+from src.utils.deadline import Deadline
+from src.utils.llm_json import complete_json
+from src.utils.llm_batch import complete_batch
+from src.utils.tracing import traced, set_attributes, state_attributes
 
 
 class TradFiAgent:
     """Fetches traditional finance credit data via Flare FDC and scores with Claude"""
 
-    def __init__(self, fdc_service):
+    def __init__(self, fdc_service, llm_cache=None, distiller=None):
         self.fdc = fdc_service
-        self.llm = ChatBedrockConverse(
-            model=Config.BEDROCK_MODEL_ID,
-            region_name=Config.AWS_REGION,
-            temperature=0.1,
-        )
+        self.llm_cache = llm_cache
+        self.distiller = distiller
+        self.llm = get_llm(temperature=0.1)
 
-    def fetch_data(self, state):
-        """Fetch credit data for a user through FDC-validated external source"""
+    @traced('agent.tradfi.fetch_data', state_attributes)
+    async def fetch_data(self, state, score=True, deadline=None):
+        """
+        Fetch credit data for a user through FDC-validated external source.
+        score=False only gathers the data (combined scoring mode).
+        deadline: optional Deadline; the LLM gets half of what is left.
+        """
         user_address = state['user_address']
 
         print("TradFi Agent: Fetching credit data via Flare FDC...")
 
         # Fetch from external source through FDC attestation
-        data = self.fdc.fetch_credit_data(user_address)
+        # (FDC service is blocking HTTP, so keep it off the event loop)
+        data = await asyncio.to_thread(self.fdc.fetch_credit_data, user_address)
 
         if data and 'experian' in data:
             print(f"  Retrieved externally validated data for {user_address}")
@@ -36,14 +46,51 @@ class TradFiAgent:
         state['plaid_data'] = data['plaid']
         state['payment_data'] = data['payment_history']
 
-        # Calculate TradFi score via LLM or fallback
-        state['tradfi_score'] = self._score_with_llm(state)
-
         print(f"  FICO: {state['experian_data']['fico_score']}")
-        print(f"  TradFi Score: {state['tradfi_score']}/1000")
+
+        if score:
+            await self.score(state, deadline)
 
         return state
 
+    @traced('agent.tradfi.score', state_attributes)
+    async def score(self, state, deadline=None):
+        """Score credit data already in state via distilled model, LLM or fallback"""
+        state['tradfi_score'], state['tradfi_source'] = await self._score(state, deadline)
+        set_attributes(score=state['tradfi_score'], source=state['tradfi_source'])
+        print(f"  TradFi Score: {state['tradfi_score']}/1000 ({state['tradfi_source']})")
+        return state
+
+    async def batch_features(self, addresses):
+        """
+        Columnar credit features for the batch scoring kernels.
+        Reads the configured credit data source directly (FDC's direct
+        fetch, without attestation) - one FDC attestation per wallet is far
+        too slow for re-scoring the whole borrower base. Wallets the source
+        has no answer for get the same generated data as fetch_data().
+        """
+        fetched = await asyncio.gather(
+            *(asyncio.to_thread(self.fdc.fetch_direct, address) for address in addresses)
+        )
+        missing = sum(1 for data in fetched if not data)
+        if missing:
+            print(f"  [TradFi] Credit source had no data for {missing}/{len(addresses)} wallet(s), generating it")
+
+        columns = {
+            'fico': [], 'on_time': [], 'late': [], 'missed': [],
+            'checking': [], 'savings': [], 'utilization_pct': [],
+        }
+        for address, data in zip(addresses, fetched):
+            data = data or self._generate_data(address)
+            columns['fico'].append(data['experian']['fico_score'])
+            columns['utilization_pct'].append(data['experian']['credit_utilization_percent'])
+            columns['on_time'].append(data['payment_history']['on_time_payments_12mo'])
+            columns['late'].append(data['payment_history']['late_payments_12mo'])
+            columns['missed'].append(data['payment_history']['missed_payments_12mo'])
+            columns['checking'].append(data['plaid']['checking_balance'])
+            columns['savings'].append(data['plaid']['savings_balance'])
+        return columns
+
     def _generate_data(self, address):
         """Generate deterministic mock data from address"""
         seed = int(address[-8:], 16) % 1000
@@ -75,24 +122,104 @@ class TradFiAgent:
             }
         }
 
-    def _score_with_llm(self, state):
-        """Use Claude to score credit data, with rule-based fallback"""
+    async def _score(self, state, deadline=None):
+        """
+        Score with the distilled model when SCORER=model and one is trained,
+        otherwise with the LLM - logging fresh LLM scores for distillation
+        and checking them against the model's prediction.
+        """
+        if not self.distiller:
+            return await self._score_with_llm(state, deadline)
+
+        features = self.distiller.features('tradfi', state)
+        if Config.SCORER == 'model':
+            predicted = self.distiller.predict('tradfi', features)
+            if predicted:
+                return predicted['tradfi_score'], 'model'
+
+        score, source = await self._score_with_llm(state, deadline)
+        if source == 'llm':
+            self.distiller.observe('tradfi', features, {'tradfi_score': score})
+        return score, source
+
+    @traced('agent.tradfi.score_batch', lambda self, states: {'wallets': len(states)})
+    async def score_batch(self, states):
+        """
+        Background path: score many states already filled by
+        fetch_data(score=False), LLM_BATCH_SIZE wallets per request.
+        Sets tradfi_score / tradfi_source on each. Wallets the batch answer
+        leaves out or garbles are retried on their own (with the usual
+        rule-based fallback).
+        """
+        pending = {}
+        for state in states:
+            if self.distiller and Config.SCORER == 'model':
+                predicted = self.distiller.predict('tradfi', self.distiller.features('tradfi', state))
+                if predicted:
+                    state['tradfi_score'], state['tradfi_source'] = predicted['tradfi_score'], 'model'
+                    continue
+            cached = (await self.llm_cache.get(self._cache_key(state))) if self.llm_cache else None
+            if cached is not None:
+                state['tradfi_score'] = max(0, min(1000, int(cached['tradfi_score'])))
+                state['tradfi_source'] = 'cache'
+                continue
+            pending[state['user_address']] = state
+
+        results = {}
+        if pending:
+            results = await complete_batch(
+                self.llm, TRADFI_BATCH,
+                {address: self._llm_input(state) for address, state in pending.items()},
+                ('tradfi_score',), 'TradFi',
+            )
+
+        retry = []
+        for address, state in pending.items():
+            result = results.get(address)
+            if result is None:
+                retry.append(state)
+                continue
+            score = max(0, min(1000, result['tradfi_score']))
+            state['tradfi_score'], state['tradfi_source'] = score, 'llm_batch'
+            if self.llm_cache:
+                self.llm_cache.put(self._cache_key(state), result)
+            if self.distiller:
+                self.distiller.observe('tradfi', self.distiller.features('tradfi', state), {'tradfi_score': score})
+
+        if retry:
+            print(f"  [TradFi] Retrying {len(retry)} wallet(s) singly")
+            scored = await asyncio.gather(*(self._score(state) for state in retry))
+            for state, (score, source) in zip(retry, scored):
+                state['tradfi_score'], state['tradfi_source'] = score, source
+
+        return states
+
+    @staticmethod
+    def _llm_input(state):
+        """Credit data as presented to the LLM"""
+        return {
+            'experian': state['experian_data'],
+            'plaid': state['plaid_data'],
+            'payment_history': state['payment_data'],
+        }
+
+    def _cache_key(self, state):
+        return self.llm_cache.key(Config.BEDROCK_MODEL_ID, TRADFI.version, self._llm_input(state))
+
+    async def _score_with_llm(self, state, deadline=None):
+        """
+        Use Claude to score credit data, with rule-based fallback.
+        Returns (score, source) with source 'llm', 'cache', 'rules' or 'deadline'.
+        """
+        # Computed up front so a missed deadline costs nothing extra
+        fallback = self._calculate_score(state)
         try:
             exp = state['experian_data']
             plaid = state['plaid_data']
             payment = state['payment_data']
 
             messages = [
-                SystemMessage(content=(
-                    "You are a credit analyst AI. Analyze the provided credit data and return "
-                    "a JSON object with exactly two fields:\n"
-                    '- "tradfi_score": an integer from 0 to 1000 (higher = more creditworthy)\n'
-                    '- "reasoning": a brief explanation of your score\n\n'
-                    "Consider FICO score, payment history, credit utilization, banking health, "
-                    "debt-to-income ratio, and account age. Weight FICO heavily (~40%), "
-                    "payment history (~30%), banking health (~20%), and utilization (~10%).\n\n"
-                    "Return ONLY valid JSON, no markdown formatting."
-                )),
+                TRADFI.system_message(),
                 HumanMessage(content=(
                     f"Experian Data: {json.dumps(exp)}\n\n"
                     f"Plaid Banking Data: {json.dumps(plaid)}\n\n"
@@ -100,17 +227,37 @@ class TradFiAgent:
                 )),
             ]
 
-            response = self.llm.invoke(messages)
-            result = json.loads(response.content.strip().removeprefix("```json").removesuffix("```").strip())
+            cache_key = None
+            if self.llm_cache:
+                cache_key = self._cache_key(state)
+                result = await self.llm_cache.get(cache_key)
+            else:
+                result = None
+
+            from_cache = result is not None
+            if not from_cache:
+                # Numbers come first in the output, so a streamed completion
+                # can be used before the reasoning has been generated
+                result = await asyncio.wait_for(
+                    complete_json(self.llm, messages, ('tradfi_score',), 'TradFi', prompt=TRADFI.version),
+                    Deadline.timeout_for(deadline, 0.5),
+                )
             score = int(result['tradfi_score'])
             score = max(0, min(1000, score))
 
-            print(f"  [TradFi] Claude reasoning: {result.get('reasoning', 'N/A')}")
-            return score
+            if cache_key and not from_cache:
+                self.llm_cache.put(cache_key, result)
+
+            if 'reasoning' in result:
+                print(f"  [TradFi] Claude reasoning: {result['reasoning']}")
+            return score, 'cache' if from_cache else 'llm'
 
+        except asyncio.TimeoutError:
+            print("  [TradFi] LLM missed its latency budget, using rule-based score")
+            return fallback, 'deadline'
         except Exception as e:
             print(f"  [TradFi] LLM call failed ({e}), falling back to rule-based scoring")
-            return self._calculate_score(state)
+            return fallback, 'rules'
 
     def _calculate_score(self, state):
         """Fallback: Convert multiple metrics into 0-1000 score"""
@@ -1,8 +1,18 @@
+import json
+import time
+from collections import Counter
+from typing import Optional
 from fastapi import APIRouter, HTTPException
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from fastapi.responses import StreamingResponse
 from src.utils.config import Config
+from src.utils.single_flight import SingleFlight
+from src.services.llm_registry import llm_registry, get_llm
+from src.utils.tracing import tracer, span
+from src.utils.circuit_breaker import circuit_states
+from src.services.credit_data_sources import mock_bureau_data
 from src.schemas.schemas import (
     ScoreRequest,
+    BatchScoreRequest,
     EvaluateLoanRequest,
     CreditScoreResponse,
     DisburseRequest,
@@ -16,10 +26,17 @@ router = APIRouter()
 
 # Will be injected from main.py
 blockchain_service = None
-tradfi_agent = None
-onchain_agent = None
-risk_agent = None
-submission_agent = None
+scoring_pipeline = None
+request_queue = None
+llm_cache = None
+distiller = None
+batch_scorer = None
+
+# Concurrent scoring runs for the same address share one pipeline
+scoring_flights = SingleFlight(grace_seconds=Config.SCORE_SINGLE_FLIGHT_GRACE)
+
+# How often each score came from the LLM, the cache or the rule-based fallback
+score_source_counts = Counter()
 
 # ============================================================================
 # HEALTH & INFO & DEBUG
@@ -27,80 +44,102 @@ submission_agent = None
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; "degraded" while any dependency's circuit is not closed"""
+    circuits = circuit_states()
+    degraded = any(c['state'] != 'closed' for c in circuits.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "blockchain_connected": await blockchain_service.w3.is_connected(),
+        "agent_address": blockchain_service.account.address,
+        "circuit_breakers": circuits,
+    }
+
+@router.get("/stats")
+async def service_stats():
+    """Queue, cache and watcher metrics for sizing the agent"""
     return {
-        "status": "healthy",
-        "blockchain_connected": blockchain_service.w3.is_connected(),
-        "agent_address": blockchain_service.account.address
+        "request_queue": request_queue.stats() if request_queue else None,
+        "scoring_flights": scoring_flights.stats(),
+        "pipeline_stages": scoring_pipeline.stats() if scoring_pipeline else None,
+        "score_sources": dict(score_source_counts),
+        "llm_cache": llm_cache.stats() if llm_cache else None,
+        "llm_clients": llm_registry.stats(),
+        "distiller": distiller.stats() if distiller else None,
+        "score_cache": blockchain_service.score_cache.stats(),
+        "receipt_watcher": blockchain_service.receipt_watcher.stats(),
+        "indexer": blockchain_service.indexer.stats(),
     }
 
+@router.get("/debug/traces")
+async def debug_traces(limit: int = 20, trace_id: Optional[str] = None):
+    """Recent traces (newest first) from the in-process span buffer"""
+    return {"traces": tracer.traces(limit=limit, trace_id=trace_id)}
+
+@router.get("/debug/traces/summary")
+async def debug_trace_summary():
+    """Latency per span name over the buffered spans, biggest total first"""
+    return {"spans": tracer.summary()}
+
 @router.get("/credit-data/{user_address}")
 async def mock_credit_data(user_address: str):
     """Mock credit data API — simulates Experian/Plaid responses per wallet."""
-    seed = int(user_address[-8:], 16) % 1000
-    fico = 550 + (seed % 270)
-    return {
-        "experian": {
-            "fico_score": fico,
-            "account_age_months": 12 + (seed % 168),
-            "payment_history_percent": 70.0 + (seed % 30),
-            "credit_utilization_percent": 5.0 + (seed % 80),
-            "total_accounts": 2 + (seed % 23),
-            "derogatory_marks": seed % 4,
-            "total_debt": (seed % 50) * 1000,
-        },
-        "plaid": {
-            "checking_balance": (seed % 250) * 100,
-            "savings_balance": (seed % 500) * 100,
-            "avg_monthly_income": 2000 + (seed % 130) * 100,
-            "avg_monthly_expenses": 1500 + (seed % 105) * 100,
-            "overdraft_count_6mo": seed % 6,
-        },
-        "payment_history": {
-            "on_time_payments_12mo": 6 + (seed % 7),
-            "late_payments_12mo": seed % 5,
-            "missed_payments_12mo": seed % 3,
-            "debt_to_income_ratio": round(0.1 + (seed % 10) * 0.1, 2),
-        },
-    }
+    return mock_bureau_data(user_address)
 
 # ============================================================================
 # CREDIT SCORING
 # ============================================================================
 
-def _run_scoring_pipeline(user_address: str, requested_amount_wei: int = 0):
-    """Shared pipeline: TradFi + OnChain in parallel → Risk → Submission."""
-    state = {
-        'user_address': user_address,
-        'requested_amount': requested_amount_wei,
-    }
+async def _run_scoring_pipeline(user_address: str, requested_amount_wei: int = 0, mode: str = None,
+                                budget_ms: int = None):
+    """
+    Shared pipeline: TradFi + OnChain in parallel → Risk → Submission,
+    or with mode="combined" one LLM call for all scores → Submission.
+    LLM steps share a budget_ms latency budget, counted from when scoring
+    starts; a step that misses its slice uses the rule-based score instead
+    (budget_ms=0 skips the LLM).
+    Duplicate concurrent calls (double clicks, retries) join the run already
+    in flight and get the same result, tx_hash included (under the first
+    caller's budget).
+    """
+    mode = mode or Config.SCORING_MODE
+    if budget_ms is None:
+        budget_ms = Config.SCORING_BUDGET_MS
+    key = (user_address.lower(), requested_amount_wei, mode)
+    return await scoring_flights.do(
+        key, lambda: _score_user(user_address, requested_amount_wei, mode, budget_ms)
+    )
 
-    # TradFi and OnChain are independent — run in parallel
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        tradfi_future = executor.submit(tradfi_agent.fetch_data, dict(state))
-        onchain_future = executor.submit(onchain_agent.analyze, dict(state))
 
-        tradfi_state = tradfi_future.result()
-        onchain_state = onchain_future.result()
+async def _score_user(user_address: str, requested_amount_wei: int, mode: str, budget_ms: int):
+    started = time.perf_counter()
+    state = await scoring_pipeline.run(
+        user_address, requested_amount_wei, mode=mode, budget_ms=budget_ms
+    )
 
-    # Merge results into state
-    state.update(tradfi_state)
-    state.update(onchain_state)
+    state['score_sources'] = {
+        'tradfi': state.get('tradfi_source'),
+        'onchain': state.get('onchain_source'),
+        'risk': state.get('risk_source'),
+    }
+    for score, source in state['score_sources'].items():
+        score_source_counts[f"{score}:{source}"] += 1
 
-    # Risk and submission must be sequential
-    state = risk_agent.calculate_risk(state)
-    state = submission_agent.submit(state)
+    state['mode'] = mode
+    state['pipeline_ms'] = (time.perf_counter() - started) * 1000
+    print(f"Scoring pipeline ({mode}) took {state['pipeline_ms']:.0f} ms")
     return state
 
 
 @router.post("/process-score", response_model=CreditScoreResponse)
-def process_score(request: ScoreRequest):
+async def process_score(request: ScoreRequest):
     """
     Run the credit scoring pipeline for a user and return their profile.
     No loan amount needed — just scores, FTSO prices, and on-chain submission.
     """
     try:
-        state = _run_scoring_pipeline(request.user_address)
+        state = await _run_scoring_pipeline(
+            request.user_address, mode=request.mode, budget_ms=request.budget_ms
+        )
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -116,11 +155,33 @@ def process_score(request: ScoreRequest):
         flr_price_usd=state.get('flr_price_usd'),
         xrp_price_usd=state.get('xrp_price_usd'),
         tx_hash=state.get('tx_hash'),
+        mode=state.get('mode'),
+        pipeline_ms=state.get('pipeline_ms'),
+        score_sources=state.get('score_sources'),
     )
 
 
+@router.post("/process-scores")
+async def process_scores(request: BatchScoreRequest):
+    """
+    Rule-based re-scoring of many wallets (e.g. after a policy change).
+    Streams one NDJSON line per address as each chunk is scored.
+    """
+
+    async def lines():
+        try:
+            async for result in batch_scorer.score(request.user_addresses, submit=request.submit):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield json.dumps({"error": f"Batch scoring failed: {e}"}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/evaluate-loan", response_model=EvaluateLoanResponse)
-def evaluate_loan(request: EvaluateLoanRequest):
+async def evaluate_loan(request: EvaluateLoanRequest):
     """
     Fast loan eligibility preview with agentic reasoning.
     Reads cached on-chain score + fresh balance check via RPC.
@@ -136,8 +197,11 @@ def evaluate_loan(request: EvaluateLoanRequest):
             max_borrow_amount="0",
         )
 
+    # Loan, score, pool liquidity and FTSO prices in one batched read
+    preflight = await blockchain_service.get_lending_preflight(address, include_prices=True)
+
     # 1. Check active loan
-    has_loan = blockchain_service.check_active_loan(address)
+    has_loan = bool(preflight['loan'] and preflight['loan']['active'])
     if has_loan:
         return EvaluateLoanResponse(
             approved=False,
@@ -147,7 +211,7 @@ def evaluate_loan(request: EvaluateLoanRequest):
         )
 
     # 2. Read cached on-chain score (from process-score)
-    score = blockchain_service.get_user_score(address)
+    score = preflight['score']
     if not score or score['combined_risk_score'] == 0:
         return EvaluateLoanResponse(
             approved=False,
@@ -160,8 +224,8 @@ def evaluate_loan(request: EvaluateLoanRequest):
     base_apr = score['apr']
     risk = score['combined_risk_score']
 
-    # 3. Fetch live FTSO prices for USD valuation
-    ftso = blockchain_service.get_ftso_prices()
+    # 3. Live FTSO prices for USD valuation
+    ftso = preflight['ftso']
     flr_price = ftso['flr_usd'] if ftso else None
     xrp_price = ftso['xrp_usd'] if ftso else None
     loan_value_usd = (requested_wei / 10**18) * xrp_price if xrp_price else None
@@ -186,7 +250,7 @@ def evaluate_loan(request: EvaluateLoanRequest):
         )
 
     # 6. Check pool liquidity
-    pool = blockchain_service.get_pool_balance()
+    pool = preflight['pool']
     if pool and pool['balance_wei'] < requested_wei:
         return EvaluateLoanResponse(
             approved=False,
@@ -201,7 +265,7 @@ def evaluate_loan(request: EvaluateLoanRequest):
     adjusted_apr = base_apr + utilization_premium
 
     # 8. Agentic reasoning via Claude
-    reasoning = _get_loan_reasoning(score, request.requested_amount, utilization, adjusted_apr)
+    reasoning = await _get_loan_reasoning(score, request.requested_amount, utilization, adjusted_apr)
 
     return EvaluateLoanResponse(
         approved=True,
@@ -218,17 +282,13 @@ def evaluate_loan(request: EvaluateLoanRequest):
     )
 
 
-def _get_loan_reasoning(score, requested_tokens, utilization, adjusted_apr_bps):
+async def _get_loan_reasoning(score, requested_tokens, utilization, adjusted_apr_bps):
     """Use Claude to produce a human-readable loan approval explanation."""
     try:
-        from langchain_aws import ChatBedrockConverse
         from langchain_core.messages import HumanMessage, SystemMessage
 
-        llm = ChatBedrockConverse(
-            model=Config.BEDROCK_MODEL_ID,
-            region_name=Config.AWS_REGION,
-            temperature=0.2,
-        )
+        # Shared client: no per-request boto3 client / TLS handshake
+        llm = get_llm(temperature=0.2)
 
         messages = [
             SystemMessage(content=(
@@ -248,7 +308,9 @@ def _get_loan_reasoning(score, requested_tokens, utilization, adjusted_apr_bps):
             )),
         ]
 
-        response = llm.invoke(messages)
+        with span('llm.invoke', model=Config.BEDROCK_MODEL_ID, prompt='loan-reasoning', label='EvaluateLoan'):
+            response = await llm_registry.breaker.call(llm.ainvoke, messages)
+            llm_registry.record_usage('loan-reasoning', response.usage_metadata)
         return response.content.strip()
 
     except Exception as e:
@@ -297,7 +359,7 @@ def _parse_revert_reason(error_msg: str) -> str:
 
 
 @router.post("/disburse-loan")
-def disburse_loan(request: DisburseRequest):
+async def disburse_loan(request: DisburseRequest):
     """
     Disburse loan to user.
     Backend does soft pre-flight checks for fast UX feedback.
@@ -311,18 +373,16 @@ def disburse_loan(request: DisburseRequest):
 
     # --- Soft pre-flight checks (fast UX feedback, not authoritative) ---
 
-    try:
-        has_loan = blockchain_service.check_active_loan(address)
-        if has_loan:
-            raise HTTPException(status_code=400, detail="User already has an active loan. Repay it first.")
-    except HTTPException:
-        raise
-    except Exception:
-        pass  # Let the contract be the authority if RPC check fails
+    # One batched read; anything that fails to load is left to the contract
+    preflight = await blockchain_service.get_lending_preflight(address)
 
-    try:
-        score = blockchain_service.get_user_score(address)
-        if not score or score['combined_risk_score'] == 0:
+    loan = preflight['loan']
+    if loan and loan['active']:
+        raise HTTPException(status_code=400, detail="User already has an active loan. Repay it first.")
+
+    score = preflight['score']
+    if score is not None:
+        if score['combined_risk_score'] == 0:
             raise HTTPException(status_code=404, detail="No credit score found. Run credit scoring first.")
 
         MAX_ACCEPTABLE_RISK = 60
@@ -338,26 +398,17 @@ def disburse_loan(request: DisburseRequest):
                 status_code=400,
                 detail=f"Requested {request.requested_amount:.0f} tokens exceeds your max borrow limit of {max_tokens:.0f} tokens."
             )
-    except HTTPException:
-        raise
-    except Exception:
-        pass  # Let the contract be the authority
 
-    try:
-        pool = blockchain_service.get_pool_balance()
-        if pool and pool['balance_wei'] < requested_wei:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Insufficient pool liquidity. Available: {pool['balance_tokens']:.0f} tokens."
-            )
-    except HTTPException:
-        raise
-    except Exception:
-        pass
+    pool = preflight['pool']
+    if pool and pool['balance_wei'] < requested_wei:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient pool liquidity. Available: {pool['balance_tokens']:.0f} tokens."
+        )
 
     # --- On-chain disbursement (contract enforces all checks) ---
     try:
-        result = blockchain_service.disburse_loan(address, requested_wei)
+        result = await blockchain_service.disburse_loan(address, requested_wei)
 
         if result is None:
             raise HTTPException(status_code=500, detail="Disbursement transaction returned no result.")
@@ -386,11 +437,11 @@ def disburse_loan(request: DisburseRequest):
 # ============================================================================
 
 @router.get("/loan-status/{user_address}", response_model=LoanStatusResponse)
-def get_loan_status(user_address: str):
+async def get_loan_status(user_address: str):
     """Get user's active loan status"""
     
     try:
-        loan = blockchain_service.get_loan_info(user_address)
+        loan = await blockchain_service.get_loan_info(user_address)
         
         if not loan or not loan['active']:
             return {
@@ -411,14 +462,15 @@ def get_loan_status(user_address: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/repayment-info/{user_address}", response_model=RepaymentInfoResponse)
-def get_repayment_info(user_address: str):
+async def get_repayment_info(user_address: str):
     """
     Get complete repayment information for a user.
     Includes loan details, repayment amount, user balance, and allowance.
     """
     try:
-        # Check if user has active loan
-        loan = blockchain_service.get_loan_info(user_address)
+        # Loan, repayment, balance and allowance in one batched read
+        snapshot = await blockchain_service.get_repayment_snapshot(user_address)
+        loan = snapshot['loan']
         
         if not loan or not loan['active']:
             return {
@@ -426,8 +478,7 @@ def get_repayment_info(user_address: str):
                 "user_address": user_address
             }
         
-        # Get repayment amount
-        repayment = blockchain_service.get_repayment_amount(user_address)
+        repayment = snapshot['repayment']
         
         if not repayment:
             raise HTTPException(
@@ -435,14 +486,8 @@ def get_repayment_info(user_address: str):
                 detail="Failed to calculate repayment amount"
             )
         
-        # Get user's token balance
-        user_balance = blockchain_service.get_user_token_balance(user_address)
-        
-        # Get allowance
-        allowance = blockchain_service.get_token_allowance(
-            user_address,
-            blockchain_service.lending.address
-        )
+        user_balance = snapshot['balance']
+        allowance = snapshot['allowance']
         
         return {
             "has_active_loan": True,
@@ -1,27 +1,43 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-import threading
+import asyncio
 from contextlib import asynccontextmanager
 
-from concurrent.futures import ThreadPoolExecutor
 from src.services.blockchain_service import BlockchainService
+from src.services.async_blockchain_service import AsyncBlockchainService
 from src.services.fdc_service import FlareFDCService
+from src.services.request_queue import RequestQueue
+from src.services.llm_cache import LLMCache
+from src.services.distiller import Distiller
+from src.services.batch_scorer import BatchScorer
+from src.services.scoring_pipeline import ScoringPipeline
+from src.services.llm_registry import llm_registry
 from src.agents.tradfi_agent import TradFiAgent
 from src.agents.onchain_agent import OnChainAgent
 from src.agents.risk_agent import RiskAgent
 from src.agents.submission_agent import SubmissionAgent
+from src.agents.combined_agent import CombinedScoringAgent
 from src.api import routes
 from src.utils.config import Config
+from src.utils.tracing import span, traced
+from src.utils.rpc_metrics import rpc_metrics, tag_route
 
 # Global instances
 blockchain_service = None
+async_blockchain_service = None
 fdc_service = None
 tradfi_agent = None
 onchain_agent = None
 risk_agent = None
 submission_agent = None
+combined_agent = None
+scoring_pipeline = None
+request_queue = None
+llm_cache = None
+distiller = None
 
-def process_credit_request(user_address: str, requested_amount: int = 0):
+async def process_credit_request(user_address: str, requested_amount: int = 0):
     """Process a credit score request through the agent pipeline"""
 
     print(f"\nProcessing credit score for: {user_address}")
@@ -29,23 +45,9 @@ def process_credit_request(user_address: str, requested_amount: int = 0):
         print(f"Requested amount: {requested_amount / 10**18:.0f} tokens")
     print(f"{'='*60}\n")
 
-    state = {
-        'user_address': user_address,
-        'requested_amount': requested_amount
-    }
-
     try:
-        # TradFi and OnChain are independent — run in parallel
-        with ThreadPoolExecutor(max_workers=2) as executor:
-            tradfi_future = executor.submit(tradfi_agent.fetch_data, dict(state))
-            onchain_future = executor.submit(onchain_agent.analyze, dict(state))
-            tradfi_state = tradfi_future.result()
-            onchain_state = onchain_future.result()
-        state.update(tradfi_state)
-        state.update(onchain_state)
-
-        state = risk_agent.calculate_risk(state)
-        state = submission_agent.submit(state)
+        # Background path: share oracle transactions with other queued requests
+        state = await scoring_pipeline.run(user_address, requested_amount, batched=True)
 
         print(f"\n{'='*60}")
         print("FINAL RESULTS:")
@@ -67,19 +69,69 @@ def process_credit_request(user_address: str, requested_amount: int = 0):
         print(f"Error processing request: {e}")
         import traceback
         traceback.print_exc()
+        # Let the request queue count the failure
+        raise
 
-def start_event_listener():
-    """Start blockchain event listener in background thread"""
-    blockchain_service.listen_for_score_requests(
-        lambda user_address: process_credit_request(user_address, 0)
-    )
+@traced('queue.batch', lambda user_addresses: {'wallets': len(user_addresses)})
+async def process_credit_batch(user_addresses):
+    """
+    Process a backlog of queued requests together: data is gathered per
+    wallet as usual, then each agent scores the whole group with batch
+    prompts (LLM_BATCH_SIZE wallets per request).
+    Returns {user_address: error} for the wallets that failed, so the
+    request queue can count them; raises if the batch as a whole failed.
+    """
+    if Config.SCORING_MODE == 'combined':
+        # The single-call prompt has no batch variant
+        results = await asyncio.gather(
+            *(process_credit_request(user_address, 0) for user_address in user_addresses),
+            return_exceptions=True,
+        )
+        return {
+            user_address: result
+            for user_address, result in zip(user_addresses, results)
+            if isinstance(result, Exception)
+        }
+
+    print(f"\nProcessing {len(user_addresses)} credit scores as a batch")
+    print(f"{'='*60}\n")
+
+    try:
+        states, failed = await scoring_pipeline.run_batch(user_addresses)
+
+        print(f"\n{'='*60}")
+        print("FINAL BATCH RESULTS:")
+        print(f"{'='*60}")
+        for state in states:
+            print(
+                f"{state['user_address']}: TradFi {state['tradfi_score']} ({state['tradfi_source']}), "
+                f"OnChain {state['onchain_score']} ({state['onchain_source']}), "
+                f"Risk {state['combined_risk_score']} ({state['risk_source']}), "
+                f"APR {state['apr'] / 100}%, tx {state['tx_hash']}"
+            )
+        print(f"{'='*60}\n")
+        return failed
+
+    except Exception as e:
+        print(f"Error processing batch: {e}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+async def start_event_listener():
+    """Run the blockchain event listener as a background task"""
+    # Indexed requests go through the bounded worker pool so one slow
+    # pipeline doesn't hold up the rest and repeat requests are merged
+    await async_blockchain_service.listen_for_score_requests(request_queue.submit)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
 
     # Startup
-    global blockchain_service, fdc_service, tradfi_agent, onchain_agent, risk_agent, submission_agent
+    global blockchain_service, async_blockchain_service, fdc_service
+    global tradfi_agent, onchain_agent, risk_agent, submission_agent, request_queue, llm_cache, distiller
+    global combined_agent, scoring_pipeline
 
     print("Flare Credit Agent System Starting...")
 
@@ -87,7 +139,10 @@ async def lifespan(app: FastAPI):
     Config.validate()
 
     # Initialize services
+    # Sync service backs the (blocking) FDC client; routes and agents use the async one
     blockchain_service = BlockchainService()
+    async_blockchain_service = AsyncBlockchainService(tx_builder=blockchain_service.tx_builder)
+    await async_blockchain_service.connect()
 
     # Initialize Flare FDC service (Coston2 testnet)
     fdc_service = FlareFDCService(
@@ -99,24 +154,44 @@ async def lifespan(app: FastAPI):
         fdc_fee_address=Config.FDC_FEE_ADDRESS,
         w3=blockchain_service.w3,
         api_key=Config.FDC_API_KEY or None,
+        tx_builder=blockchain_service.tx_builder,
     )
 
     # Initialize agents (TradFi now uses FDC for external data)
-    tradfi_agent = TradFiAgent(fdc_service)
-    onchain_agent = OnChainAgent(blockchain_service)
-    risk_agent = RiskAgent(blockchain_service)
-    submission_agent = SubmissionAgent(blockchain_service)
+    # Open Bedrock connections before the first request needs them (opt-in,
+    # in the background so startup never waits on Bedrock)
+    prewarm_task = asyncio.create_task(llm_registry.prewarm())
+
+    # Identical agent inputs reuse the previous LLM answer
+    llm_cache = LLMCache()
+    # Logs LLM scores for training and serves the distilled models
+    distiller = Distiller()
+    tradfi_agent = TradFiAgent(fdc_service, llm_cache=llm_cache, distiller=distiller)
+    onchain_agent = OnChainAgent(async_blockchain_service, llm_cache=llm_cache, distiller=distiller)
+    risk_agent = RiskAgent(async_blockchain_service, llm_cache=llm_cache, distiller=distiller)
+    submission_agent = SubmissionAgent(async_blockchain_service)
+    combined_agent = CombinedScoringAgent(tradfi_agent, onchain_agent, risk_agent, llm_cache=llm_cache)
+
+    scoring_pipeline = ScoringPipeline(tradfi_agent, onchain_agent, risk_agent, submission_agent, combined_agent)
 
     # Inject into routes
-    routes.blockchain_service = blockchain_service
-    routes.tradfi_agent = tradfi_agent
-    routes.onchain_agent = onchain_agent
-    routes.risk_agent = risk_agent
-    routes.submission_agent = submission_agent
+    routes.blockchain_service = async_blockchain_service
+    routes.scoring_pipeline = scoring_pipeline
+
+    # Worker pool for requests picked up by the event indexer
+    request_queue = RequestQueue(
+        lambda user_address: process_credit_request(user_address, 0),
+        batch_handler=process_credit_batch,
+        on_done=async_blockchain_service.request_done,
+    )
+    request_queue.start()
+    routes.request_queue = request_queue
+    routes.llm_cache = llm_cache
+    routes.distiller = distiller
+    routes.batch_scorer = BatchScorer(async_blockchain_service, tradfi_agent, onchain_agent)
 
-    # Start event listener in background thread
-    listener_thread = threading.Thread(target=start_event_listener, daemon=True)
-    listener_thread.start()
+    # Start event listener as a background task on the event loop
+    listener_task = asyncio.create_task(start_event_listener())
 
     print("FastAPI server started")
     print("Event listener started in background")
@@ -125,9 +200,36 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     print("Shutting down...")
+    prewarm_task.cancel()
+    listener_task.cancel()
+    try:
+        await listener_task
+    except asyncio.CancelledError:
+        pass
+    await request_queue.stop()
+    await async_blockchain_service.close()
+    llm_cache.close()
+    distiller.close()
+
+API_PREFIX = "/api"
+
+def route_name(request: Request):
+    """'METHOD /path/{param}' - the matched route template, so per-address URLs group together"""
+    route = request.scope.get('route')
+    if route is None:
+        # Not routed (404)
+        return f"{request.method} {request.url.path}"
+    # Routes of an included router keep their own path, without the prefix
+    prefix = API_PREFIX if any(route is api_route for api_route in routes.router.routes) else ""
+    return f"{request.method} {prefix}{route.path}"
+
+async def tag_rpc_route(request: Request):
+    """Tag the RPC calls this request makes with its route (see rpc_metrics)"""
+    tag_route(route_name(request))
 
 # Create FastAPI app
 app = FastAPI(
+    dependencies=[Depends(tag_rpc_route)],
     title="Flare Credit Scoring API",
     description="Decentralized credit scoring and lending system",
     version="1.0.0",
@@ -143,8 +245,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Root tracing span per API request
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with span(f"{request.method} {request.url.path}", http_method=request.method) as current:
+        response = await call_next(request)
+        if current:
+            # Path params are only known once routed
+            current.name = route_name(request)
+            current.set_attributes(http_path=request.url.path, http_status=response.status_code)
+        return response
+
 # Include routes
-app.include_router(routes.router, prefix="/api", tags=["credit"])
+app.include_router(routes.router, prefix=API_PREFIX, tags=["credit"])
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (JSON-RPC accounting)"""
+    return PlainTextResponse(rpc_metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 async def root():
@@ -156,4 +274,4 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=Config.PORT)
@@ -1,9 +1,18 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict
 
 # Request Models
 class ScoreRequest(BaseModel):
     user_address: str
+    # "agents": three LLM calls (TradFi, OnChain, then Risk)
+    # "combined": one structured-output call; None = server default
+    mode: Optional[Literal["agents", "combined"]] = None
+    # Latency budget for the LLM steps; None = server default
+    budget_ms: Optional[int] = None
+
+class BatchScoreRequest(BaseModel):
+    user_addresses: List[str]
+    submit: bool = False  # also write the scores to the oracle
 
 class EvaluateLoanRequest(BaseModel):
     user_address: str
@@ -24,6 +33,9 @@ class CreditScoreResponse(BaseModel):
     flr_price_usd: Optional[float] = None
     xrp_price_usd: Optional[float] = None
     tx_hash: Optional[str] = None
+    mode: Optional[str] = None
+    pipeline_ms: Optional[float] = None
+    score_sources: Optional[Dict[str, str]] = None  # llm / cache / rules / deadline per score
 
 class LoanStatusResponse(BaseModel):
     has_active_loan: bool
@@ -60,10 +72,22 @@ class PrepareRepaymentResponse(BaseModel):
     transactions: List[TransactionData]
     instructions: List[str]
 
+class CircuitBreakerState(BaseModel):
+    state: Literal["closed", "open", "half_open"]
+    consecutive_failures: int
+    calls: int
+    failures: int
+    next_probe_in: Optional[float] = None
+    trips: int
+    rejected: int
+    last_error: Optional[str] = None
+
 class HealthResponse(BaseModel):
     status: str
     blockchain_connected: bool
     agent_address: str
+    # Per dependency: jq_verifier, da_layer, credit_data_api, bedrock, rpc
+    circuit_breakers: Dict[str, CircuitBreakerState] = {}
 
 class EvaluateLoanResponse(BaseModel):
     approved: bool
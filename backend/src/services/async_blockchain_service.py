@@ -0,0 +1,631 @@
+from web3 import AsyncWeb3, Web3
+from web3.middleware import ExtraDataToPOAMiddleware
+import asyncio
+import json
+from src.utils.config import Config
+from src.utils.multicall import MULTICALL3_ABI, encode_calls, decode_results
+from src.utils.chain_format import (
+    format_full_score,
+    format_loan,
+    format_token_amount,
+    format_ftso_prices,
+    calculate_repayment,
+    extract_revert_reason,
+)
+from src.services.nonce_manager import NonceManager
+from src.services.tx_builder import TransactionBuilder
+from src.services.receipt_watcher import ReceiptWatcher
+from src.services.score_cache import ScoreCache
+from src.services.log_indexer import LogIndexer
+from src.utils.tracing import traced, set_attributes, address_attributes
+from src.utils.rpc_metrics import rpc_metrics
+from src.utils.circuit_breaker import rpc_breaker_middleware
+
+
+RANDOM_NUMBER_V2_ABI = [
+    {
+        "inputs": [],
+        "name": "getRandomNumber",
+        "outputs": [
+            {"internalType": "uint256", "name": "randomNumber", "type": "uint256"},
+            {"internalType": "bool", "name": "isSecure", "type": "bool"},
+            {"internalType": "uint256", "name": "timestamp", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+FTSO_V2_ABI = [
+    {
+        "inputs": [
+            {"internalType": "bytes21[]", "name": "_feedIds", "type": "bytes21[]"}
+        ],
+        "name": "getFeedsById",
+        "outputs": [
+            {"internalType": "uint256[]", "name": "_values", "type": "uint256[]"},
+            {"internalType": "int8[]", "name": "_decimals", "type": "int8[]"},
+            {"internalType": "uint64", "name": "_timestamp", "type": "uint64"}
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+
+class AsyncBlockchainService:
+    """
+    asyncio variant of BlockchainService built on AsyncWeb3.
+    Same methods and return shapes, but every RPC is awaited so the
+    FastAPI routes and agents never park a threadpool thread on the node.
+    """
+
+    # Gas for submitCreditScores: fixed overhead + one fresh score struct and event each
+    BATCH_BASE_GAS = 60000
+    BATCH_GAS_PER_SCORE = 160000
+
+    def __init__(self, tx_builder=None):
+        # Connect to Flare
+        self.w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(Config.RPC_URL))
+
+        # Inject POA middleware for Flare
+        self.w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+
+        # Reads fail fast while the node is known to be down (outside the
+        # accounting layer, so skipped calls are not counted as RPCs)
+        self.w3.middleware_onion.inject(rpc_breaker_middleware(), name='circuit_breaker', layer=0)
+
+        # Per-method RPC accounting, innermost so it sees the raw requests
+        self.w3.middleware_onion.inject(rpc_metrics.middleware('agent'), name='rpc_metrics', layer=0)
+
+        # Setup agent account
+        self.account = self.w3.eth.account.from_key(Config.PRIVATE_KEY)
+
+        # Local nonce + gas price cache; pass BlockchainService.tx_builder to
+        # share one nonce sequence with the sync signing paths
+        self.tx_builder = tx_builder or TransactionBuilder(
+            self.account, NonceManager(self.account.address)
+        )
+
+        # One block-driven watcher for all of our pending transactions
+        self.receipt_watcher = ReceiptWatcher(self.w3, on_stuck=self._on_stuck_transaction)
+
+        # Oracle scores, kept fresh by CreditScoreSubmitted and our own receipts
+        self.score_cache = ScoreCache()
+
+        # Load contracts
+        self.oracle = self._load_contract(Config.ORACLE_ABI_PATH, Config.ORACLE_ADDRESS)
+        self.lending = self._load_contract(Config.LENDING_ABI_PATH, Config.LENDING_ADDRESS)
+        self.token = self._load_contract(Config.TOKEN_ABI_PATH, Config.TOKEN_ADDRESS)
+
+        # Load RandomNumberV2 contract
+        self.random_number_v2 = self.w3.eth.contract(
+            address=Web3.to_checksum_address(Config.RANDOM_NUMBER_V2_ADDRESS),
+            abi=RANDOM_NUMBER_V2_ABI
+        )
+
+        # Load FtsoV2 contract (price feeds)
+        self.ftso_v2 = self.w3.eth.contract(
+            address=Web3.to_checksum_address(Config.FTSO_V2_ADDRESS),
+            abi=FTSO_V2_ABI
+        )
+
+        # Load Multicall3 contract (batched view reads)
+        self.multicall = self.w3.eth.contract(
+            address=Web3.to_checksum_address(Config.MULTICALL3_ADDRESS),
+            abi=MULTICALL3_ABI
+        )
+
+        # One getLogs pass over both contracts, checkpointed in SQLite
+        self.indexer = LogIndexer(
+            self.w3,
+            [self.oracle, self.lending],
+            ['CreditScoreRequested', 'CreditScoreSubmitted', 'LoanDisbursed', 'LoanRepaid'],
+        )
+        self.indexer.on('CreditScoreSubmitted', self._on_score_submitted)
+        self.indexer.on('LoanDisbursed', self._on_loan_event)
+        self.indexer.on('LoanRepaid', self._on_loan_event)
+
+    async def connect(self):
+        """Verify the RPC connection (call once at startup)"""
+        if not await self.w3.is_connected():
+            raise Exception("Failed to connect to blockchain")
+
+        if not self.tx_builder.initialized:
+            chain_id, gas_price, pending_nonce, block_number = await asyncio.gather(
+                self.w3.eth.chain_id,
+                self.w3.eth.gas_price,
+                self.w3.eth.get_transaction_count(self.account.address, 'pending'),
+                self.w3.eth.block_number,
+            )
+            self.tx_builder.initialize(chain_id, gas_price, pending_nonce, block_number)
+
+        self.receipt_watcher.start()
+
+        print(f"Agent account: {self.account.address}")
+        print(f"Connected to Flare Coston2 (async)")
+        print(f"Oracle: {Config.ORACLE_ADDRESS}")
+
+    async def close(self):
+        """Stop background tasks (call at shutdown)"""
+        await self.receipt_watcher.stop()
+        self.indexer.close()
+
+    def _on_stuck_transaction(self, tx_hash, age_seconds):
+        """Stuck-transaction hook: refresh gas price so the next send isn't underpriced too"""
+        print(f"[Tx] {tx_hash} pending for {age_seconds:.0f}s, forcing gas price refresh")
+        self.tx_builder.invalidate_gas_price()
+
+    def _load_contract(self, abi_path, address):
+        """Load contract from ABI file"""
+        with open(abi_path) as f:
+            contract_json = json.load(f)
+            abi = contract_json['abi']
+
+        return self.w3.eth.contract(
+            address=Web3.to_checksum_address(address),
+            abi=abi
+        )
+
+    @traced('chain.get_secure_random')
+    async def get_secure_random(self):
+        """Call RandomNumberV2.getRandomNumber() — free view call, no gas"""
+        result = await self.random_number_v2.functions.getRandomNumber().call()
+        return {
+            'random_number': result[0],
+            'is_secure': result[1],
+            'timestamp': result[2]
+        }
+
+    @traced('chain.get_ftso_prices')
+    async def get_ftso_prices(self):
+        """Call FtsoV2.getFeedsById() for FLR/USD and XRP/USD — free view call"""
+        try:
+            return format_ftso_prices(await self._ftso_feeds_call().call())
+        except Exception as e:
+            print(f"[FTSO] Failed to fetch prices: {e}")
+            return None
+
+    def _ftso_feeds_call(self):
+        """Bound FtsoV2.getFeedsById() call for the FLR/USD and XRP/USD feeds"""
+        feed_ids = [
+            bytes.fromhex(Config.FTSO_FEED_FLR_USD[2:]),
+            bytes.fromhex(Config.FTSO_FEED_XRP_USD[2:]),
+        ]
+        return self.ftso_v2.functions.getFeedsById(feed_ids)
+
+    @traced('chain.multicall', lambda self, calls, *a, **k: {'calls': len(calls)})
+    async def batch_call(self, calls, block_identifier='latest'):
+        """
+        Run many view calls in a single Multicall3 aggregate3 eth_call.
+        Every call is evaluated against the same block. Sub-calls that
+        revert come back as None instead of failing the whole batch.
+        """
+        results = await self.multicall.functions.aggregate3(
+            encode_calls(calls)
+        ).call(block_identifier=block_identifier)
+
+        return decode_results(self.w3.codec, calls, results)
+
+    @traced('chain.send_transaction')
+    async def send_transaction(self, fn, gas, value=0):
+        """
+        Sign a contract call with the shared TransactionBuilder and broadcast it.
+        Returns (txn, tx_hash). A nonce the node rejected is handed back so the
+        next transaction fills the gap; after any other failure the nonces
+        are resynced from the node before the next send.
+        """
+        if self.tx_builder.gas_price_stale():
+            self.tx_builder.update_gas_price(await self.w3.eth.gas_price)
+        if self.tx_builder.nonces.needs_sync:
+            self.tx_builder.nonces.reset(
+                await self.w3.eth.get_transaction_count(self.account.address, 'pending')
+            )
+
+        txn, signed = self.tx_builder.build(fn, gas, value)
+
+        try:
+            tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            set_attributes(tx_hash=tx_hash.hex(), nonce=txn['nonce'], gas=gas)
+        except Exception as e:
+            self.tx_builder.send_failed(txn, e)
+            raise
+
+        return txn, tx_hash
+
+    async def listen_for_score_requests(self, callback):
+        """
+        Run the event indexer, awaiting callback(user_address) for every
+        CreditScoreRequested - including ones emitted while we were down.
+        Requests stay pending in the indexer until request_done(), so ones
+        indexed but not finished before a restart are handed over again.
+        """
+
+        async def on_request(event):
+            print(f"\n{'='*60}")
+            print(f"NEW REQUEST")
+            print(f"User: {event['args']['user']}")
+            print(f"Block: {event['blockNumber']}")
+            print(f"Tx: {event['transactionHash'].hex()}")
+            print(f"{'='*60}\n")
+
+            self.indexer.add_pending(event['args']['user'], event['blockNumber'])
+            await callback(event['args']['user'])
+
+        self.indexer.on('CreditScoreRequested', on_request)
+
+        pending = self.indexer.pending()
+        if pending:
+            print(f"[Indexer] Resuming {len(pending)} unfinished score requests")
+        for user_address in pending:
+            await callback(Web3.to_checksum_address(user_address))
+
+        print("\nListening for credit score requests...")
+        await self.indexer.run()
+
+    def request_done(self, user_address):
+        """A score request handed over by listen_for_score_requests has been processed"""
+        self.indexer.done(user_address)
+
+    async def _on_score_submitted(self, event):
+        """Invalidate the cached score whenever CreditScoreSubmitted fires"""
+        self.score_cache.on_score_submitted(event['args']['user'])
+
+    async def _on_loan_event(self, event):
+        print(f"[Indexer] {event['event']} user={event['args']['user']} "
+              f"amount={event['args']['amount'] / 10**18} block={event['blockNumber']}")
+
+    def _cache_submitted_score(self, user_address, score_data):
+        """Our own successful submission is the freshest copy of the score"""
+        self.score_cache.put(user_address, {
+            'tradfi_score': score_data['tradfi_score'],
+            'onchain_score': score_data['onchain_score'],
+            'combined_risk_score': score_data['combined_risk_score'],
+            'max_borrow_amount': score_data['max_borrow_amount'],
+            'apr': score_data['apr'],
+            'valid_until': score_data['valid_until'],
+        })
+
+    @traced('chain.submit_credit_score', address_attributes)
+    async def submit_credit_score(self, user_address, score_data):
+        """Submit credit score to oracle contract"""
+        print(f"Submitting score to blockchain...")
+
+        try:
+            _, tx_hash = await self.send_transaction(
+                self.oracle.functions.submitCreditScore(
+                    Web3.to_checksum_address(user_address),
+                    score_data['tradfi_score'],
+                    score_data['onchain_score'],
+                    score_data['combined_risk_score'],
+                    score_data['max_borrow_amount'],
+                    score_data['apr'],
+                    score_data['valid_until']
+                ),
+                gas=300000,
+            )
+
+            print(f"Transaction sent: {tx_hash.hex()}")
+            print(f"Waiting for confirmation...")
+
+            receipt = await self.receipt_watcher.wait_for_receipt(tx_hash, timeout=300)
+
+            if receipt['status'] == 1:
+                print(f"Score submitted successfully!")
+                print(f"Gas used: {receipt['gasUsed']}")
+                self._cache_submitted_score(user_address, score_data)
+            else:
+                print(f"Transaction failed!")
+
+            return receipt
+
+        except Exception as e:
+            print(f"Error submitting score: {e}")
+            raise
+
+    @traced('chain.submit_credit_scores', lambda self, submissions: {'scores': len(submissions)})
+    async def submit_credit_scores(self, submissions):
+        """
+        Submit many credit scores in one oracle transaction.
+        submissions is a list of (user_address, score_data) pairs; the
+        contract still emits CreditScoreSubmitted for every user.
+        """
+        print(f"Submitting {len(submissions)} scores to blockchain in one transaction...")
+
+        users = [Web3.to_checksum_address(user) for user, _ in submissions]
+        scores = [
+            (
+                data['tradfi_score'],
+                data['onchain_score'],
+                data['combined_risk_score'],
+                data['max_borrow_amount'],
+                data['apr'],
+                data['valid_until'],
+            )
+            for _, data in submissions
+        ]
+
+        try:
+            _, tx_hash = await self.send_transaction(
+                self.oracle.functions.submitCreditScores(users, scores),
+                gas=self.BATCH_BASE_GAS + self.BATCH_GAS_PER_SCORE * len(submissions),
+            )
+
+            print(f"Batch transaction sent: {tx_hash.hex()}")
+
+            receipt = await self.receipt_watcher.wait_for_receipt(tx_hash, timeout=300)
+
+            if receipt['status'] == 1:
+                print(f"{len(submissions)} scores submitted successfully! Gas used: {receipt['gasUsed']}")
+                for user_address, score_data in submissions:
+                    self._cache_submitted_score(user_address, score_data)
+            else:
+                print(f"Batch transaction failed!")
+
+            return receipt
+
+        except Exception as e:
+            print(f"Error submitting score batch: {e}")
+            raise
+
+    def scored_users_in_receipt(self, receipt):
+        """Checksummed users with a CreditScoreSubmitted event in this receipt"""
+        events = self.oracle.events.CreditScoreSubmitted().process_receipt(receipt)
+        return {event['args']['user'] for event in events}
+
+    @traced('chain.get_onchain_data', address_attributes)
+    async def get_onchain_data(self, user_address):
+        """Get on-chain data for a user"""
+        address = Web3.to_checksum_address(user_address)
+
+        balance, tx_count = await asyncio.gather(
+            self.w3.eth.get_balance(address),
+            self.w3.eth.get_transaction_count(address),
+        )
+
+        return {
+            'balance_wei': balance,
+            'balance_eth': float(Web3.from_wei(balance, 'ether')),
+            'transaction_count': tx_count
+        }
+
+    @traced('chain.get_onchain_batch', lambda self, addresses: {'addresses': len(addresses)})
+    async def get_onchain_batch(self, addresses):
+        """
+        get_onchain_data for many checksummed addresses: balances in one
+        multicall. Nonces are not readable from a contract, so those are one
+        eth_getTransactionCount each, BATCH_RPC_CONCURRENCY at a time.
+        """
+        balances = await self.batch_call([
+            self.multicall.functions.getEthBalance(address) for address in addresses
+        ])
+
+        semaphore = asyncio.Semaphore(Config.BATCH_RPC_CONCURRENCY)
+
+        async def transaction_count(address):
+            async with semaphore:
+                return await self.w3.eth.get_transaction_count(address)
+
+        tx_counts = await asyncio.gather(*(transaction_count(address) for address in addresses))
+
+        return [
+            {
+                'balance_wei': balance or 0,
+                'balance_eth': float(Web3.from_wei(balance or 0, 'ether')),
+                'transaction_count': tx_count
+            }
+            for balance, tx_count in zip(balances, tx_counts)
+        ]
+
+    @traced('chain.get_user_score', address_attributes)
+    async def get_user_score(self, user_address):
+        """Get existing credit score for a user (served from the score cache when fresh)"""
+        cached = self.score_cache.get(user_address)
+        if cached:
+            return cached
+
+        try:
+            score = format_full_score(await self.oracle.functions.getFullScore(
+                Web3.to_checksum_address(user_address)
+            ).call())
+
+            self.score_cache.put(user_address, score)
+            return score
+        except Exception as e:
+            print(f"Error getting score: {e}")
+            return None
+
+    async def check_active_loan(self, user_address):
+        """Check if user has an active loan"""
+        loan = await self.get_loan_info(user_address)
+        return bool(loan and loan['active'])
+
+    @traced('chain.get_loan_info', address_attributes)
+    async def get_loan_info(self, user_address):
+        """Get detailed loan information"""
+        try:
+            loan = await self.lending.functions.loans(
+                Web3.to_checksum_address(user_address)
+            ).call()
+
+            return format_loan(loan)
+
+        except Exception as e:
+            print(f"Error getting loan info: {e}")
+            return None
+
+    @traced('chain.get_pool_balance')
+    async def get_pool_balance(self):
+        """Get lending pool balance"""
+        try:
+            balance = await self.lending.functions.poolBalance().call()
+            return format_token_amount('balance', balance)
+        except Exception as e:
+            print(f"Error getting pool balance: {e}")
+            return None
+
+    @traced('chain.disburse_loan', address_attributes)
+    async def disburse_loan(self, user_address, amount_wei):
+        """
+        Disburse loan in mUSDC to a user via the MockLending contract.
+        The contract itself reads the oracle score and enforces:
+          - riskScore > 0
+          - riskScore <= 60
+          - amount <= maxBorrowAmount
+          - no active loan
+          - sufficient pool balance
+        """
+        amount = amount_wei
+        amount_tokens = amount_wei / 10**18
+        address = Web3.to_checksum_address(user_address)
+
+        print(f"[Disburse] {amount_tokens} mUSDC to {address}")
+
+        # Pre-flight: simulate the contract call to catch reverts early
+        try:
+            await self.lending.functions.disburseLoan(address, amount).call(
+                {'from': self.account.address}
+            )
+            print("[Disburse] Pre-flight simulation passed")
+        except Exception as e:
+            reason = extract_revert_reason(e)
+            print(f"[Disburse] Pre-flight failed: {reason}")
+            raise Exception(reason)
+
+        # Build and send the actual transaction
+        try:
+            txn, tx_hash = await self.send_transaction(
+                self.lending.functions.disburseLoan(address, amount),
+                gas=500000,
+            )
+            print(f"[Disburse] Tx sent: {tx_hash.hex()}")
+
+            receipt = await self.receipt_watcher.wait_for_receipt(tx_hash, timeout=300)
+
+            if receipt['status'] == 1:
+                print(f"[Disburse] Success! Gas: {receipt['gasUsed']}")
+                return receipt
+            else:
+                # Replay to get revert reason
+                reason = "Transaction reverted on-chain"
+                try:
+                    await self.w3.eth.call(
+                        {'to': self.lending.address, 'from': self.account.address, 'data': txn['data']},
+                        receipt['blockNumber']
+                    )
+                except Exception as replay_err:
+                    reason = extract_revert_reason(replay_err)
+                raise Exception(reason)
+
+        except Exception as e:
+            print(f"[Disburse] Error: {e}")
+            raise
+
+    async def get_repayment_amount(self, user_address):
+        """Get the total repayment amount including interest"""
+        try:
+            snapshot = await self.get_repayment_snapshot(user_address)
+            if not snapshot['repayment']:
+                print("No active loan found")
+            return snapshot['repayment']
+        except Exception as e:
+            print(f"Error getting repayment amount: {e}")
+            return None
+
+    @traced('chain.get_user_token_balance', address_attributes)
+    async def get_user_token_balance(self, user_address):
+        """Get user's mUSDC token balance"""
+        try:
+            balance = await self.token.functions.balanceOf(
+                Web3.to_checksum_address(user_address)
+            ).call()
+
+            return format_token_amount('balance', balance)
+        except Exception as e:
+            print(f"Error getting token balance: {e}")
+            return None
+
+    @traced('chain.get_token_allowance', address_attributes)
+    async def get_token_allowance(self, owner_address, spender_address):
+        """Get token allowance"""
+        try:
+            allowance = await self.token.functions.allowance(
+                Web3.to_checksum_address(owner_address),
+                Web3.to_checksum_address(spender_address)
+            ).call()
+
+            return format_token_amount('allowance', allowance)
+        except Exception as e:
+            print(f"Error getting allowance: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Batched reads (one Multicall3 round-trip per endpoint)
+    # ------------------------------------------------------------------
+
+    @traced('chain.get_repayment_snapshot', address_attributes)
+    async def get_repayment_snapshot(self, user_address):
+        """
+        Loan, block timestamp, token balance and lending allowance for a user,
+        all read in one eth_call against the same block.
+        """
+        address = Web3.to_checksum_address(user_address)
+
+        loan, current_time, balance, allowance = await self.batch_call([
+            self.lending.functions.loans(address),
+            self.multicall.functions.getCurrentBlockTimestamp(),
+            self.token.functions.balanceOf(address),
+            self.token.functions.allowance(address, self.lending.address),
+        ])
+
+        loan = format_loan(loan) if loan else None
+        repayment = None
+        if loan and loan['active']:
+            repayment = calculate_repayment(loan, current_time)
+
+        return {
+            'loan': loan,
+            'repayment': repayment,
+            'balance': format_token_amount('balance', balance),
+            'allowance': format_token_amount('allowance', allowance),
+        }
+
+    @traced('chain.get_lending_preflight', address_attributes)
+    async def get_lending_preflight(self, user_address, include_prices=False):
+        """
+        Active loan, oracle score, pool balance and (optionally) FTSO prices
+        for the loan pre-flight checks, read in one eth_call.
+        Values that could not be read are returned as None.
+        """
+        address = Web3.to_checksum_address(user_address)
+        cached_score = self.score_cache.get(address)
+
+        calls = [
+            self.lending.functions.loans(address),
+            self.lending.functions.poolBalance(),
+        ]
+        if include_prices:
+            calls.append(self._ftso_feeds_call())
+        if cached_score is None:
+            calls.append(self.oracle.functions.getFullScore(address))
+
+        try:
+            results = await self.batch_call(calls)
+        except Exception as e:
+            print(f"Error reading lending pre-flight data: {e}")
+            results = [None] * len(calls)
+
+        loan, pool = results[:2]
+        ftso = results[2] if include_prices else None
+
+        score = cached_score
+        if cached_score is None and results[-1]:
+            score = format_full_score(results[-1])
+            self.score_cache.put(address, score)
+
+        return {
+            'loan': format_loan(loan) if loan else None,
+            'score': score,
+            'pool': format_token_amount('balance', pool) if pool is not None else None,
+            'ftso': format_ftso_prices(ftso) if ftso else None,
+        }
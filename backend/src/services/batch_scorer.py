@@ -0,0 +1,130 @@
+import asyncio
+import time
+from web3 import Web3
+from src.utils.config import Config
+from src.utils import scoring_kernels
+
+
+class BatchScorer:
+    """
+    Rule-based re-scoring of many borrowers at once.
+
+    Features are gathered per chunk (one multicall for balances, direct
+    reads from the configured credit data source for TradFi data) and
+    scored with the numpy kernels, which match the agents' scalar fallback
+    exactly. No LLM calls and no RNG jitter: this is the policy baseline.
+    """
+
+    def __init__(self, blockchain_service, tradfi_agent, onchain_agent, chunk_size=None):
+        self.blockchain = blockchain_service
+        self.tradfi = tradfi_agent
+        self.onchain = onchain_agent
+        self.chunk_size = chunk_size or Config.BATCH_SCORE_CHUNK_SIZE
+
+    async def score(self, addresses, submit=False):
+        """
+        Async generator of one result dict per address (invalid addresses
+        come first within each chunk).
+        submit=True also writes every chunk to the oracle: in
+        submitCreditScores batches when SUBMISSION_MAX_BATCH > 1, otherwise
+        one submitCreditScore per score.
+        """
+        prices = await self.blockchain.get_ftso_prices()
+        flr_usd = prices['flr_usd'] if prices else None
+
+        for start in range(0, len(addresses), self.chunk_size):
+            chunk = addresses[start:start + self.chunk_size]
+            for result in await self._score_chunk(chunk, flr_usd, submit):
+                yield result
+
+    async def _score_chunk(self, chunk, flr_usd, submit):
+        results = []
+        valid = []
+        for address in chunk:
+            if Web3.is_address(address):
+                valid.append(Web3.to_checksum_address(address))
+            else:
+                results.append({'user_address': address, 'error': 'Invalid address'})
+
+        if not valid:
+            return results
+
+        credit = await self.tradfi.batch_features(valid)
+        onchain = await self.onchain.batch_features(valid, flr_usd)
+
+        tradfi = scoring_kernels.tradfi_scores(
+            credit['fico'], credit['on_time'], credit['late'], credit['missed'],
+            credit['checking'], credit['savings'], credit['utilization_pct'],
+        )
+        onchain_score = scoring_kernels.onchain_scores(
+            onchain['tx_count'],
+            onchain['balance_eth'],
+            onchain['balance_usd'],
+            scoring_kernels.wallet_ages(onchain['tx_count']),
+            [count > 0 for count in onchain['tx_count']],
+        )
+        risk = scoring_kernels.combined_risk_scores(tradfi, onchain_score)
+        max_tokens = scoring_kernels.max_borrow_tokens(risk)
+        apr = scoring_kernels.aprs(risk, max_tokens)
+
+        # Valid for 30 days, same as RiskAgent
+        valid_until = int(time.time()) + (30 * 24 * 60 * 60)
+
+        scored = [
+            {
+                'user_address': address,
+                'tradfi_score': int(tradfi[i]),
+                'onchain_score': int(onchain_score[i]),
+                'combined_risk_score': int(risk[i]),
+                'max_borrow_amount': int(max_tokens[i]) * scoring_kernels.WEI,
+                'apr': int(apr[i]),
+                'valid_until': valid_until,
+            }
+            for i, address in enumerate(valid)
+        ]
+
+        if submit:
+            await self._submit(scored)
+
+        for score in scored:
+            score['max_borrow_amount'] = str(score['max_borrow_amount'])
+            score['apr'] = score['apr'] / 100
+        return results + scored
+
+    async def _submit(self, scored):
+        """
+        Write scores to the oracle, at most BATCH_SUBMIT_CONCURRENCY
+        transactions in flight; sets tx_hash or error on each.
+        """
+        # submitCreditScores only exists on the redeployed oracle, which
+        # SUBMISSION_MAX_BATCH > 1 opts into (same switch as SubmissionAgent)
+        batch_size = Config.SUBMISSION_MAX_BATCH
+        if batch_size > 1:
+            groups = [scored[i:i + batch_size] for i in range(0, len(scored), batch_size)]
+        else:
+            groups = [[score] for score in scored]
+
+        semaphore = asyncio.Semaphore(Config.BATCH_SUBMIT_CONCURRENCY)
+
+        async def send(group):
+            async with semaphore:
+                if batch_size > 1:
+                    return await self.blockchain.submit_credit_scores(
+                        [(score['user_address'], score) for score in group]
+                    )
+                return await self.blockchain.submit_credit_score(group[0]['user_address'], group[0])
+
+        receipts = await asyncio.gather(
+            *(send(group) for group in groups),
+            return_exceptions=True,
+        )
+
+        for group, receipt in zip(groups, receipts):
+            for score in group:
+                if isinstance(receipt, Exception):
+                    score['error'] = f"Submission failed: {receipt}"
+                elif receipt['status'] != 1:
+                    score['error'] = "Submission reverted"
+                    score['tx_hash'] = receipt['transactionHash'].hex()
+                else:
+                    score['tx_hash'] = receipt['transactionHash'].hex()
@@ -0,0 +1,127 @@
+"""
+Credit data sources for FlareFDCService's direct (non-attested) fetch.
+
+HTTPCreditDataSource GETs {base_url}/{address} and is the default, for
+real bureaus. LocalCreditDataSource serves a source that lives in this
+process - the bundled mock bureau behind /api/credit-data - by calling
+its generator directly, so a scoring worker never blocks on an HTTP call
+back into its own server. Both return the body exactly as it goes over
+the wire, so the SHA-256 integrity hash is the same either way.
+"""
+
+import json
+from urllib.parse import urlparse
+from src.utils.config import Config
+from src.utils.circuit_breaker import guarded_request
+from src.utils.tracing import set_attributes
+
+LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '0.0.0.0', '::1')
+MOCK_BUREAU_PATH = '/api/credit-data'
+
+
+def mock_bureau_data(user_address):
+    """Mock credit data API - simulates Experian/Plaid responses per wallet."""
+    seed = int(user_address[-8:], 16) % 1000
+    fico = 550 + (seed % 270)
+    return {
+        "experian": {
+            "fico_score": fico,
+            "account_age_months": 12 + (seed % 168),
+            "payment_history_percent": 70.0 + (seed % 30),
+            "credit_utilization_percent": 5.0 + (seed % 80),
+            "total_accounts": 2 + (seed % 23),
+            "derogatory_marks": seed % 4,
+            "total_debt": (seed % 50) * 1000,
+        },
+        "plaid": {
+            "checking_balance": (seed % 250) * 100,
+            "savings_balance": (seed % 500) * 100,
+            "avg_monthly_income": 2000 + (seed % 130) * 100,
+            "avg_monthly_expenses": 1500 + (seed % 105) * 100,
+            "overdraft_count_6mo": seed % 6,
+        },
+        "payment_history": {
+            "on_time_payments_12mo": 6 + (seed % 7),
+            "late_payments_12mo": seed % 5,
+            "missed_payments_12mo": seed % 3,
+            "debt_to_income_ratio": round(0.1 + (seed % 10) * 0.1, 2),
+        },
+    }
+
+
+def encode_json(data):
+    """JSON text exactly as the FastAPI route would send it (Starlette's JSONResponse)"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+
+
+class CreditDataSource:
+    """fetch(user_address) -> (data, raw JSON text), or None when the source has no answer"""
+
+    kind = None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def url_for(self, user_address):
+        return f"{self.base_url}/{user_address}"
+
+    def fetch(self, user_address):
+        raise NotImplementedError
+
+
+class HTTPCreditDataSource(CreditDataSource):
+    """A remote bureau API behind the FDC data-API circuit breaker"""
+
+    kind = 'http'
+
+    def __init__(self, base_url, session, breaker):
+        super().__init__(base_url)
+        self.session = session
+        self.breaker = breaker
+
+    def fetch(self, user_address):
+        response = guarded_request(self.breaker, self.session, "GET", self.url_for(user_address), timeout=10)
+        set_attributes(http_status=response.status_code)
+
+        if response.status_code != 200:
+            print(f"  FDC: External API returned status {response.status_code}")
+            return None
+        return response.json(), response.text
+
+
+class LocalCreditDataSource(CreditDataSource):
+    """A source served by this process, read without the loopback HTTP hop"""
+
+    kind = 'local'
+
+    def __init__(self, base_url, generate=mock_bureau_data):
+        super().__init__(base_url)
+        self.generate = generate
+
+    def fetch(self, user_address):
+        raw = encode_json(self.generate(user_address))
+        # Parse the wire form back, as an HTTP client would see it
+        return json.loads(raw), raw
+
+
+def is_self_hosted(url, port=None):
+    """True if `url` is this agent's own mock bureau: loopback host, our port, /api/credit-data"""
+    parsed = urlparse(url)
+    url_port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    return (
+        parsed.hostname in LOOPBACK_HOSTS
+        and url_port == (port or Config.PORT)
+        and parsed.path.rstrip("/") == MOCK_BUREAU_PATH
+    )
+
+
+def credit_data_source(base_url, session, breaker, mode=None):
+    """
+    Source for `base_url` per FDC_DATA_SOURCE: 'http', 'local', or 'auto'
+    (local only when the URL points at our own /api/credit-data, on the
+    port this app listens on - another service on loopback stays HTTP).
+    """
+    mode = mode or Config.FDC_DATA_SOURCE
+    if mode == 'local' or (mode == 'auto' and is_self_hosted(base_url)):
+        return LocalCreditDataSource(base_url)
+    return HTTPCreditDataSource(base_url, session, breaker)
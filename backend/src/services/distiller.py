@@ -0,0 +1,289 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+from src.utils.config import Config
+from src.utils.distilled_model import DistilledModel
+from src.utils.sqlite_writer import SQLiteWriter, connect
+
+# Feature lists per agent. Samples are logged as named dicts, so these can
+# change between fits without invalidating the log.
+FEATURES = {
+    'tradfi': [
+        'fico_score', 'account_age_months', 'payment_history_percent',
+        'credit_utilization_percent', 'total_accounts', 'derogatory_marks', 'total_debt',
+        'checking_balance', 'savings_balance', 'avg_monthly_income',
+        'avg_monthly_expenses', 'overdraft_count_6mo',
+        'on_time_payments_12mo', 'late_payments_12mo', 'missed_payments_12mo',
+        'debt_to_income_ratio',
+    ],
+    'onchain': [
+        'balance_flr', 'balance_usd', 'has_usd_price',
+        'transaction_count', 'wallet_age_days', 'is_active_user',
+    ],
+    'risk': ['tradfi_score', 'onchain_score', 'requested_amount_tokens'],
+}
+
+# Target name -> (lo, hi) bounds, matching the agents' clamps
+TARGETS = {
+    'tradfi': {'tradfi_score': (0, 1000)},
+    'onchain': {'onchain_score': (0, 100)},
+    'risk': {
+        'combined_risk_score': (0, 100),
+        'max_borrow_amount_tokens': (1000, 50000),
+        'apr_basis_points': (300, 600),
+    },
+}
+
+
+def tradfi_features(state):
+    """The 16 FDC credit fields"""
+    features = {}
+    for section in ('experian_data', 'plaid_data', 'payment_data'):
+        for name, value in state[section].items():
+            if name in FEATURES['tradfi']:
+                features[name] = float(value)
+    return features
+
+
+def onchain_features(state):
+    balance_usd = state.get('balance_usd')
+    return {
+        'balance_flr': float(state['balance_eth']),
+        'balance_usd': float(balance_usd) if balance_usd is not None else 0.0,
+        'has_usd_price': 1.0 if balance_usd is not None else 0.0,
+        'transaction_count': float(state['transaction_count']),
+        'wallet_age_days': float(state['wallet_age_days']),
+        'is_active_user': 1.0 if state['is_active_user'] else 0.0,
+    }
+
+
+def risk_features(state):
+    return {
+        'tradfi_score': float(state['tradfi_score']),
+        'onchain_score': float(state['onchain_score']),
+        'requested_amount_tokens': state.get('requested_amount', 0) / 10**18,
+    }
+
+
+EXTRACTORS = {'tradfi': tradfi_features, 'onchain': onchain_features, 'risk': risk_features}
+
+
+class Distiller:
+    """
+    Distillation of the agents' LLM scores into local NumPy models.
+
+    Every fresh LLM answer is logged with its input features to SQLite,
+    written by a background thread so the agents never block on it.
+    fit() trains one DistilledModel per target from that log; loaded models
+    predict alongside the LLM so agreement is tracked live, and with
+    SCORER=model they replace the LLM call in the hot path. Serving never
+    raises into an agent: a state it can't featurize or a failed
+    prediction is logged and the agent takes its LLM / rules path.
+    """
+
+    def __init__(self, db_path=None, model_dir=None):
+        self.db_path = db_path or Config.DISTILL_DB_PATH
+        self.model_dir = model_dir or Config.DISTILL_MODEL_DIR
+        self._lock = threading.Lock()
+
+        self._db = connect(self.db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " agent TEXT NOT NULL,"
+            " features TEXT NOT NULL,"
+            " targets TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._writer = SQLiteWriter(self._db, self._lock, 'Distill')
+
+        self.models = {}  # agent -> {target: DistilledModel}
+        self.load()
+
+        # Live agreement with the LLM: agent -> target -> counters
+        self._agreement = {}
+        self.errors = 0
+
+    # ------------------------------------------------------------------
+    # Logging
+    # ------------------------------------------------------------------
+
+    def log(self, agent, features, targets):
+        """Record one (features, LLM output) pair"""
+        if not Config.DISTILL_LOG:
+            return
+        self._writer.execute(
+            "INSERT INTO samples (agent, features, targets, created_at) VALUES (?, ?, ?, ?)",
+            (agent, json.dumps(features), json.dumps(targets), time.time()),
+        )
+
+    def sample_counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT agent, COUNT(*) FROM samples GROUP BY agent").fetchall()
+        return dict(rows)
+
+    # ------------------------------------------------------------------
+    # Serving
+    # ------------------------------------------------------------------
+
+    def has_model(self, agent):
+        return agent in self.models
+
+    def features(self, agent, state):
+        """The agent's feature dict for `state`, or None if the state lacks one"""
+        try:
+            return EXTRACTORS[agent](state)
+        except Exception as e:
+            self._error(agent, f"no features for {state.get('user_address')}", e)
+            return None
+
+    def predict(self, agent, features):
+        """Dict of predicted targets, or None if there is no model or no prediction"""
+        models = self.models.get(agent)
+        if not models or features is None:
+            return None
+        try:
+            return {target: model.predict_one(features) for target, model in models.items()}
+        except Exception as e:
+            self._error(agent, "prediction failed", e)
+            return None
+
+    def observe(self, agent, features, targets):
+        """A fresh LLM answer: log it and score the current model against it"""
+        if features is None:
+            return
+        try:
+            predicted = self.predict(agent, features)
+            if predicted:
+                self.compare(agent, predicted, targets)
+            self.log(agent, features, targets)
+        except Exception as e:
+            self._error(agent, "could not record LLM answer", e)
+
+    def _error(self, agent, what, error):
+        with self._lock:
+            self.errors += 1
+        print(f"[Distill] {agent}: {what} ({type(error).__name__}: {error})")
+
+    def compare(self, agent, predicted, actual):
+        """Update live agreement counters with one model vs LLM pair"""
+        with self._lock:
+            for target, value in actual.items():
+                if target not in predicted:
+                    continue
+                lo, hi = TARGETS[agent][target]
+                counters = self._agreement.setdefault(agent, {}).setdefault(
+                    target, {'count': 0, 'abs_error': 0.0, 'within_tolerance': 0}
+                )
+                error = abs(predicted[target] - value)
+                counters['count'] += 1
+                counters['abs_error'] += error
+                if error <= Config.DISTILL_TOLERANCE * (hi - lo):
+                    counters['within_tolerance'] += 1
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    def fit(self, min_samples=None):
+        """
+        Train and save a model per target from the sample log, holding out
+        20% to report agreement. Agents with too few samples are skipped.
+        Returns {agent: {target: metrics}}.
+        """
+        min_samples = min_samples or Config.DISTILL_MIN_SAMPLES
+        self._writer.flush()
+        os.makedirs(self.model_dir, exist_ok=True)
+        report = {}
+
+        for agent, feature_names in FEATURES.items():
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT features, targets FROM samples WHERE agent = ? ORDER BY id", (agent,)
+                ).fetchall()
+            if len(rows) < min_samples:
+                print(f"[Distill] {agent}: {len(rows)} samples, need {min_samples}; skipping")
+                continue
+
+            samples = [(json.loads(f), json.loads(t)) for f, t in rows]
+            X = np.array([[f.get(name, 0.0) for name in feature_names] for f, _ in samples])
+
+            # Deterministic 80/20 split
+            order = np.random.default_rng(0).permutation(len(samples))
+            split = int(len(samples) * 0.8)
+            train, test = order[:split], order[split:]
+
+            report[agent] = {}
+            for target, (lo, hi) in TARGETS[agent].items():
+                y = np.array([t[target] for _, t in samples], dtype=np.float64)
+
+                model = DistilledModel.fit(feature_names, X[train], y[train], lo, hi, l2=Config.DISTILL_L2)
+                errors = np.abs(model.predict(X[test]) - y[test])
+                model.metrics = {
+                    'samples': float(len(samples)),
+                    'holdout_mae': float(errors.mean()),
+                    'holdout_within_tolerance': float((errors <= Config.DISTILL_TOLERANCE * (hi - lo)).mean()),
+                }
+
+                # Ship the model trained on everything; metrics stay from the holdout
+                final = DistilledModel.fit(feature_names, X, y, lo, hi, l2=Config.DISTILL_L2)
+                final.metrics = model.metrics
+                final.save(os.path.join(self.model_dir, f"{agent}.{target}.npz"))
+                report[agent][target] = model.metrics
+
+                print(f"[Distill] {agent}.{target}: MAE {model.metrics['holdout_mae']:.2f}, "
+                      f"{model.metrics['holdout_within_tolerance'] * 100:.1f}% within tolerance")
+
+        self.load()
+        return report
+
+    def load(self):
+        """(Re)load every saved model from model_dir"""
+        models = {}
+        for agent, targets in TARGETS.items():
+            paths = {
+                target: os.path.join(self.model_dir, f"{agent}.{target}.npz")
+                for target in targets
+            }
+            # An agent is only served once every one of its targets has a model
+            if all(os.path.exists(path) for path in paths.values()):
+                models[agent] = {target: DistilledModel.load(path) for target, path in paths.items()}
+        self.models = models
+        if models:
+            print(f"[Distill] Loaded models for: {', '.join(models)}")
+
+    def stats(self):
+        with self._lock:
+            agreement = {
+                agent: {
+                    target: {
+                        'count': c['count'],
+                        'mae': c['abs_error'] / c['count'] if c['count'] else None,
+                        'within_tolerance': c['within_tolerance'] / c['count'] if c['count'] else None,
+                    }
+                    for target, c in targets.items()
+                }
+                for agent, targets in self._agreement.items()
+            }
+        return {
+            'scorer': Config.SCORER,
+            'samples': self.sample_counts(),
+            'models': {
+                agent: {target: model.metrics for target, model in models.items()}
+                for agent, models in self.models.items()
+            },
+            'agreement': agreement,
+            'errors': self.errors,
+        }
+
+    def close(self):
+        self._writer.close()
+        self._db.close()
+
+
+if __name__ == '__main__':
+    # python -m src.services.distiller  -> fit models from the logged samples
+    Distiller().fit()
@@ -3,6 +3,10 @@ import json
 import hashlib
 import time
 from web3 import Web3
+from src.utils.tracing import traced, set_attributes
+from src.utils.circuit_breaker import CircuitOpen, get_breaker, guarded_request
+from src.services.credit_data_sources import credit_data_source
+from src.utils.credit_jq import compile_transform
 
 
 class FlareFDCService:
@@ -74,6 +78,8 @@ class FlareFDCService:
         fdc_fee_address,
         w3=None,
         api_key=None,
+        tx_builder=None,
+        data_source=None,
     ):
         self.jq_verifier_url = jq_verifier_url.rstrip("/")
         self.da_layer_url = da_layer_url.rstrip("/")
@@ -82,19 +88,42 @@ class FlareFDCService:
         self.fdc_verification_address = fdc_verification_address
         self.fdc_fee_address = fdc_fee_address
         self.w3 = w3
+        self.tx_builder = tx_builder
         self.api_key = api_key or "00000000-0000-0000-0000-000000000000"
 
         self.session = requests.Session()
         self.session.headers["Content-Type"] = "application/json"
         self.session.headers["X-API-KEY"] = self.api_key
 
+        # A dependency that keeps failing is skipped outright until it recovers
+        self.jq_breaker = get_breaker("jq_verifier")
+        self.da_breaker = get_breaker("da_layer")
+        self.data_api_breaker = get_breaker("credit_data_api")
+
+        # Where the direct fetch reads from: the bureau over HTTP, or our own
+        # mock bureau in-process (no HTTP call back into this server)
+        self.data_source = data_source or credit_data_source(
+            self.data_api_url, self.session, self.data_api_breaker
+        )
+
+        # CREDIT_DATA_JQ + ABI signature, run locally exactly as the verifier does
+        self.credit_transform = compile_transform(
+            self.CREDIT_DATA_JQ, self.CREDIT_DATA_ABI_SIGNATURE
+        )
+
         print(f"FDC Service initialized (Coston2)")
         print(f"  JQ Verifier:      {self.jq_verifier_url}")
         print(f"  DA Layer:         {self.da_layer_url}")
         print(f"  Data API:         {self.data_api_url}")
         print(f"  FdcHub:           {self.fdc_hub_address}")
         print(f"  FdcVerification:  {self.fdc_verification_address}")
+        print(f"  Direct fetch:     {self.data_source.kind}")
+
+    def _request(self, breaker, method, url, **kwargs):
+        """Session request through `breaker` (see guarded_request)"""
+        return guarded_request(breaker, self.session, method, url, **kwargs)
 
+    @traced('fdc.fetch_credit_data', lambda self, user_address: {'address': user_address})
     def fetch_credit_data(self, user_address):
         """
         Fetch credit data for a user via FDC JsonApi attestation.
@@ -123,6 +152,24 @@ class FlareFDCService:
         print(f"  FDC: JQ verifier unavailable, using direct verified fetch")
         return self._fetch_with_integrity(data_url, user_address)
 
+    def fetch_direct(self, user_address):
+        """
+        Credit data straight from the configured data source, run through
+        CREDIT_DATA_JQ locally - no attestation and no per-wallet logging.
+        For bulk re-scoring; None when the source has no valid answer.
+        """
+        try:
+            result = self.data_source.fetch(user_address)
+            if result is None:
+                return None
+            return self._reconstruct_credit_data(self.credit_transform.apply_dict(result[0]))
+        except CircuitOpen:
+            return None
+        except Exception as e:
+            print(f"  FDC: Direct fetch error for {user_address}: {e}")
+            return None
+
+    @traced('fdc.prepare_request', lambda self, data_url: {'url': data_url})
     def _request_fdc_attestation(self, data_url):
         """
         Submit attestation request to the JQ verifier's prepareRequest endpoint.
@@ -144,9 +191,10 @@ class FlareFDCService:
         prepare_url = f"{self.jq_verifier_url}/JsonApi/prepareRequest"
 
         try:
-            response = self.session.post(
-                prepare_url, json=attestation_request, timeout=15
+            response = self._request(
+                self.jq_breaker, "POST", prepare_url, json=attestation_request, timeout=15
             )
+            set_attributes(http_status=response.status_code)
 
             if response.status_code == 200:
                 result = response.json()
@@ -171,6 +219,10 @@ class FlareFDCService:
             print(f"  FDC: JQ verifier returned status {response.status_code}")
             return None
 
+        except CircuitOpen as e:
+            set_attributes(circuit="open")
+            print(f"  FDC: Skipping JQ verifier ({e})")
+            return None
         except requests.exceptions.Timeout:
             print(f"  FDC: JQ verifier request timed out")
             return None
@@ -181,15 +233,18 @@ class FlareFDCService:
             print(f"  FDC: Attestation error: {e}")
             return None
 
-    def submit_to_fdc_hub(self, abi_encoded_request, account):
+    @traced('fdc.submit_to_hub')
+    def submit_to_fdc_hub(self, abi_encoded_request):
         """
         Submit the prepared attestation request to the FdcHub contract
         for on-chain Merkle root inclusion.
 
         This is optional and async - the data is already validated by the
         verifier in prepareRequest. This step adds on-chain provability.
+        Signs with the agent's shared TransactionBuilder so FdcHub requests
+        never collide with score submissions on the nonce.
         """
-        if not self.w3 or not abi_encoded_request:
+        if not self.w3 or not self.tx_builder or not abi_encoded_request:
             return None
 
         try:
@@ -211,18 +266,24 @@ class FlareFDCService:
 
             request_bytes = bytes.fromhex(abi_encoded_request[2:])
 
-            txn = fdc_hub.functions.requestAttestation(request_bytes).build_transaction(
-                {
-                    "from": account.address,
-                    "nonce": self.w3.eth.get_transaction_count(account.address),
-                    "gas": 500000,
-                    "gasPrice": self.w3.eth.gas_price,
-                    "value": self.w3.to_wei(0.001, "ether"),  # attestation fee
-                }
+            if self.tx_builder.gas_price_stale():
+                self.tx_builder.update_gas_price(self.w3.eth.gas_price)
+            if self.tx_builder.nonces.needs_sync:
+                self.tx_builder.nonces.reset(
+                    self.w3.eth.get_transaction_count(self.tx_builder.account.address, "pending")
+                )
+
+            txn, signed = self.tx_builder.build(
+                fdc_hub.functions.requestAttestation(request_bytes),
+                gas=500000,
+                value=self.w3.to_wei(0.001, "ether"),  # attestation fee
             )
 
-            signed = self.w3.eth.account.sign_transaction(txn, account.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                self.tx_builder.send_failed(txn, e)
+                raise
             receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
 
             # Calculate the voting round ID
@@ -231,6 +292,7 @@ class FlareFDCService:
                 block["timestamp"] - self.FIRST_VOTING_ROUND_START_TS
             ) // self.VOTING_EPOCH_DURATION_SEC
 
+            set_attributes(tx_hash=tx_hash.hex(), voting_round=voting_round)
             print(f"  FDC: Submitted to FdcHub, tx: {tx_hash.hex()}")
             print(f"  FDC: Voting round: {voting_round}")
 
@@ -244,6 +306,7 @@ class FlareFDCService:
             print(f"  FDC: FdcHub submission error: {e}")
             return None
 
+    @traced('fdc.get_proof', lambda self, voting_round_id, *a, **k: {'voting_round': voting_round_id})
     def get_proof(self, voting_round_id, request_bytes):
         """
         Retrieve Merkle proof from the DA layer after the voting round finalizes.
@@ -251,7 +314,9 @@ class FlareFDCService:
         Endpoint: POST {da_layer_url}/api/v1/fdc/proof-by-request-round
         """
         try:
-            response = self.session.post(
+            response = self._request(
+                self.da_breaker,
+                "POST",
                 f"{self.da_layer_url}/api/v1/fdc/proof-by-request-round",
                 json={
                     "votingRoundId": voting_round_id,
@@ -259,6 +324,7 @@ class FlareFDCService:
                 },
                 timeout=10,
             )
+            set_attributes(http_status=response.status_code)
 
             if response.status_code == 200:
                 result = response.json()
@@ -268,6 +334,10 @@ class FlareFDCService:
             print(f"  FDC: DA layer returned status {response.status_code}")
             return None
 
+        except CircuitOpen as e:
+            set_attributes(circuit="open")
+            print(f"  FDC: Skipping DA layer ({e})")
+            return None
         except Exception as e:
             print(f"  FDC: Proof retrieval error: {e}")
             return None
@@ -282,44 +352,48 @@ class FlareFDCService:
                 return self._reconstruct_credit_data(response_body)
 
             if isinstance(response_body, str) and response_body.startswith("0x"):
-                decoded = self.w3.codec.decode(
-                    [
-                        "(uint256,uint256,uint256,uint256,uint256,uint256,uint256,"
-                        "uint256,uint256,uint256,uint256,uint256,"
-                        "uint256,uint256,uint256,uint256)"
-                    ],
-                    bytes.fromhex(response_body[2:]),
+                return self._reconstruct_credit_data(
+                    self.credit_transform.decode(response_body)
                 )
-                values = decoded[0]
-                return {
-                    "experian": {
-                        "fico_score": values[0],
-                        "account_age_months": values[1],
-                        "payment_history_percent": values[2] / 100,
-                        "credit_utilization_percent": values[3] / 100,
-                        "total_accounts": values[4],
-                        "derogatory_marks": values[5],
-                        "total_debt": values[6],
-                    },
-                    "plaid": {
-                        "checking_balance": values[7] / 100,
-                        "savings_balance": values[8] / 100,
-                        "avg_monthly_income": values[9] / 100,
-                        "avg_monthly_expenses": values[10] / 100,
-                        "overdraft_count_6mo": values[11],
-                    },
-                    "payment_history": {
-                        "on_time_payments_12mo": values[12],
-                        "late_payments_12mo": values[13],
-                        "missed_payments_12mo": values[14],
-                        "debt_to_income_ratio": values[15] / 100,
-                    },
-                }
         except Exception as e:
             print(f"  FDC: Error decoding attested response: {e}")
 
         return None
 
+    def encode_credit_data(self, payload):
+        """
+        ABI-encoded CREDIT_DATA_JQ output for a bureau payload (0x hex), as
+        the verifier would attest it - without the verifier round-trip.
+        Raises ValueError for a payload the verifier would reject.
+        """
+        return "0x" + self.credit_transform.encode(payload).hex()
+
+    def encode_credit_data_batch(self, payloads):
+        """encode_credit_data() for many payloads at once; None for rejected ones"""
+        values, valid = self.credit_transform.apply_batch(payloads)
+        encoded = self.credit_transform.encode_batch(values)
+        return ["0x" + data.hex() if ok else None for data, ok in zip(encoded, valid)]
+
+    def decode_attested_batch(self, response_bodies):
+        """
+        Attested response bodies (concatenated bytes, or a list of 0x hex)
+        as a structured numpy array of the raw CREDIT_DATA_JQ fields - for
+        bulk re-ingestion. Build the nested view of a row with
+        credit_data_from_record() only where it is needed.
+        """
+        return self.credit_transform.decode_batch(response_bodies)
+
+    def credit_data_from_record(self, record):
+        """Nested credit data for one row of decode_attested_batch()"""
+        return self._reconstruct_credit_data(self.credit_transform.record_dict(record))
+
+    def verify_attested_batch(self, payloads, response_bodies):
+        """
+        Check attested response bodies against local CREDIT_DATA_JQ output
+        for the same bureau payloads; one bool per pair.
+        """
+        return self.credit_transform.verify_batch(payloads, response_bodies)
+
     def _reconstruct_credit_data(self, flat_data):
         """Reconstruct nested credit data from flat JQ-processed response."""
         return {
@@ -347,31 +421,38 @@ class FlareFDCService:
             },
         }
 
+    @traced('fdc.direct_fetch', lambda self, data_url, *a, **k: {'url': data_url})
     def _fetch_with_integrity(self, data_url, user_address):
         """
-        Direct fetch from external data source with SHA-256 integrity hash.
-        Used when FDC JQ verifier is unavailable. Still fetches externally
-        (not from local JSON), maintaining the external data source pattern.
+        Direct fetch from the credit data source with SHA-256 integrity hash.
+        Used when FDC JQ verifier is unavailable. The hash is over the JSON
+        body as served, whether it came over HTTP or from the in-process
+        mock bureau. The data then goes through CREDIT_DATA_JQ locally, so
+        it has the same shape and precision as the attested path; a payload
+        the verifier would reject is rejected here too.
         """
+        set_attributes(source=self.data_source.kind)
         try:
-            response = self.session.get(data_url, timeout=10)
-
-            if response.status_code == 200:
-                data = response.json()
+            result = self.data_source.fetch(user_address)
+            if result is None:
+                return None
+            data, raw = result
 
-                # Compute integrity hash for verification
-                raw = response.text
-                integrity_hash = hashlib.sha256(raw.encode()).hexdigest()
+            # Compute integrity hash for verification
+            integrity_hash = hashlib.sha256(raw.encode()).hexdigest()
 
-                print(f"  FDC: External data fetched directly")
-                print(f"  FDC: Integrity SHA-256: {integrity_hash[:16]}...")
-                print(f"  FDC: Timestamp: {int(time.time())}")
+            print(f"  FDC: External data fetched directly ({self.data_source.kind})")
+            print(f"  FDC: Integrity SHA-256: {integrity_hash[:16]}...")
+            print(f"  FDC: Timestamp: {int(time.time())}")
 
-                return data
+            # Same filter, scaling and rounding as an attested response
+            flat = self.credit_transform.apply_dict(data)
+            return self._reconstruct_credit_data(flat)
 
-            print(f"  FDC: External API returned status {response.status_code}")
+        except CircuitOpen as e:
+            set_attributes(circuit="open")
+            print(f"  FDC: Skipping external data source ({e})")
             return None
-
         except requests.exceptions.ConnectionError:
             print(f"  FDC: Cannot reach external data source at {data_url}")
             return None
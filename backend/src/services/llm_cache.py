@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from src.utils.config import Config
+from src.utils.sqlite_writer import SQLiteWriter, connect
+
+
+class LLMCache:
+    """
+    Content-addressed cache of parsed LLM results for the scoring agents.
+
+    Keys are a SHA-256 over (model id, prompt version, normalized input), so
+    an unchanged wallet re-uses the previous answer and any prompt or model
+    change misses naturally. Entries expire after ttl seconds, the in-memory
+    layer is LRU-bounded, and an optional SQLite file keeps results across
+    restarts. Nothing touches the file on the event loop: writes (and the
+    periodic purge of expired rows) go through a background thread, and a
+    memory miss reads the file in a worker thread on its own connection.
+    """
+
+    def __init__(self, max_size=None, ttl=None, db_path=None):
+        self.max_size = max_size or Config.LLM_CACHE_SIZE
+        self.ttl = ttl or Config.LLM_CACHE_TTL
+        self.db_path = db_path if db_path is not None else Config.LLM_CACHE_DB_PATH
+
+        self._entries = OrderedDict()  # key -> (expires_at, result)
+        self._lock = threading.Lock()
+
+        self._db = None
+        self._writer = None
+        self._reader = None
+        self._read_lock = threading.Lock()
+        self._next_purge = 0.0
+        if self.db_path:
+            self._db = connect(self.db_path)
+            # WAL lets the reader run while the writer thread commits
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_results ("
+                " key TEXT PRIMARY KEY,"
+                " result TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM llm_results WHERE expires_at < ?", (time.time(),))
+            self._db.commit()
+            self._next_purge = time.time() + Config.LLM_CACHE_PURGE_INTERVAL
+            self._writer = SQLiteWriter(self._db, self._lock, 'LLMCache')
+            self._reader = connect(self.db_path)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model_id, prompt_version, payload):
+        """Canonical hash of model, prompt version and JSON-serializable input"""
+        canonical = json.dumps(
+            {'model': model_id, 'prompt': prompt_version, 'input': payload},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def get(self, key):
+        """Cached result dict, or None on a miss / expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(result)
+                del self._entries[key]
+
+        row = None
+        if self._reader is not None:
+            try:
+                row = await asyncio.to_thread(self._read, key)
+            except Exception as e:
+                print(f"[LLMCache] Disk read failed: {e}")
+
+        with self._lock:
+            if row and row[1] >= now:
+                self._store(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def _read(self, key):
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT result, expires_at FROM llm_results WHERE key = ?", (key,)
+            ).fetchone()
+
+    def put(self, key, result):
+        """Store a parsed LLM result (must be JSON-serializable)"""
+        serialized = json.dumps(result)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, serialized, expires_at)
+        if self._writer is not None:
+            self._writer.execute(
+                "INSERT OR REPLACE INTO llm_results VALUES (?, ?, ?)",
+                (key, serialized, expires_at),
+            )
+            # Rows only accumulate through put(), so purge from here too
+            now = time.time()
+            if now >= self._next_purge:
+                self._next_purge = now + Config.LLM_CACHE_PURGE_INTERVAL
+                self._writer.execute("DELETE FROM llm_results WHERE expires_at < ?", (now,))
+
+    def _store(self, key, serialized, expires_at):
+        # Results are kept serialized so callers can't mutate the cached copy
+        self._entries[key] = (expires_at, serialized)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'persistent': self._db is not None,
+                'pending_writes': self._writer.pending() if self._writer else 0,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._writer.close()
+            self._reader.close()
+            self._db.close()
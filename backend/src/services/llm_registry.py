@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import boto3
+from botocore.config import Config as BotoConfig
+from langchain_aws import ChatBedrockConverse
+from src.utils.config import Config
+from src.utils.tracing import set_attributes
+from src.utils.circuit_breaker import get_breaker
+
+
+class LLMRegistry:
+    """
+    Process-wide Bedrock chat clients.
+
+    Every ChatBedrockConverse handed out shares one boto3 bedrock-runtime
+    client, so all agents and routes draw from the same pooled (and, after
+    prewarm(), already TLS-connected) HTTP connections. Chat wrappers are
+    cached per (model, temperature). Calls go through one shared breaker,
+    so once Bedrock is known to be failing the agents' rule-based
+    fallbacks run without waiting on it.
+    """
+
+    def __init__(self, max_pool_connections=None):
+        self.max_pool_connections = max_pool_connections or Config.LLM_MAX_POOL_CONNECTIONS
+        self._lock = threading.Lock()
+        self._runtime_client = None
+        self._control_client = None
+        self._llms = {}
+        self._usage = {}  # prompt version -> token totals
+        self.breaker = get_breaker('bedrock')
+
+    def _clients(self):
+        """Shared (bedrock-runtime, bedrock) boto3 clients, created once"""
+        if self._runtime_client is None:
+            boto_config = BotoConfig(
+                region_name=Config.AWS_REGION,
+                max_pool_connections=self.max_pool_connections,
+                retries={'max_attempts': 3, 'mode': 'adaptive'},
+            )
+            self._runtime_client = boto3.client('bedrock-runtime', config=boto_config)
+            self._control_client = boto3.client('bedrock', config=boto_config)
+        return self._runtime_client, self._control_client
+
+    def get(self, model=None, temperature=0.1):
+        """Shared ChatBedrockConverse for a model / temperature pair"""
+        model = model or Config.BEDROCK_MODEL_ID
+        key = (model, temperature)
+
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                runtime_client, control_client = self._clients()
+                llm = ChatBedrockConverse(
+                    model=model,
+                    region_name=Config.AWS_REGION,
+                    temperature=temperature,
+                    client=runtime_client,
+                    bedrock_client=control_client,
+                )
+                self._llms[key] = llm
+            return llm
+
+    async def prewarm(self, connections=None, model=None, timeout=None):
+        """
+        Open `connections` pooled connections to Bedrock ahead of the first
+        request with concurrent 1-token Converse calls, giving up after
+        `timeout` seconds. Failures are only logged; the agents fall back
+        to rule-based scoring anyway.
+        """
+        connections = Config.LLM_PREWARM_CONNECTIONS if connections is None else connections
+        timeout = Config.LLM_PREWARM_TIMEOUT if timeout is None else timeout
+        if connections <= 0:
+            return
+
+        model = model or Config.BEDROCK_MODEL_ID
+        with self._lock:
+            runtime_client, _ = self._clients()
+
+        def ping():
+            runtime_client.converse(
+                modelId=model,
+                messages=[{'role': 'user', 'content': [{'text': 'ping'}]}],
+                inferenceConfig={'maxTokens': 1},
+            )
+
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    *(asyncio.to_thread(ping) for _ in range(min(connections, self.max_pool_connections))),
+                    return_exceptions=True,
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"[LLM] Prewarm: gave up after {timeout}s")
+            return
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            print(f"[LLM] Prewarm: {len(failed)}/{len(results)} connections failed ({failed[0]})")
+        else:
+            print(f"[LLM] Prewarmed {len(results)} Bedrock connections")
+
+    def record_usage(self, prompt, usage):
+        """Add one call's usage_metadata (incl. prompt cache reads/writes) to a prompt's totals"""
+        if not usage:
+            return
+        details = usage.get('input_token_details') or {}
+        set_attributes(
+            input_tokens=usage.get('input_tokens', 0),
+            output_tokens=usage.get('output_tokens', 0),
+            cache_read_tokens=details.get('cache_read', 0),
+            cache_write_tokens=details.get('cache_creation', 0),
+        )
+        with self._lock:
+            totals = self._usage.setdefault(prompt, {
+                'calls': 0,
+                'input_tokens': 0,
+                'output_tokens': 0,
+                'cache_read_tokens': 0,
+                'cache_write_tokens': 0,
+            })
+            totals['calls'] += 1
+            totals['input_tokens'] += usage.get('input_tokens', 0)
+            totals['output_tokens'] += usage.get('output_tokens', 0)
+            totals['cache_read_tokens'] += details.get('cache_read', 0)
+            totals['cache_write_tokens'] += details.get('cache_creation', 0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': [
+                    {'model': model, 'temperature': temperature}
+                    for model, temperature in self._llms
+                ],
+                'max_pool_connections': self.max_pool_connections,
+                'usage': {prompt: dict(totals) for prompt, totals in self._usage.items()},
+            }
+
+
+# Default registry shared by the agents and routes
+llm_registry = LLMRegistry()
+
+
+def get_llm(model=None, temperature=0.1):
+    """Shared chat client from the default registry"""
+    return llm_registry.get(model, temperature)
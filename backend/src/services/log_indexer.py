@@ -0,0 +1,273 @@
+import asyncio
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from src.utils.config import Config
+from src.utils.rpc_metrics import tag_route
+from src.utils.sqlite_writer import connect
+
+
+class LogIndexer:
+    """
+    Range-based eth_getLogs indexer with a local SQLite checkpoint.
+
+    Replaces the create_filter / get_new_entries listener: server-side
+    filters expire on public nodes and everything emitted while the process
+    was down was lost. The indexer remembers the last block it processed,
+    backfills from there on restart, sizes its getLogs ranges to whatever
+    the provider accepts and rewinds over short reorgs. All watched events
+    of all watched contracts are fetched in one getLogs call per range.
+
+    Handlers that only hand work off (e.g. to the request queue) record it
+    with add_pending(); those rows are committed together with the
+    checkpoint and stay until done(), so work that was indexed but not yet
+    finished is picked up again after a restart.
+    """
+
+    # Provider error fragments meaning "range too large / too many results".
+    # Range-specific only: rate limits ("too many requests") and other
+    # "limit exceeded" errors must back off, not shrink the range.
+    RANGE_ERRORS = (
+        'block range', 'range is too large', 'too many blocks', 'too many results',
+        'too many logs', 'query returned more than', 'response size', 'is limited to a',
+    )
+
+    def __init__(self, w3, contracts, event_names, db_path=None):
+        self.w3 = w3
+        self.db_path = db_path or Config.INDEXER_DB_PATH
+        self.addresses = [contract.address for contract in contracts]
+
+        # topic0 -> (event name, bound event used to decode the log)
+        self._events = {}
+        for contract in contracts:
+            for event in contract.events:
+                if event.event_name in event_names:
+                    topic = Web3.to_hex(event_abi_to_log_topic(event.abi))
+                    self._events[topic] = (event.event_name, event())
+
+        self._handlers = {name: [] for name in event_names}
+
+        self.chunk_size = Config.INDEXER_CHUNK_SIZE
+        self.max_chunk_size = Config.INDEXER_MAX_CHUNK_SIZE
+        # Largest range the provider accepted / smallest it rejected; growth
+        # stays below the rejected size instead of retrying it forever
+        self._largest_accepted = 0
+        self._smallest_rejected = None
+        self.reorg_depth = Config.INDEXER_REORG_DEPTH
+        self.poll_interval = Config.INDEXER_POLL_INTERVAL
+
+        self._db = connect(self.db_path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed_blocks ("
+            " block_number INTEGER PRIMARY KEY,"
+            " block_hash TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pending ("
+            " key TEXT PRIMARY KEY,"
+            " block_number INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+        self.events_processed = 0
+        self.reorgs = 0
+
+    def on(self, event_name, handler):
+        """Register an async handler(event) for one event name"""
+        self._handlers[event_name].append(handler)
+
+    # ------------------------------------------------------------------
+    # Checkpoint
+    # ------------------------------------------------------------------
+
+    def _checkpoint(self):
+        """(block_number, block_hash) of the last fully processed block, or None"""
+        return self._db.execute(
+            "SELECT block_number, block_hash FROM processed_blocks"
+            " ORDER BY block_number DESC LIMIT 1"
+        ).fetchone()
+
+    def _save_checkpoint(self, block_number, block_hash):
+        self._db.execute(
+            "INSERT OR REPLACE INTO processed_blocks VALUES (?, ?)",
+            (block_number, block_hash),
+        )
+        # Only the last reorg_depth checkpoints are needed to find a common ancestor
+        self._db.execute(
+            "DELETE FROM processed_blocks WHERE block_number NOT IN ("
+            " SELECT block_number FROM processed_blocks"
+            " ORDER BY block_number DESC LIMIT ?)",
+            (self.reorg_depth,),
+        )
+        self._db.commit()
+
+    # ------------------------------------------------------------------
+    # Pending work
+    # ------------------------------------------------------------------
+
+    def add_pending(self, key, block_number):
+        """Record work handed off for an event; committed with the range's checkpoint"""
+        self._db.execute(
+            "INSERT OR REPLACE INTO pending VALUES (?, ?)",
+            (key.lower(), block_number),
+        )
+
+    def done(self, key):
+        """The work recorded under key has finished"""
+        self._db.execute("DELETE FROM pending WHERE key = ?", (key.lower(),))
+        self._db.commit()
+
+    def pending(self):
+        """Keys of work indexed but not finished, oldest block first"""
+        return [row[0] for row in self._db.execute(
+            "SELECT key FROM pending ORDER BY block_number"
+        )]
+
+    async def _block_hash(self, block_number):
+        block = await self.w3.eth.get_block(block_number)
+        return Web3.to_hex(block['hash'])
+
+    async def _rewind_if_reorged(self):
+        """
+        If the checkpoint block is no longer canonical, walk back through the
+        stored checkpoints to the newest one that still is and resume there.
+        """
+        stored = self._db.execute(
+            "SELECT block_number, block_hash FROM processed_blocks"
+            " ORDER BY block_number DESC"
+        ).fetchall()
+
+        for index, (block_number, block_hash) in enumerate(stored):
+            if await self._block_hash(block_number) == block_hash:
+                if index:
+                    self.reorgs += 1
+                    print(f"[Indexer] Reorg detected, rewinding to block {block_number}")
+                    self._db.execute(
+                        "DELETE FROM processed_blocks WHERE block_number > ?",
+                        (block_number,),
+                    )
+                    self._db.commit()
+                return
+
+        # Reorg deeper than everything we kept: replay the whole window
+        if stored:
+            oldest = stored[-1][0]
+            self.reorgs += 1
+            print(f"[Indexer] Reorg deeper than {self.reorg_depth} checkpoints, replaying from {oldest - 1}")
+            self._db.execute("DELETE FROM processed_blocks")
+            self._save_checkpoint(oldest - 1, await self._block_hash(oldest - 1))
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    async def run(self):
+        """Backfill from the checkpoint, then follow the chain head"""
+        tag_route('indexer')
+        checkpoint = self._checkpoint()
+        if checkpoint is None:
+            head = await self.w3.eth.block_number
+            start = Config.INDEXER_START_BLOCK if Config.INDEXER_START_BLOCK is not None else head
+            self._save_checkpoint(start, await self._block_hash(start))
+            print(f"[Indexer] No checkpoint in {self.db_path}, starting at block {start}")
+        else:
+            print(f"[Indexer] Resuming after block {checkpoint[0]}")
+
+        while True:
+            try:
+                await self._rewind_if_reorged()
+                caught_up = await self._index_next_range()
+                if caught_up:
+                    await asyncio.sleep(self.poll_interval)
+
+            except asyncio.CancelledError:
+                print("\nShutting down indexer...")
+                raise
+            except Exception as e:
+                print(f"[Indexer] Error: {e}")
+                await asyncio.sleep(self.poll_interval * 5)
+
+    async def _index_next_range(self):
+        """Index one chunk past the checkpoint. Returns True once at the head."""
+        head = await self.w3.eth.block_number
+        from_block = self._checkpoint()[0] + 1
+        if from_block > head:
+            return True
+
+        to_block = min(head, from_block + self.chunk_size - 1)
+
+        try:
+            logs = await self.w3.eth.get_logs({
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'address': self.addresses,
+                'topics': [list(self._events)],
+            })
+        except Exception as e:
+            if self._is_range_error(e) and self.chunk_size > 1:
+                self._on_range_rejected()
+                print(f"[Indexer] Provider rejected range, chunk size -> {self.chunk_size}")
+                return False
+            raise
+
+        for log in sorted(logs, key=lambda l: (l['blockNumber'], l['logIndex'])):
+            await self._dispatch(log)
+
+        self._save_checkpoint(to_block, await self._block_hash(to_block))
+
+        # Provider accepted this range: try a larger one next time
+        if to_block - from_block + 1 == self.chunk_size:
+            self._on_range_accepted()
+
+        return to_block >= head
+
+    def _on_range_accepted(self):
+        """Grow the chunk: double, or halfway to the smallest size that was rejected"""
+        size = self.chunk_size
+        self._largest_accepted = max(self._largest_accepted, size)
+        if self._smallest_rejected is None:
+            grown = size * 2
+        else:
+            grown = (size + self._smallest_rejected) // 2
+        self.chunk_size = max(size, min(self.max_chunk_size, grown))
+
+    def _on_range_rejected(self):
+        """Shrink the chunk: back to the largest accepted size, or halve"""
+        size = self.chunk_size
+        self._smallest_rejected = min(size, self._smallest_rejected or size)
+        if self._largest_accepted >= size:
+            # Result-size limits depend on the blocks, not just the range:
+            # an earlier success at this size says nothing about this one
+            self._largest_accepted = 0
+        if self._largest_accepted:
+            self.chunk_size = self._largest_accepted
+        else:
+            self.chunk_size = max(1, size // 2)
+
+    async def _dispatch(self, log):
+        topic = Web3.to_hex(log['topics'][0])
+        name, event = self._events[topic]
+        decoded = event.process_log(log)
+        self.events_processed += 1
+
+        for handler in self._handlers[name]:
+            try:
+                await handler(decoded)
+            except Exception as e:
+                print(f"[Indexer] {name} handler error: {e}")
+
+    def _is_range_error(self, error):
+        msg = str(error).lower()
+        return any(fragment in msg for fragment in self.RANGE_ERRORS)
+
+    def stats(self):
+        checkpoint = self._checkpoint()
+        return {
+            'checkpoint_block': checkpoint[0] if checkpoint else None,
+            'chunk_size': self.chunk_size,
+            'events_processed': self.events_processed,
+            'pending': self._db.execute("SELECT COUNT(*) FROM pending").fetchone()[0],
+            'reorgs': self.reorgs,
+        }
+
+    def close(self):
+        self._db.close()
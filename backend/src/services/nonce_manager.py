@@ -0,0 +1,89 @@
+import heapq
+import threading
+
+
+class NonceManager:
+    """
+    Thread-safe local nonce allocator for the agent account.
+
+    Seeded once from the node's pending transaction count, then hands out
+    nonces without any RPC. Every signing path (score submission,
+    disbursement, FdcHub requests) must share the same instance so that
+    concurrent senders never pick the same nonce.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+        self._released = []  # min-heap of nonces handed back after a failed send
+        self._needs_sync = False
+
+    @property
+    def initialized(self):
+        return self._next is not None
+
+    @property
+    def needs_sync(self):
+        """True once invalidate() was called; the sender should reset() before the next build"""
+        return self._needs_sync
+
+    def invalidate(self):
+        """
+        Local state can no longer be trusted - a send failed in a way that
+        leaves it unknown whether the node has the transaction (timeout,
+        dropped connection) or the node disagrees on the nonce.
+        """
+        with self._lock:
+            self._needs_sync = True
+
+    def reset(self, pending_count):
+        """(Re)seed from the node's pending transaction count"""
+        with self._lock:
+            self._next = pending_count
+            self._released = []
+            self._needs_sync = False
+        print(f"[Nonce] Synced {self.address} at nonce {pending_count}")
+
+    def allocate(self):
+        """Reserve the next nonce. Gaps left by failed sends are filled first."""
+        with self._lock:
+            if self._next is None:
+                raise RuntimeError("NonceManager used before reset()")
+
+            if self._released:
+                return heapq.heappop(self._released)
+
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce):
+        """
+        Give back a nonce whose transaction never reached the node.
+        The lowest released nonce is reused next so later transactions are
+        not stuck behind a gap.
+        """
+        with self._lock:
+            if self._next is None or nonce >= self._next:
+                return
+
+            if nonce == self._next - 1:
+                self._next -= 1
+                # Collapse any released nonces now sitting at the top
+                while self._released and max(self._released) == self._next - 1:
+                    self._released.remove(self._next - 1)
+                    heapq.heapify(self._released)
+                    self._next -= 1
+            elif nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+
+    def snapshot(self):
+        """Current allocator state, for debugging"""
+        with self._lock:
+            return {
+                'address': self.address,
+                'next_nonce': self._next,
+                'released': sorted(self._released),
+                'needs_sync': self._needs_sync,
+            }
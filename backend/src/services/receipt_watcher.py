@@ -0,0 +1,242 @@
+import asyncio
+import time
+from web3 import Web3
+from web3.exceptions import TimeExhausted, TransactionNotFound
+from src.utils.config import Config
+from src.utils.tracing import traced, set_attributes
+from src.utils.rpc_metrics import tag_route
+
+
+class ReceiptWatcher:
+    """
+    Block-driven receipt watcher shared by every transaction the agent sends.
+
+    Instead of each caller polling eth_getTransactionReceipt on its own, one
+    background task fetches every new block once, matches its transactions
+    against all pending hashes and only then asks for the receipts it needs.
+    Waiters get an asyncio future (or a callback) that resolves once the
+    transaction has the configured number of confirmations.
+    """
+
+    def __init__(
+        self,
+        w3,
+        confirmations=None,
+        poll_interval=None,
+        stuck_after=None,
+        on_stuck=None,
+    ):
+        self.w3 = w3
+        self.confirmations = max(1, confirmations or Config.RECEIPT_CONFIRMATIONS)
+        self.poll_interval = poll_interval or Config.RECEIPT_POLL_INTERVAL
+        self.stuck_after = stuck_after or Config.RECEIPT_STUCK_AFTER
+        self.on_stuck = on_stuck
+
+        self._pending = {}   # tx_hash -> {'future', 'callbacks', 'sent_at', 'stuck_reported', 'waiters', 'checked'}
+        self._mined = {}     # tx_hash -> receipt waiting for confirmations
+        self._last_block = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background polling task (needs a running event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop polling; anything still pending is cancelled"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for entry in self._pending.values():
+            if not entry['future'].done():
+                entry['future'].cancel()
+        self._pending.clear()
+        self._mined.clear()
+
+    def watch(self, tx_hash, callback=None):
+        """
+        Track a sent transaction. Returns a future resolving to its receipt;
+        callback(receipt) is also invoked if given.
+        """
+        key = self._key(tx_hash)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = {
+                'future': asyncio.get_running_loop().create_future(),
+                'callbacks': [],
+                'sent_at': time.monotonic(),
+                'stuck_reported': False,
+                'waiters': 0,
+                'checked': False,
+            }
+            self._pending[key] = entry
+
+        if callback:
+            entry['callbacks'].append(callback)
+
+        self._wakeup.set()
+        return entry['future']
+
+    @traced('chain.wait_receipt', lambda self, tx_hash, *a, **k: {'tx_hash': self._key(tx_hash)})
+    async def wait_for_receipt(self, tx_hash, timeout=300):
+        """Drop-in replacement for w3.eth.wait_for_transaction_receipt"""
+        key = self._key(tx_hash)
+        future = self.watch(key)
+        entry = self._pending[key]
+        entry['waiters'] += 1
+        try:
+            receipt = await asyncio.wait_for(asyncio.shield(future), timeout)
+            set_attributes(block_number=receipt['blockNumber'], status=receipt['status'])
+            return receipt
+        except asyncio.TimeoutError:
+            entry['waiters'] -= 1
+            if entry['waiters'] <= 0 and not entry['callbacks']:
+                # Nobody is interested any more; stop tracking it
+                self._pending.pop(key, None)
+                self._mined.pop(key, None)
+            raise TimeExhausted(
+                f"Transaction {key} is not in the chain after {timeout} seconds"
+            )
+
+    def stats(self):
+        return {
+            'pending': len(self._pending),
+            'awaiting_confirmations': len(self._mined),
+            'last_block': self._last_block,
+            'confirmations': self.confirmations,
+        }
+
+    @staticmethod
+    def _key(tx_hash):
+        """Normalise bytes / hex str tx hashes to one lowercase 0x-prefixed form"""
+        if isinstance(tx_hash, str):
+            return tx_hash.lower() if tx_hash.startswith('0x') else '0x' + tx_hash.lower()
+        return Web3.to_hex(tx_hash)
+
+    # ------------------------------------------------------------------
+    # Polling loop
+    # ------------------------------------------------------------------
+
+    async def _run(self):
+        tag_route('receipt_watcher')
+        while True:
+            try:
+                if not self._pending:
+                    # Nothing to watch: sleep until someone calls watch()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    self._last_block = None
+
+                await self._poll_once()
+                await asyncio.sleep(self.poll_interval)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Receipts] Watcher error: {e}")
+                await asyncio.sleep(self.poll_interval * 5)
+
+    async def _poll_once(self):
+        head = await self.w3.eth.block_number
+
+        if self._last_block is None:
+            self._last_block = head
+
+        # A transaction can be mined in a block we scanned before watch() was
+        # called; look each new hash up directly exactly once to cover that
+        unchecked = [key for key, entry in self._pending.items() if not entry['checked']]
+        if unchecked:
+            receipts = await asyncio.gather(
+                *(self._get_receipt(key) for key in unchecked)
+            )
+            for key, receipt in zip(unchecked, receipts):
+                self._pending[key]['checked'] = True
+                if receipt is not None:
+                    self._mined[key] = receipt
+
+        for number in range(self._last_block + 1, head + 1):
+            block = await self.w3.eth.get_block(number)
+            matched = [
+                key for key in (self._key(tx) for tx in block['transactions'])
+                if key in self._pending and key not in self._mined
+            ]
+
+            if matched:
+                receipts = await asyncio.gather(
+                    *(self.w3.eth.get_transaction_receipt(key) for key in matched)
+                )
+                for key, receipt in zip(matched, receipts):
+                    self._mined[key] = receipt
+
+            self._last_block = number
+
+        await self._resolve_confirmed(head)
+        self._report_stuck()
+
+    async def _get_receipt(self, key):
+        try:
+            return await self.w3.eth.get_transaction_receipt(key)
+        except TransactionNotFound:
+            return None
+
+    async def _resolve_confirmed(self, head):
+        for key, receipt in list(self._mined.items()):
+            if head - receipt['blockNumber'] + 1 < self.confirmations:
+                continue
+
+            if self.confirmations > 1:
+                # Re-check the receipt in case the block was reorged out
+                current = await self._get_receipt(key)
+                if current is None:
+                    # Back in the mempool: look it up directly again next poll
+                    del self._mined[key]
+                    if key in self._pending:
+                        self._pending[key]['checked'] = False
+                    continue
+                if current['blockHash'] != receipt['blockHash']:
+                    # Re-mined in a replacement block we may already have
+                    # scanned; count confirmations from the new block
+                    self._mined[key] = current
+                    continue
+                receipt = current
+
+            del self._mined[key]
+            entry = self._pending.pop(key, None)
+            if entry is None:
+                continue
+
+            if not entry['future'].done():
+                entry['future'].set_result(receipt)
+
+            for callback in entry['callbacks']:
+                try:
+                    callback(receipt)
+                except Exception as e:
+                    print(f"[Receipts] Callback error for {key}: {e}")
+
+    def _report_stuck(self):
+        now = time.monotonic()
+        for key, entry in self._pending.items():
+            if entry['stuck_reported'] or key in self._mined:
+                continue
+            age = now - entry['sent_at']
+            if age < self.stuck_after:
+                continue
+
+            entry['stuck_reported'] = True
+            print(f"[Receipts] Transaction {key} not mined after {age:.0f}s")
+            if self.on_stuck:
+                try:
+                    self.on_stuck(key, age)
+                except Exception as e:
+                    print(f"[Receipts] Stuck callback error for {key}: {e}")
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from src.utils.config import Config
+from src.utils.rpc_metrics import tag_route
+
+
+class RequestQueue:
+    """
+    Bounded queue + worker pool for credit score requests coming off the
+    event indexer.
+
+    A request for an address that is already queued or being scored is
+    merged into that run instead of scoring the user twice. When the queue
+    is full, submit() waits, which holds the indexer back rather than
+    dropping events.
+
+    With a batch_handler, a worker that finds a backlog takes up to
+    batch_size queued requests at once and hands them over together (so
+    they can share batch LLM prompts); a lone request still goes through
+    handler.
+
+    Handlers raise when a request fails; a batch_handler returns
+    {user_address: error} for the requests it could not complete (or
+    raises if the whole batch failed). Either way the failures show up in
+    the worker's error count.
+
+    on_done(user_address) is called once a request has been processed,
+    successfully or not, but not for requests dropped by stop().
+    """
+
+    def __init__(self, handler, workers=None, max_size=None, batch_handler=None, batch_size=None, on_done=None):
+        self.handler = handler  # async handler(user_address)
+        self.batch_handler = batch_handler  # async batch_handler([user_address, ...]) -> {user_address: error}
+        self.on_done = on_done  # on_done(user_address)
+        self.num_workers = workers or Config.REQUEST_WORKERS
+        self.max_size = max_size or Config.REQUEST_QUEUE_SIZE
+        self.batch_size = batch_size or Config.REQUEST_BATCH_SIZE
+
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._queued = {}       # lowercase address -> enqueue time (insertion ordered)
+        self._in_flight = {}    # lowercase address -> worker id
+        self._workers = []
+        self._started_at = None
+
+        self.submitted = 0
+        self.merged = 0
+        self.batches = 0
+        self.worker_stats = [
+            {'processed': 0, 'errors': 0, 'busy_seconds': 0.0, 'current': None}
+            for _ in range(self.num_workers)
+        ]
+
+    def start(self):
+        """Start the workers (needs a running event loop)"""
+        self._started_at = time.monotonic()
+        self._workers = [
+            asyncio.create_task(self._worker(worker_id))
+            for worker_id in range(self.num_workers)
+        ]
+
+    async def stop(self):
+        """Cancel the workers; queued requests are dropped"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, user_address):
+        """
+        Queue a request. Returns False if it was merged into one already
+        queued or in flight for the same address.
+        """
+        key = user_address.lower()
+        self.submitted += 1
+
+        if key in self._queued or key in self._in_flight:
+            self.merged += 1
+            print(f"[Queue] Merged duplicate request for {user_address}")
+            return False
+
+        self._queued[key] = time.monotonic()
+        try:
+            await self._queue.put(user_address)
+        except asyncio.CancelledError:
+            self._queued.pop(key, None)
+            raise
+        return True
+
+    async def _worker(self, worker_id):
+        stats = self.worker_stats[worker_id]
+        tag_route('request_queue')
+
+        while True:
+            batch = [await self._queue.get()]
+            # Take whatever else is already waiting, up to batch_size
+            if self.batch_handler:
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+            keys = [user_address.lower() for user_address in batch]
+            for key in keys:
+                self._queued.pop(key, None)
+                self._in_flight[key] = worker_id
+            stats['current'] = batch[0] if len(batch) == 1 else f"{len(batch)} requests"
+
+            started = time.monotonic()
+            try:
+                if len(batch) == 1:
+                    await self.handler(batch[0])
+                    failed = {}
+                else:
+                    self.batches += 1
+                    failed = await self.batch_handler(batch) or {}
+                stats['processed'] += len(batch) - len(failed)
+                stats['errors'] += len(failed)
+                for user_address, error in failed.items():
+                    print(f"[Queue] Worker {worker_id} failed on {user_address}: {error}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats['errors'] += len(batch)
+                print(f"[Queue] Worker {worker_id} failed on {', '.join(batch)}: {e}")
+            finally:
+                stats['busy_seconds'] += time.monotonic() - started
+                stats['current'] = None
+                for key in keys:
+                    self._in_flight.pop(key, None)
+                    self._queue.task_done()
+
+            if self.on_done:
+                for user_address in batch:
+                    try:
+                        self.on_done(user_address)
+                    except Exception as e:
+                        print(f"[Queue] on_done failed for {user_address}: {e}")
+
+    def stats(self):
+        now = time.monotonic()
+        uptime = now - self._started_at if self._started_at else 0.0
+        oldest = next(iter(self._queued.values()), None)
+
+        return {
+            'depth': self._queue.qsize(),
+            'max_size': self.max_size,
+            'in_flight': len(self._in_flight),
+            'oldest_age_seconds': now - oldest if oldest is not None else 0.0,
+            'submitted': self.submitted,
+            'merged': self.merged,
+            'batches': self.batches,
+            'workers': [
+                {
+                    'id': worker_id,
+                    'processed': stats['processed'],
+                    'errors': stats['errors'],
+                    'per_minute': stats['processed'] * 60 / uptime if uptime else 0.0,
+                    'utilization': stats['busy_seconds'] / uptime if uptime else 0.0,
+                    'current': stats['current'],
+                }
+                for worker_id, stats in enumerate(self.worker_stats)
+            ],
+        }
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from src.utils.config import Config
+
+
+class ScoreCache:
+    """
+    In-process LRU cache of oracle credit scores.
+
+    A score only changes when CreditScoreSubmitted fires, so entries live
+    until that event evicts them, the score's validUntil passes, or they
+    are dropped by the size bound. Unscored wallets (the all-zero tuple
+    getFullScore returns) are never cached, so a first score shows up on
+    the next read.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or Config.SCORE_CACHE_SIZE
+        self._entries = OrderedDict()  # lowercase address -> score dict
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_address):
+        """Cached score for a user, or None on a miss / expired entry"""
+        key = user_address.lower()
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+
+            if score['valid_until'] < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(score)
+
+    def put(self, user_address, score):
+        """Store a score dict (format_full_score shape); unscored / expired scores are skipped"""
+        if not score.get('valid_until') or score['valid_until'] < time.time():
+            return
+        key = user_address.lower()
+        with self._lock:
+            self._entries[key] = dict(score)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_address):
+        key = user_address.lower()
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def on_score_submitted(self, user_address):
+        """
+        CreditScoreSubmitted handler. The event doesn't carry the whole
+        score (APR, validUntil), so the entry is always dropped and the
+        next read goes back to the chain - even after our own submission,
+        since another instance may have written since.
+        """
+        self.invalidate(user_address)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,157 @@
+import asyncio
+from src.utils.config import Config
+from src.utils.deadline import Deadline
+from src.utils.stage_graph import Stage, StageGraph
+from src.utils.tracing import span
+
+
+class ScoringPipeline:
+    """
+    The credit scoring pipeline as a stage DAG, shared by /process-score
+    and the background request workers.
+
+    Data stages (FDC credit data, wallet reads + FTSO prices, Secure RNG)
+    have no dependencies and run together; each score starts as soon as
+    its own data is in; submission runs last. The latency budget covers
+    the LLM steps only: its clock starts when the first scoring stage
+    does, not while data is still being fetched. The graphs are built once
+    and keep per-stage metrics across runs.
+
+    The 'batch' graph is the background path for a backlog of queued
+    requests: the same stages over a list of wallets, with each agent
+    scoring the group through its batch prompts. A wallet whose own step
+    fails drops out of the later stages; the rest carry on.
+    """
+
+    def __init__(self, tradfi_agent, onchain_agent, risk_agent, submission_agent, combined_agent):
+        self.tradfi = tradfi_agent
+        self.onchain = onchain_agent
+        self.risk = risk_agent
+        self.submission = submission_agent
+        self.combined = combined_agent
+
+        fetch = Config.PIPELINE_FETCH_TIMEOUT
+        score = Config.PIPELINE_SCORE_TIMEOUT
+        data_stages = [
+            Stage('credit_data', lambda s, ctx: self.tradfi.fetch_data(s, score=False), timeout=fetch),
+            Stage('wallet_data', lambda s, ctx: self.onchain.analyze(s, score=False), timeout=fetch),
+            Stage('rng', lambda s, ctx: self.risk.prefetch_rng(s), timeout=fetch),
+        ]
+        submit = Stage(
+            'submit', lambda s, ctx: self.submission.submit(s, batched=ctx['batched']),
+            deps=('risk',), timeout=Config.PIPELINE_SUBMIT_TIMEOUT,
+        )
+
+        self.graphs = {
+            # TradFi + OnChain scores in parallel -> Risk -> Submission
+            'agents': StageGraph(data_stages + [
+                Stage('tradfi_score', lambda s, ctx: self.tradfi.score(s, self._deadline(ctx)),
+                      deps=('credit_data',), timeout=score),
+                Stage('onchain_score', lambda s, ctx: self.onchain.score(s, self._deadline(ctx)),
+                      deps=('wallet_data',), timeout=score),
+                Stage('risk', lambda s, ctx: self.risk.calculate_risk(s, deadline=self._deadline(ctx)),
+                      deps=('tradfi_score', 'onchain_score', 'rng'), timeout=score),
+                submit,
+            ]),
+            # One LLM call for all scores -> Submission
+            'combined': StageGraph(data_stages + [
+                Stage('risk', lambda s, ctx: self.combined.score(s, deadline=self._deadline(ctx)),
+                      deps=('credit_data', 'wallet_data', 'rng'), timeout=score),
+                submit,
+            ]),
+            # Many wallets: per-wallet fetches, batch prompts, batched submissions
+            'batch': StageGraph([
+                Stage('credit_data', self._batch_credit_data, timeout=fetch),
+                Stage('wallet_data', self._batch_wallet_data, timeout=fetch),
+                Stage('tradfi_score', self._batch_tradfi_score, deps=('credit_data',), timeout=score),
+                Stage('onchain_score', self._batch_onchain_score, deps=('wallet_data',), timeout=score),
+                Stage('risk', self._batch_risk, deps=('tradfi_score', 'onchain_score'), timeout=score),
+                Stage('submit', self._batch_submit, deps=('risk',), timeout=Config.PIPELINE_SUBMIT_TIMEOUT),
+            ]),
+        }
+
+    @staticmethod
+    def _deadline(ctx):
+        """The run's Deadline, started by the first scoring stage to ask for it"""
+        if ctx['deadline'] is None and ctx['budget_ms'] is not None:
+            ctx['deadline'] = Deadline(ctx['budget_ms'])
+        return ctx['deadline']
+
+    async def run(self, user_address, requested_amount=0, mode=None, budget_ms=None, batched=False):
+        """
+        Score one user and submit the result; returns the final state.
+        budget_ms bounds the LLM steps (None = no budget).
+        batched=True lets the submission join the oracle micro-batch.
+        Raises StageFailed naming the stage that broke the run.
+        """
+        mode = 'combined' if (mode or Config.SCORING_MODE) == 'combined' else 'agents'
+        state = {
+            'user_address': user_address,
+            'requested_amount': requested_amount,
+        }
+        with span('pipeline.score', address=user_address, mode=mode, batched=batched):
+            return await self.graphs[mode].run(state, budget_ms=budget_ms, deadline=None, batched=batched)
+
+    async def run_batch(self, user_addresses):
+        """
+        Score and submit many users through the 'batch' graph. Returns
+        (states, failed): final states of the wallets that made it through,
+        and {user_address: error} for those that didn't. Raises
+        StageFailed if a stage fails for the batch as a whole.
+        """
+        batch = {
+            'states': [{'user_address': user_address, 'requested_amount': 0} for user_address in user_addresses],
+            'failed': {},
+        }
+        with span('pipeline.score_batch', wallets=len(user_addresses)):
+            await self.graphs['batch'].run(batch)
+        return self._live(batch), batch['failed']
+
+    # -- batch stages: fn(batch, ctx) over {'states': [...], 'failed': {...}}
+
+    @staticmethod
+    def _live(batch):
+        """States of the wallets that haven't failed a step yet"""
+        return [state for state in batch['states'] if state['user_address'] not in batch['failed']]
+
+    async def _each(self, batch, fn, step):
+        """fn(state) for every live wallet at once; a wallet that raises is marked failed"""
+        states = self._live(batch)
+        results = await asyncio.gather(*(fn(state) for state in states), return_exceptions=True)
+        for state, result in zip(states, results):
+            if isinstance(result, Exception):
+                print(f"Error {step} for {state['user_address']}: {result}")
+                batch['failed'][state['user_address']] = result
+
+    async def _batch_credit_data(self, batch, ctx):
+        await self._each(batch, lambda s: self.tradfi.fetch_data(s, score=False), 'gathering credit data')
+
+    async def _batch_wallet_data(self, batch, ctx):
+        await self._each(batch, lambda s: self.onchain.analyze(s, score=False), 'gathering wallet data')
+
+    async def _batch_tradfi_score(self, batch, ctx):
+        states = self._live(batch)
+        if states:
+            await self.tradfi.score_batch(states)
+
+    async def _batch_onchain_score(self, batch, ctx):
+        states = self._live(batch)
+        if states:
+            await self.onchain.score_batch(states)
+
+    async def _batch_risk(self, batch, ctx):
+        states = self._live(batch)
+        if not states:
+            return
+        assessments = await self.risk.assess_batch(states)
+        await asyncio.gather(*(
+            self.risk.calculate_risk(state, assessment=terms, use_llm=False)
+            for state, (terms, _) in zip(states, assessments)
+        ))
+
+    async def _batch_submit(self, batch, ctx):
+        # Background path: share oracle transactions with other queued requests
+        await self._each(batch, lambda s: self.submission.submit(s, batched=True), 'submitting')
+
+    def stats(self):
+        return {mode: graph.stats() for mode, graph in self.graphs.items()}
@@ -0,0 +1,114 @@
+import threading
+import time
+from web3.exceptions import Web3RPCError
+from src.utils.config import Config
+
+
+class TransactionBuilder:
+    """
+    Builds and signs agent transactions from locally cached chain state.
+
+    chainId never changes and is fetched once; the gas price is cached per
+    block and refreshed by the owning service only when it goes stale.
+    Nonces come from the shared NonceManager, so building and signing a
+    transaction costs no RPC round-trips.
+    """
+
+    # Same 20% headroom the services have always added on top of eth_gasPrice
+    GAS_PRICE_MULTIPLIER = 1.2
+
+    def __init__(self, account, nonce_manager):
+        self.account = account
+        self.nonces = nonce_manager
+        self.chain_id = None
+        self._lock = threading.Lock()
+        self._gas_price = None
+        self._gas_price_block = None
+        self._gas_price_updated_at = 0.0
+
+    @property
+    def initialized(self):
+        return self.chain_id is not None and self.nonces.initialized
+
+    def initialize(self, chain_id, gas_price, pending_nonce, block_number=None):
+        """Seed chainId, gas price and nonce (one-time, at startup)"""
+        self.chain_id = chain_id
+        self.nonces.reset(pending_nonce)
+        self.update_gas_price(gas_price, block_number)
+
+    def update_gas_price(self, gas_price, block_number=None):
+        """Record the node's gas price as of block_number (older blocks are ignored)"""
+        with self._lock:
+            if (block_number is not None and self._gas_price_block is not None
+                    and block_number < self._gas_price_block):
+                return
+            self._gas_price = gas_price
+            self._gas_price_block = block_number
+            self._gas_price_updated_at = time.monotonic()
+
+    def invalidate_gas_price(self):
+        """Force the next send to re-read the gas price"""
+        with self._lock:
+            self._gas_price_updated_at = 0.0
+
+    def gas_price_stale(self):
+        """True once the cached gas price is older than about one block"""
+        return time.monotonic() - self._gas_price_updated_at > Config.GAS_PRICE_TTL
+
+    @property
+    def gas_price(self):
+        return int(self._gas_price * self.GAS_PRICE_MULTIPLIER)
+
+    def build(self, fn, gas, value=0):
+        """
+        Build and sign a call to a bound contract function.
+        Returns (txn, signed); if sending fails the caller hands the nonce
+        to send_failed().
+        """
+        if not self.initialized:
+            raise RuntimeError("TransactionBuilder used before initialize()")
+
+        data = fn._encode_transaction_data()
+        nonce = self.nonces.allocate()
+
+        txn = {
+            'to': fn.address,
+            'data': data,
+            'value': value,
+            'gas': gas,
+            'gasPrice': self.gas_price,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+        }
+
+        try:
+            signed = self.account.sign_transaction(txn)
+        except Exception:
+            self.nonces.release(nonce)
+            raise
+
+        return txn, signed
+
+    def send_failed(self, txn, error):
+        """
+        Account for a failed send_raw_transaction. Only a JSON-RPC error
+        answer proves the node rejected the transaction, so only then is
+        the nonce released for reuse. A nonce error, or a timeout / dropped
+        connection after which the node may already hold the transaction,
+        marks the nonces for a resync from the pending count instead.
+        """
+        if self.is_rejected(error) and not self.is_nonce_error(error):
+            self.nonces.release(txn['nonce'])
+        else:
+            self.nonces.invalidate()
+
+    @staticmethod
+    def is_rejected(error):
+        """The node answered the send with a JSON-RPC error (failed validation)"""
+        return isinstance(error, Web3RPCError)
+
+    @staticmethod
+    def is_nonce_error(error):
+        """Node rejected the nonce (someone else used the account, or we drifted)"""
+        msg = str(error).lower()
+        return 'nonce too low' in msg or 'replacement transaction underpriced' in msg
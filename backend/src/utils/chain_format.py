@@ -0,0 +1,91 @@
+"""Result formatting shared by the sync and async blockchain services"""
+
+
+def format_score(score):
+    """Oracle getScore() tuple -> dict"""
+    return {
+        'tradfi_score': score[0],
+        'onchain_score': score[1],
+        'combined_risk_score': score[2],
+        'max_borrow_amount': score[3],
+        'apr': score[4]
+    }
+
+
+def format_full_score(score):
+    """Oracle getFullScore() struct -> getScore dict plus valid_until"""
+    formatted = format_score(score)
+    formatted['valid_until'] = score[5]
+    return formatted
+
+
+def format_loan(loan):
+    """Lending loans() tuple -> dict"""
+    return {
+        'amount': loan[0],
+        'apr': loan[1],
+        'timestamp': loan[2],
+        'active': loan[3]
+    }
+
+
+def format_token_amount(name, amount):
+    """Raw 18-decimal token amount -> {name_wei, name_tokens}"""
+    if amount is None:
+        return None
+    return {
+        f'{name}_wei': amount,
+        f'{name}_tokens': amount / 10**18
+    }
+
+
+def format_ftso_prices(result):
+    """Scale raw FtsoV2.getFeedsById() output into USD prices"""
+    values, decimals, timestamp = result
+    return {
+        'flr_usd': values[0] / (10 ** decimals[0]),
+        'xrp_usd': values[1] / (10 ** decimals[1]),
+        'timestamp': timestamp,
+    }
+
+
+def calculate_repayment(loan, current_time):
+    """Principal plus simple interest accrued up to current_time"""
+    principal = loan['amount']
+    apr = loan['apr']  # APR in basis points (e.g., 500 = 5%)
+    timestamp = loan['timestamp']
+
+    time_elapsed = current_time - timestamp
+
+    # Calculate interest: principal * (apr/10000) * (time_elapsed / 365 days)
+    # Simple interest calculation
+    seconds_per_year = 365 * 24 * 60 * 60
+    interest = (principal * apr * time_elapsed) // (10000 * seconds_per_year)
+
+    total_repayment = principal + interest
+
+    print(f"Principal: {principal / 10**18} mUSDC")
+    print(f"APR: {apr / 100}%")
+    print(f"Time elapsed: {time_elapsed} seconds ({time_elapsed / 86400:.2f} days)")
+    print(f"Interest: {interest / 10**18} mUSDC")
+    print(f"Total repayment: {total_repayment / 10**18} mUSDC")
+
+    return {
+        'repayment_amount_wei': total_repayment,
+        'repayment_amount_tokens': total_repayment / 10**18,
+        'principal_wei': principal,
+        'principal_tokens': principal / 10**18,
+        'interest_wei': interest,
+        'interest_tokens': interest / 10**18,
+        'time_elapsed_seconds': time_elapsed,
+        'time_elapsed_days': time_elapsed / 86400
+    }
+
+
+def extract_revert_reason(error):
+    """Extract human-readable revert reason from a web3 ContractLogicError."""
+    msg = str(error)
+    # web3.py returns 'execution reverted: <reason>'
+    if 'execution reverted:' in msg:
+        return msg.split('execution reverted:')[-1].strip().strip("'\"")
+    return msg
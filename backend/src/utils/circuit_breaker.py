@@ -0,0 +1,280 @@
+"""
+Circuit breakers for the agent's external dependencies.
+
+Each dependency (JQ verifier, DA layer, credit data API, Bedrock, the RPC
+node) has one named breaker shared across the process:
+
+  closed     calls go through; consecutive failures are counted
+  open       too many failures in a row: calls raise CircuitOpen at once,
+             so the caller's fallback runs without waiting on a timeout
+  half_open  after a jittered cool-down one probe call is let through;
+             success closes the breaker, failure opens it again
+
+Counting failures in a row rather than per time window means a breaker
+trips the same way whether a dependency sees one call a minute or a
+hundred a second. Only transport-level problems (connection errors,
+timeouts, 5xx / 429 answers) count as failures - a well-formed error
+answer means the dependency is up.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import contextmanager
+import aiohttp
+import requests
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError, HTTPClientError
+from web3.exceptions import ProviderConnectionError
+from web3.middleware import Web3Middleware
+from src.utils.config import Config
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# JSON-RPC methods gated by the RPC breaker (transaction sends always go out)
+RPC_READ_METHODS = frozenset({
+    'eth_blockNumber',
+    'eth_call',
+    'eth_chainId',
+    'eth_estimateGas',
+    'eth_gasPrice',
+    'eth_getBalance',
+    'eth_getBlockByNumber',
+    'eth_getCode',
+    'eth_getLogs',
+    'eth_getTransactionCount',
+    'eth_getTransactionReceipt',
+})
+
+# Exceptions that mean the dependency itself is unreachable or too slow
+# (asyncio.TimeoutError is TimeoutError; botocore's HTTPClientError covers
+# read timeouts and dropped connections)
+TRANSPORT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    aiohttp.ClientConnectionError,
+    BotocoreConnectionError,
+    HTTPClientError,
+    ProviderConnectionError,
+)
+
+
+def _status_code(error):
+    """HTTP status behind an HTTP error answer, if the exception carries one"""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    if isinstance(error, ClientError):
+        return error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return None
+
+
+def is_transport_error(error):
+    """Connection failure, timeout, or a 5xx / 429 answer: the dependency, not the call, is at fault"""
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    status = _status_code(error)
+    return status is not None and (status >= 500 or status == 429)
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name, retry_in):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"{name} circuit open, next probe in {retry_in:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over consecutive failures.
+
+    Opens after `failure_threshold` failures in a row; any success resets
+    the count. Stays open for `reset_timeout` seconds +/- `jitter` (a
+    fraction), so replicas don't all probe a recovering dependency at the
+    same moment.
+    """
+
+    def __init__(self, name, failure_threshold=None, reset_timeout=None, jitter=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or Config.CIRCUIT_RESET_TIMEOUT
+        self.jitter = Config.CIRCUIT_JITTER if jitter is None else jitter
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._calls = 0
+        self._failures = 0
+        self._probe_at = 0.0
+        self._probing = False
+        self._opened_at = None
+        self._last_error = None
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go out now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == OPEN and now >= self._probe_at:
+                self._state = HALF_OPEN
+                print(f"[Circuit] {self.name}: half-open, probing")
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self._rejected += 1
+            raise CircuitOpen(self.name, max(0.0, self._probe_at - now))
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"[Circuit] {self.name}: closed after {time.monotonic() - self._opened_at:.1f}s")
+                self._state = CLOSED
+            self._probing = False
+            self._calls += 1
+            self._consecutive_failures = 0
+
+    def record_failure(self, error=None):
+        with self._lock:
+            if error is not None:
+                self._last_error = f"{type(error).__name__}: {error}"
+            self._calls += 1
+            self._failures += 1
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or (
+                    self._state == CLOSED and self._consecutive_failures >= self.failure_threshold):
+                self._open()
+
+    def release(self):
+        """Give back a half-open probe slot whose call was cancelled"""
+        with self._lock:
+            self._probing = False
+
+    @contextmanager
+    def guard(self):
+        """
+        check(), then record the wrapped block's outcome. Only transport
+        errors (is_transport_error) count as failures; any other exception
+        means the dependency answered, and counts as a success.
+        """
+        self.check()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception as e:
+            if is_transport_error(e):
+                self.record_failure(e)
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+
+    async def call(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) through the breaker"""
+        with self.guard():
+            return await fn(*args, **kwargs)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'calls': self._calls,
+                'failures': self._failures,
+                'next_probe_in': max(0.0, self._probe_at - time.monotonic()) if self._state == OPEN else None,
+                'trips': self._trips,
+                'rejected': self._rejected,
+                'last_error': self._last_error,
+            }
+
+    def _open(self):
+        now = time.monotonic()
+        if self._state == CLOSED:
+            self._opened_at = now
+            self._trips += 1
+        cool_down = self.reset_timeout * random.uniform(1 - self.jitter, 1 + self.jitter)
+        self._state = OPEN
+        self._probing = False
+        self._probe_at = now + cool_down
+        print(f"[Circuit] {self.name}: open ({self._last_error}), probing again in {cool_down:.1f}s")
+
+
+def guarded_request(breaker, session, method, url, **kwargs):
+    """
+    requests session call through `breaker`. Raises CircuitOpen without
+    touching the network while the breaker is open; connection errors,
+    timeouts and 5xx / 429 answers count against it.
+    """
+    with breaker.guard():
+        response = session.request(method, url, **kwargs)
+        if response.status_code >= 500 or response.status_code == 429:
+            raise requests.exceptions.HTTPError(f"{response.status_code} from {url}", response=response)
+    return response
+
+
+class CircuitBreakerMiddleware(Web3Middleware):
+    """Fails RPC reads fast while `breaker` is open; provider transport errors count as failures"""
+
+    def __init__(self, w3, breaker):
+        super().__init__(w3)
+        self.breaker = breaker
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            if method not in RPC_READ_METHODS:
+                return make_request(method, params)
+            with self.breaker.guard():
+                return make_request(method, params)
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            if method not in RPC_READ_METHODS:
+                return await make_request(method, params)
+            with self.breaker.guard():
+                return await make_request(method, params)
+
+        return middleware
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """The process-wide breaker for dependency `name`, created on first use"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def rpc_breaker_middleware(name='rpc'):
+    """Onion entry for w3.middleware_onion.inject(...): fn(w3) -> middleware"""
+    breaker = get_breaker(name)
+    return lambda w3: CircuitBreakerMiddleware(w3, breaker)
+
+
+def circuit_states():
+    """Snapshot of every breaker, for /api/health"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -15,6 +15,120 @@ class Config:
     # Agent
     PRIVATE_KEY = os.getenv('PRIVATE_KEY')
 
+    # Port this API listens on
+    PORT = int(os.getenv('PORT', '8000'))
+
+    # Seconds a cached gas price stays valid (~one Flare block)
+    GAS_PRICE_TTL = float(os.getenv('GAS_PRICE_TTL', '2'))
+
+    # Directory for the agent's local state (indexer checkpoint, LLM cache,
+    # distillation samples and models); relative to the working directory
+    DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+    # In-process oracle score cache
+    SCORE_CACHE_SIZE = int(os.getenv('SCORE_CACHE_SIZE', '10000'))
+
+    # Checkpointed event indexer (replaces the create_filter listener)
+    INDEXER_DB_PATH = os.getenv('INDEXER_DB_PATH', os.path.join(DATA_DIR, 'indexer.sqlite3'))
+    INDEXER_START_BLOCK = int(os.getenv('INDEXER_START_BLOCK')) if os.getenv('INDEXER_START_BLOCK') else None
+    INDEXER_CHUNK_SIZE = int(os.getenv('INDEXER_CHUNK_SIZE', '30'))  # Flare public RPC caps getLogs at 30 blocks
+    INDEXER_MAX_CHUNK_SIZE = int(os.getenv('INDEXER_MAX_CHUNK_SIZE', '1000'))
+    INDEXER_REORG_DEPTH = int(os.getenv('INDEXER_REORG_DEPTH', '16'))
+    INDEXER_POLL_INTERVAL = float(os.getenv('INDEXER_POLL_INTERVAL', '2'))
+
+    # Worker pool draining indexed credit score requests
+    REQUEST_WORKERS = int(os.getenv('REQUEST_WORKERS', '4'))
+    REQUEST_QUEUE_SIZE = int(os.getenv('REQUEST_QUEUE_SIZE', '100'))
+    # Queued requests a worker takes at once when there is a backlog
+    # (scored with batch prompts); 1 = one pipeline per request
+    REQUEST_BATCH_SIZE = int(os.getenv('REQUEST_BATCH_SIZE', '8'))
+
+    # Seconds a finished /process-score result is shared with late duplicates
+    SCORE_SINGLE_FLIGHT_GRACE = float(os.getenv('SCORE_SINGLE_FLIGHT_GRACE', '3'))
+
+    # Shared Bedrock connection pool: three agent calls per pipeline worker
+    # plus headroom for /evaluate-loan and /process-score traffic
+    LLM_MAX_POOL_CONNECTIONS = int(os.getenv('LLM_MAX_POOL_CONNECTIONS', str(REQUEST_WORKERS * 3 + 10)))
+    # Opt-in: Bedrock connections opened at startup with 1-token Converse
+    # calls (each one is billed), in the background and given up on after
+    # LLM_PREWARM_TIMEOUT seconds
+    LLM_PREWARM_CONNECTIONS = int(os.getenv('LLM_PREWARM_CONNECTIONS', '0'))
+    LLM_PREWARM_TIMEOUT = float(os.getenv('LLM_PREWARM_TIMEOUT', '5'))
+
+    # Default scoring pipeline: 'agents' (three LLM calls) or 'combined' (one)
+    SCORING_MODE = os.getenv('SCORING_MODE', 'agents')
+
+    # Default latency budget for the LLM steps of one /process-score run;
+    # answers that miss it are dropped for the rule-based scores
+    SCORING_BUDGET_MS = int(os.getenv('SCORING_BUDGET_MS', '6000'))
+
+    # Per-stage timeouts (seconds) for the scoring pipeline: data fetches
+    # (FDC, wallet reads, RNG), scoring steps, and oracle submission
+    PIPELINE_FETCH_TIMEOUT = float(os.getenv('PIPELINE_FETCH_TIMEOUT', '30'))
+    PIPELINE_SCORE_TIMEOUT = float(os.getenv('PIPELINE_SCORE_TIMEOUT', '60'))
+    PIPELINE_SUBMIT_TIMEOUT = float(os.getenv('PIPELINE_SUBMIT_TIMEOUT', '300'))
+
+    # Circuit breakers (JQ verifier, DA layer, credit data API, Bedrock, RPC):
+    # open after CIRCUIT_FAILURE_THRESHOLD transport failures in a row,
+    # probe again after CIRCUIT_RESET_TIMEOUT seconds +/- CIRCUIT_JITTER
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+    CIRCUIT_JITTER = float(os.getenv('CIRCUIT_JITTER', '0.2'))
+
+    # Tracing: finished spans kept in memory for /api/debug/traces, and
+    # appended as OTLP/JSON lines to TRACE_EXPORT_PATH when set
+    TRACING = os.getenv('TRACING', 'true').lower() == 'true'
+    TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '5000'))
+    TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', '')
+
+    # Mark the static agent system prompts as Bedrock prompt-cache prefixes.
+    # Bedrock ignores cache points before the model's minimum prefix length
+    # (1024 tokens for Claude Sonnet), so shorter prompts don't get one
+    LLM_PROMPT_CACHE = os.getenv('LLM_PROMPT_CACHE', 'true').lower() == 'true'
+    LLM_PROMPT_CACHE_MIN_TOKENS = int(os.getenv('LLM_PROMPT_CACHE_MIN_TOKENS', '1024'))
+
+    # Agent LLM output: 'off' waits for the full completion, 'background'
+    # uses the score as soon as it streams in and logs the reasoning later,
+    # 'cut' stops generating once the numbers are in
+    LLM_STREAM_MODE = os.getenv('LLM_STREAM_MODE', 'background')
+
+    # Wallets packed into one agent prompt on the background batch path
+    LLM_BATCH_SIZE = int(os.getenv('LLM_BATCH_SIZE', '8'))
+
+    # Agent LLM result cache (empty LLM_CACHE_DB_PATH = memory only)
+    LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '5000'))
+    LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '3600'))
+    LLM_CACHE_DB_PATH = os.getenv('LLM_CACHE_DB_PATH', os.path.join(DATA_DIR, 'llm_cache.sqlite3'))
+    LLM_CACHE_PURGE_INTERVAL = float(os.getenv('LLM_CACHE_PURGE_INTERVAL', '600'))  # seconds between deletes of expired rows
+
+    # Addresses per feature fetch / kernel pass in /process-scores
+    BATCH_SCORE_CHUNK_SIZE = int(os.getenv('BATCH_SCORE_CHUNK_SIZE', '200'))
+    # Per-address RPC reads and oracle transactions in flight at once per chunk
+    BATCH_RPC_CONCURRENCY = int(os.getenv('BATCH_RPC_CONCURRENCY', '16'))
+    BATCH_SUBMIT_CONCURRENCY = int(os.getenv('BATCH_SUBMIT_CONCURRENCY', '4'))
+
+    # Agent scorer: 'llm' (Bedrock, distilled model shadowing it) or 'model'
+    # (distilled model in the hot path, LLM fallback where none is trained)
+    SCORER = os.getenv('SCORER', 'llm')
+    DISTILL_LOG = os.getenv('DISTILL_LOG', 'true').lower() == 'true'
+    DISTILL_DB_PATH = os.getenv('DISTILL_DB_PATH', os.path.join(DATA_DIR, 'distill.sqlite3'))
+    DISTILL_MODEL_DIR = os.getenv('DISTILL_MODEL_DIR', os.path.join(DATA_DIR, 'distilled_models'))
+    DISTILL_MIN_SAMPLES = int(os.getenv('DISTILL_MIN_SAMPLES', '200'))
+    DISTILL_L2 = float(os.getenv('DISTILL_L2', '1.0'))
+    # Model and LLM "agree" within this fraction of the target's range
+    DISTILL_TOLERANCE = float(os.getenv('DISTILL_TOLERANCE', '0.05'))
+
+    # Micro-batched oracle writes (background scoring). Needs
+    # submitCreditScores, which only the redeployed FlareCreditOracle has;
+    # 1 = off, every score is its own submitCreditScore transaction
+    SUBMISSION_MAX_BATCH = int(os.getenv('SUBMISSION_MAX_BATCH', '1'))
+    SUBMISSION_BATCH_WINDOW_MS = int(os.getenv('SUBMISSION_BATCH_WINDOW_MS', '500'))
+
+    # Shared receipt watcher
+    RECEIPT_CONFIRMATIONS = int(os.getenv('RECEIPT_CONFIRMATIONS', '1'))
+    RECEIPT_POLL_INTERVAL = float(os.getenv('RECEIPT_POLL_INTERVAL', '1'))
+    RECEIPT_STUCK_AFTER = float(os.getenv('RECEIPT_STUCK_AFTER', '120'))
+
     # Flare FDC (Data Connector) - Coston2 Testnet
     FDC_JQ_VERIFIER_URL = os.getenv(
         'FDC_JQ_VERIFIER_URL',
@@ -41,6 +155,10 @@ class Config:
         '0x191a1282Ac700edE65c5B0AaF313BAcC3eA7fC7e'
     )
     FDC_API_KEY = os.getenv('FDC_API_KEY', '00000000-0000-0000-0000-000000000000')
+    # Direct-fetch source: 'http', 'local' (the bundled mock bureau, generated
+    # in-process) or 'auto' (local only when FDC_DATA_API_URL is our own
+    # loopback /api/credit-data)
+    FDC_DATA_SOURCE = os.getenv('FDC_DATA_SOURCE', 'auto')
 
     # Flare Secure RNG (RandomNumberV2) - Coston2 Testnet
     RANDOM_NUMBER_V2_ADDRESS = '0x5CdF9eAF3EB8b44fB696984a1420B56A7575D250'
@@ -50,6 +168,9 @@ class Config:
     FTSO_FEED_FLR_USD = '0x01464c522f55534400000000000000000000000000'
     FTSO_FEED_XRP_USD = '0x015852502f55534400000000000000000000000000'
 
+    # Multicall3 (canonical deployment, same address on every EVM chain)
+    MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
     # AWS Bedrock
     AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
@@ -0,0 +1,259 @@
+"""
+Local execution of the FDC credit-data JQ filter and ABI encoding.
+
+The JQ verifier applies FlareFDCService.CREDIT_DATA_JQ to the bureau
+payload and ABI-encodes the result with CREDIT_DATA_ABI_SIGNATURE. Here
+the filter is compiled once into a field table (source path, x100 scale)
+and run in-process - per payload, or over many payloads at once with
+numpy - so the direct-fetch fallback yields exactly what an attestation
+would, encodings need no verifier round-trip, and attested responses can
+be checked against local output in bulk.
+
+Attested responses come back the other way: the encoding is a static
+tuple of uint256, so bodies are decoded at fixed 32-byte offsets - one
+through a memoryview, many as a structured numpy view over the buffer.
+
+Only the subset the credit filter uses is supported: one object of
+`key: .a.b` and `key: (.a.b * N | floor)` entries, encoded as a tuple of
+uint256.
+"""
+
+import functools
+import math
+import re
+import numpy as np
+from eth_abi import encode as abi_encode
+
+_ENTRY = re.compile(
+    r'^(?P<key>\w+)\s*:\s*(?:'
+    r'\(\s*(?P<scaled>\.[\w.]+)\s*\*\s*(?P<scale>\d+)\s*\|\s*floor\s*\)'
+    r'|(?P<path>\.[\w.]+))$'
+)
+_ABI_FIELD = re.compile(r'^(?P<type>\w+)\s+(?P<name>\w+)$')
+
+UINT256_MAX = 2**256 - 1
+# Largest magnitude float64 holds exactly; the numpy batch path rejects beyond it
+EXACT_FLOAT_LIMIT = 2**53
+
+
+class CreditTransform:
+    """A compiled filter: field names in ABI order, source paths and scales"""
+
+    def __init__(self, fields, paths, scales):
+        self.fields = tuple(fields)
+        self.paths = tuple(paths)
+        self.scales = tuple(scales)  # None = value copied as is
+        self.abi_type = '(' + ','.join(['uint256'] * len(self.fields)) + ')'
+        # Static tuple: one 32-byte big-endian word per field, nothing else
+        self.size = 32 * len(self.fields)
+        # Each word's low 8 bytes, read in place by decode_batch()
+        self.record_dtype = np.dtype({
+            'names': list(self.fields),
+            'formats': ['>u8'] * len(self.fields),
+            'offsets': [offset + 24 for offset in range(0, self.size, 32)],
+            'itemsize': self.size,
+        })
+
+    # -- one payload ---------------------------------------------------------
+
+    def apply(self, payload):
+        """
+        The filter's output as a tuple of ints in ABI order. Raises
+        ValueError where the verifier would fail: a missing or non-numeric
+        field, or a value that isn't a uint256.
+        """
+        values = []
+        for name, path, scale in zip(self.fields, self.paths, self.scales):
+            value = _lookup(payload, path)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name}: {'.'.join(path)} is {value!r}, not a number")
+            if scale is not None:
+                value = math.floor(value * scale)
+            elif isinstance(value, float):
+                if not value.is_integer():
+                    raise ValueError(f"{name}: {value} is not an integer")
+                value = int(value)
+            if not 0 <= value <= UINT256_MAX:
+                raise ValueError(f"{name}: {value} is out of uint256 range")
+            values.append(value)
+        return tuple(values)
+
+    def apply_dict(self, payload):
+        """apply() as the flat {field: int} object the JQ filter outputs"""
+        return dict(zip(self.fields, self.apply(payload)))
+
+    def encode(self, payload):
+        """ABI encoding of the filtered payload, as the verifier would produce it"""
+        return abi_encode([self.abi_type], [self.apply(payload)])
+
+    def decode(self, data):
+        """
+        Flat {field: int} from an ABI-encoded response body (bytes or 0x
+        hex), read word by word at the fixed offsets of the static tuple.
+        """
+        if isinstance(data, str):
+            data = bytes.fromhex(data.removeprefix('0x'))
+        view = memoryview(data)
+        if len(view) != self.size:
+            raise ValueError(f"Expected a {self.size}-byte response body, got {len(view)}")
+        return {
+            name: int.from_bytes(view[offset:offset + 32], 'big')
+            for name, offset in zip(self.fields, range(0, self.size, 32))
+        }
+
+    # -- many payloads -------------------------------------------------------
+
+    def apply_batch(self, payloads):
+        """
+        Vectorized apply() over a list of payloads.
+
+        Returns (values, valid): an int64 array of shape (n, fields) and a
+        bool array marking the rows apply() would accept. Values of rows
+        that aren't valid are undefined. Magnitudes beyond 2**53 are
+        rejected here; use apply() for those.
+        """
+        raw = np.array(
+            [[_number(_lookup(payload, path)) for path in self.paths] for payload in payloads],
+            dtype=np.float64,
+        ).reshape(len(payloads), len(self.fields))
+
+        scales = np.array([scale or 1 for scale in self.scales], dtype=np.float64)
+        scaled = np.array([scale is not None for scale in self.scales])
+
+        with np.errstate(invalid='ignore'):
+            values = np.where(scaled, np.floor(raw * scales), raw)
+            valid = (
+                np.isfinite(values)
+                & (values >= 0)
+                & (values < EXACT_FLOAT_LIMIT)
+                # Unscaled fields are copied and must already be integers
+                & (scaled | (np.floor(raw) == raw))
+            ).all(axis=1)
+
+        return np.where(np.isfinite(values), values, 0).astype(np.int64), valid
+
+    def encode_batch(self, values):
+        """
+        ABI encodings for rows of apply_batch() values. Every field is a
+        static uint256, so each row is just its 32-byte big-endian words.
+        """
+        values = np.asarray(values, dtype=np.int64)
+        words = np.zeros((len(values), len(self.fields), 32), dtype=np.uint8)
+        words[:, :, 24:] = values.astype('>u8').view(np.uint8).reshape(len(values), len(self.fields), 8)
+        return [row.tobytes() for row in words.reshape(len(values), -1)]
+
+    def decode_batch(self, data):
+        """
+        Decode many response bodies into a structured numpy array with one
+        uint64 field per ABI field. `data` is either one buffer of
+        concatenated bodies - decoded as a view over it, without copying -
+        or an iterable of bodies (bytes or 0x hex). Raises ValueError on a
+        ragged buffer or a value that doesn't fit in 64 bits.
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes.fromhex(''.join(
+                body.removeprefix('0x') if isinstance(body, str) else bytes(body).hex()
+                for body in data
+            ))
+        if len(data) % self.size:
+            raise ValueError(f"Buffer of {len(data)} bytes is not a whole number of {self.size}-byte bodies")
+
+        words = np.frombuffer(data, dtype=np.uint8).reshape(-1, len(self.fields), 32)
+        if words[:, :, :24].any():
+            raise ValueError("Response body value exceeds 64 bits")
+        return np.frombuffer(data, dtype=self.record_dtype)
+
+    def record_dict(self, record):
+        """Flat {field: int} for one row of decode_batch()"""
+        return {name: int(record[name]) for name in self.fields}
+
+    def verify_batch(self, payloads, response_bodies):
+        """
+        Check attested response bodies (ABI hex / bytes, or the flat JQ
+        object) against local output for the same payloads. Returns a bool
+        per pair; a payload the filter rejects never matches.
+        """
+        values, valid = self.apply_batch(payloads)
+        expected = self.encode_batch(values)
+
+        matches = []
+        for i, (payload, body) in enumerate(zip(payloads, response_bodies)):
+            try:
+                if valid[i]:
+                    local = expected[i]
+                else:
+                    # Outside the exact float range, or really invalid
+                    local = self.encode(payload)
+                matches.append(_as_encoding(self, body) == local)
+            except (ValueError, TypeError, KeyError):
+                matches.append(False)
+        return matches
+
+
+def _lookup(payload, path):
+    """jq `.a.b`: None where any step is missing"""
+    value = payload
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    # Big ints can't be represented exactly (or at all) as float64
+    if isinstance(value, int) and abs(value) >= EXACT_FLOAT_LIMIT:
+        return math.nan
+    return value
+
+
+def _as_encoding(transform, body):
+    """An attested response body as ABI bytes"""
+    if isinstance(body, dict):
+        return abi_encode([transform.abi_type], [tuple(int(body[name]) for name in transform.fields)])
+    if isinstance(body, str):
+        return bytes.fromhex(body.removeprefix('0x'))
+    return bytes(body)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_transform(jq_filter, abi_signature):
+    """
+    Compile a flat JQ object filter and the tuple ABI signature it is
+    encoded with. Raises ValueError for constructs outside the supported
+    subset, non-uint256 fields, or keys that don't match the signature.
+    """
+    body = jq_filter.strip()
+    if not (body.startswith('{') and body.endswith('}')):
+        raise ValueError("JQ filter must be a single object construction")
+
+    entries = {}
+    for entry in body[1:-1].split(','):
+        match = _ENTRY.match(entry.strip())
+        if not match:
+            raise ValueError(f"Unsupported JQ entry: {entry.strip()!r}")
+        source = match.group('scaled') or match.group('path')
+        scale = int(match.group('scale')) if match.group('scale') else None
+        entries[match.group('key')] = (tuple(source[1:].split('.')), scale)
+
+    signature = abi_signature.strip()
+    if not (signature.startswith('(') and signature.endswith(')')):
+        raise ValueError("ABI signature must be a tuple")
+
+    fields = []
+    for part in signature[1:-1].split(','):
+        match = _ABI_FIELD.match(part.strip())
+        if not match or match.group('type') != 'uint256':
+            raise ValueError(f"Unsupported ABI field: {part.strip()!r}")
+        fields.append(match.group('name'))
+
+    if set(fields) != set(entries):
+        raise ValueError(f"JQ keys and ABI fields differ: {sorted(set(fields) ^ set(entries))}")
+
+    return CreditTransform(
+        fields,
+        [entries[name][0] for name in fields],
+        [entries[name][1] for name in fields],
+    )
@@ -0,0 +1,28 @@
+import time
+
+
+class Deadline:
+    """
+    Latency budget for one scoring run.
+
+    Agents ask for a share of whatever is left (TradFi / OnChain take half
+    so Risk still has time after them) and drop an LLM answer that misses
+    it in favour of their rule-based result.
+    """
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self, share=1.0):
+        """Seconds a step may take if it gets `share` of the remaining budget"""
+        return self.remaining() * share
+
+    @staticmethod
+    def timeout_for(deadline, share=1.0):
+        """timeout() that tolerates no deadline (None = wait as long as it takes)"""
+        return deadline.timeout(share) if deadline else None
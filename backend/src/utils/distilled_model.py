@@ -0,0 +1,85 @@
+"""
+Compact NumPy scorer distilled from logged LLM outputs.
+
+A bounded-target logistic regression: the target is rescaled into (0, 1),
+mapped through the logit and fitted with ridge least squares on
+standardized [x, log1p|x|] features. Predictions map back through the
+sigmoid, so they always land inside the target's bounds. Scoring one
+borrower is a dot product - microseconds on CPU.
+"""
+
+import numpy as np
+
+
+def _design(X):
+    """Raw features plus a log-compressed copy (balances, debt, counts span decades)"""
+    X = np.asarray(X, dtype=np.float64)
+    return np.hstack([X, np.log1p(np.abs(X))])
+
+
+class DistilledModel:
+    """One bounded integer target predicted from a fixed feature list"""
+
+    def __init__(self, features, lo, hi, mean, std, weights, bias, metrics=None):
+        self.features = list(features)
+        self.lo = lo
+        self.hi = hi
+        self.mean = mean
+        self.std = std
+        self.weights = weights
+        self.bias = bias
+        self.metrics = metrics or {}
+
+    @classmethod
+    def fit(cls, features, X, y, lo, hi, l2=1.0):
+        """Fit on rows X (n x len(features)) and integer targets y in [lo, hi]"""
+        D = _design(X)
+        mean = D.mean(axis=0)
+        std = D.std(axis=0)
+        std[std == 0] = 1.0
+        Z = (D - mean) / std
+
+        # Keep the logit finite at the bounds
+        eps = 0.5 / (hi - lo)
+        p = np.clip((np.asarray(y, dtype=np.float64) - lo) / (hi - lo), eps, 1 - eps)
+        target = np.log(p / (1 - p))
+
+        bias = target.mean()
+        A = Z.T @ Z + l2 * np.eye(Z.shape[1])
+        weights = np.linalg.solve(A, Z.T @ (target - bias))
+        return cls(features, lo, hi, mean, std, weights, bias)
+
+    def predict(self, X):
+        """Integer predictions for many rows"""
+        Z = (_design(X) - self.mean) / self.std
+        p = 1 / (1 + np.exp(-(Z @ self.weights + self.bias)))
+        return np.rint(self.lo + (self.hi - self.lo) * p).astype(np.int64)
+
+    def predict_one(self, feature_values):
+        """Integer prediction for one feature dict"""
+        row = [[float(feature_values[name]) for name in self.features]]
+        return int(self.predict(row)[0])
+
+    def save(self, path):
+        np.savez(
+            path,
+            features=np.array(self.features),
+            bounds=np.array([self.lo, self.hi]),
+            mean=self.mean,
+            std=self.std,
+            weights=self.weights,
+            bias=np.array([self.bias]),
+            metrics_keys=np.array(list(self.metrics)),
+            metrics_values=np.array(list(self.metrics.values()), dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        lo, hi = data['bounds'].tolist()
+        metrics = dict(zip(data['metrics_keys'].tolist(), data['metrics_values'].tolist()))
+        return cls(
+            data['features'].tolist(), lo, hi,
+            data['mean'], data['std'], data['weights'], float(data['bias'][0]),
+            metrics,
+        )
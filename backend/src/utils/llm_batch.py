@@ -0,0 +1,73 @@
+"""
+Multi-wallet agent prompts for the background scoring path.
+
+K wallets go into one request and come back as {"scores": [...]}, one
+entry per address. Each entry is validated on its own, so a malformed or
+missing answer only costs that wallet a single-wallet retry - the rest of
+the batch is still used.
+"""
+
+import asyncio
+import json
+from langchain_core.messages import HumanMessage
+from src.utils.config import Config
+from src.utils.llm_json import complete_json
+
+
+async def complete_batch(llm, prompt, entries, fields, label='LLM', batch_size=None):
+    """
+    Score `entries` ({address: input dict}) with the batch `prompt`,
+    batch_size wallets per request, all requests concurrently.
+
+    Returns {address: {field: int}} for the wallets whose entry came back
+    with every field as a number; the caller retries the others. A failed
+    request just leaves its wallets out.
+    """
+    batch_size = batch_size or Config.LLM_BATCH_SIZE
+    addresses = list(entries)
+    chunks = [addresses[i:i + batch_size] for i in range(0, len(addresses), batch_size)]
+
+    results = await asyncio.gather(
+        *(_complete_chunk(llm, prompt, {a: entries[a] for a in chunk}, fields, label) for chunk in chunks)
+    )
+
+    merged = {}
+    for result in results:
+        merged.update(result)
+    print(f"  [{label}] Batch scored {len(merged)}/{len(entries)} wallets in {len(chunks)} request(s)")
+    return merged
+
+
+async def _complete_chunk(llm, prompt, entries, fields, label):
+    wallets = [dict(entry, address=address) for address, entry in entries.items()]
+    messages = [
+        prompt.system_message(),
+        HumanMessage(content=f"Wallets: {json.dumps(wallets)}"),
+    ]
+
+    try:
+        # Nothing to use early in a batch answer, so no streaming
+        result = await complete_json(llm, messages, (), label, mode='off', prompt=prompt.version)
+    except Exception as e:
+        print(f"  [{label}] Batch request for {len(entries)} wallets failed: {e}")
+        return {}
+
+    items = result.get('scores') if isinstance(result, dict) else None
+    if not isinstance(items, list):
+        print(f"  [{label}] Batch answer has no scores array")
+        return {}
+
+    by_key = {address.lower(): address for address in entries}
+    valid = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        address = by_key.get(str(item.get('address', '')).lower())
+        # Unknown addresses and repeated entries are ignored
+        if address is None or address in valid:
+            continue
+        try:
+            valid[address] = {name: int(item[name]) for name in fields}
+        except (KeyError, TypeError, ValueError):
+            continue
+    return valid
@@ -0,0 +1,136 @@
+"""
+JSON completions from the scoring LLMs, optionally streamed.
+
+With streaming on, the numeric fields are read from the token stream as
+soon as each value is complete, so a score is available long before the
+free-text reasoning has been generated. The rest of the completion is
+then either drained in the background (and the reasoning logged) or cut
+off, depending on LLM_STREAM_MODE.
+"""
+
+import asyncio
+import json
+import re
+from src.utils.config import Config
+from src.services.llm_registry import llm_registry
+from src.utils.tracing import span
+
+# Keeps background drain tasks referenced until they finish
+_background_tasks = set()
+
+
+def _strip_fences(text):
+    return text.strip().removeprefix("```json").removesuffix("```").strip()
+
+
+def _chunk_text(chunk):
+    """Text of an AIMessageChunk (Converse streams content as str or blocks)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        block.get('text', '') for block in content
+        if isinstance(block, dict)
+    )
+
+
+def _model_id(llm):
+    return getattr(llm, 'model_id', None) or Config.BEDROCK_MODEL_ID
+
+
+class JSONFieldParser:
+    """Pull top-level numeric fields out of a partially received JSON object"""
+
+    def __init__(self, fields):
+        self.text = ''
+        self._values = {}
+        # A value only counts once a delimiter shows the number is complete
+        self._patterns = {
+            name: re.compile(r'"%s"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]' % re.escape(name))
+            for name in fields
+        }
+
+    def feed(self, text):
+        self.text += text
+        for name, pattern in self._patterns.items():
+            if name not in self._values:
+                match = pattern.search(self.text)
+                if match:
+                    raw = match.group(1)
+                    self._values[name] = float(raw) if '.' in raw else int(raw)
+
+    def complete(self):
+        return len(self._values) == len(self._patterns)
+
+    def values(self):
+        return dict(self._values)
+
+    def parse_full(self):
+        """The whole completion as JSON (once the stream has ended)"""
+        return json.loads(_strip_fences(self.text))
+
+
+async def complete_json(llm, messages, fields, label='LLM', mode=None, prompt=None):
+    """
+    Run a JSON-returning prompt and return the parsed dict.
+
+    mode 'off' waits for the full completion. 'background' / 'cut' stream it
+    and return as soon as every name in `fields` is parsed; 'background'
+    keeps reading the reasoning in a separate task and logs it, 'cut' stops
+    the stream. The returned dict only contains 'reasoning' if it arrived
+    before the numbers were complete. Token usage is recorded under
+    `prompt` (a prompt version) once the completion has finished; a cut
+    stream never reports it.
+    """
+    mode = mode or Config.LLM_STREAM_MODE
+    with span('llm.complete', model=_model_id(llm), prompt=prompt, label=label, stream_mode=mode):
+        return await _complete_json(llm, messages, fields, label, mode, prompt)
+
+
+async def _complete_json(llm, messages, fields, label, mode, prompt):
+    breaker = llm_registry.breaker
+    if mode == 'off':
+        response = await breaker.call(llm.ainvoke, messages)
+        llm_registry.record_usage(prompt, response.usage_metadata)
+        return json.loads(_strip_fences(response.content))
+
+    parser = JSONFieldParser(fields)
+    stream = llm.astream(messages)
+    handed_off = False
+    usage = None
+    try:
+        with breaker.guard():
+            async for chunk in stream:
+                parser.feed(_chunk_text(chunk))
+                # Converse reports usage on the final metadata chunk
+                usage = chunk.usage_metadata or usage
+                if parser.complete():
+                    if mode == 'background':
+                        task = asyncio.create_task(_drain(stream, parser, label, prompt))
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_tasks.discard)
+                        handed_off = True
+                    return parser.values()
+
+        # Numbers never showed up in the expected form: parse what we got
+        llm_registry.record_usage(prompt, usage)
+        return parser.parse_full()
+    finally:
+        if not handed_off:
+            await stream.aclose()
+
+
+async def _drain(stream, parser, label, prompt):
+    """Finish reading a completion whose numbers were already used"""
+    usage = None
+    with span('llm.drain', prompt=prompt, label=label):
+        try:
+            async for chunk in stream:
+                parser.feed(_chunk_text(chunk))
+                usage = chunk.usage_metadata or usage
+            llm_registry.record_usage(prompt, usage)
+            print(f"  [{label}] Claude reasoning: {parser.parse_full().get('reasoning', 'N/A')}")
+        except Exception as e:
+            print(f"  [{label}] Reasoning stream failed: {e}")
+        finally:
+            await stream.aclose()
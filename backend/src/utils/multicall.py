@@ -0,0 +1,79 @@
+from eth_utils.abi import get_abi_output_types
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBlockNumber",
+        "outputs": [{"internalType": "uint256", "name": "blockNumber", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getCurrentBlockTimestamp",
+        "outputs": [{"internalType": "uint256", "name": "timestamp", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+        "name": "getEthBalance",
+        "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+
+def encode_calls(calls, allow_failure=True):
+    """Turn bound contract function calls into Multicall3 Call3 tuples"""
+    return [
+        (fn.address, allow_failure, fn._encode_transaction_data())
+        for fn in calls
+    ]
+
+
+def decode_results(codec, calls, results):
+    """
+    Decode aggregate3 results back into the values each call would have
+    returned on its own. Single-output functions are unwrapped, failed
+    sub-calls come back as None.
+    """
+    decoded = []
+    for fn, (success, return_data) in zip(calls, results):
+        if not success or not return_data:
+            decoded.append(None)
+            continue
+
+        values = codec.decode(get_abi_output_types(fn.abi), return_data)
+        decoded.append(values[0] if len(values) == 1 else values)
+
+    return decoded
@@ -0,0 +1,202 @@
+"""
+Per-method JSON-RPC accounting for web3 providers.
+
+RPCMetricsMiddleware sits innermost on a Web3 / AsyncWeb3 onion and
+records, for every provider request, the method, latency and the size of
+the raw request/response bodies the provider encoded and received, tagged
+with the calling route. rpc_metrics.render() exposes it all in Prometheus
+text format at GET /metrics.
+
+The faucet runs this same module (its image copies it in from the backend),
+so it depends on web3 only.
+
+The route tag comes from a context variable: the HTTP middleware sets it
+per request (route template, e.g. "GET /api/loan-status/{user_address}")
+and long-running tasks tag themselves ("indexer", "receipt_watcher", ...);
+anything else is "background".
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from web3.middleware import Web3Middleware
+
+# Seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_route = contextvars.ContextVar('rpc_route', default='background')
+
+
+def tag_route(route):
+    """Tag RPC calls made from the current context (and tasks it spawns) with `route`"""
+    return _current_route.set(route)
+
+
+def reset_route(token):
+    _current_route.reset(token)
+
+
+# [request bytes, response bytes] of the provider request in progress
+_payload_bytes = contextvars.ContextVar('rpc_payload_bytes', default=None)
+
+
+def _measure_payloads(provider):
+    """
+    Wrap the provider's JSON-RPC encode/decode so the raw body lengths are
+    added to the in-progress request's counters (once per provider)
+    """
+    if getattr(provider, '_rpc_metrics_measured', False):
+        return
+    encode, decode = provider.encode_rpc_request, provider.decode_rpc_response
+
+    def encode_rpc_request(method, params):
+        data = encode(method, params)
+        sizes = _payload_bytes.get()
+        if sizes is not None:
+            sizes[0] += len(data)
+        return data
+
+    def decode_rpc_response(raw_response):
+        sizes = _payload_bytes.get()
+        if sizes is not None:
+            sizes[1] += len(raw_response)
+        return decode(raw_response)
+
+    provider.encode_rpc_request = encode_rpc_request
+    provider.decode_rpc_response = decode_rpc_response
+    provider._rpc_metrics_measured = True
+
+
+class RPCMetrics:
+    """Counters and latency histograms keyed by (service, route, method)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, service, route, method, seconds, request_bytes, response_bytes, error):
+        key = (service, route, method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'count': 0,
+                    'errors': 0,
+                    'seconds': 0.0,
+                    'buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'request_bytes': 0,
+                    'response_bytes': 0,
+                }
+            series['count'] += 1
+            series['errors'] += 1 if error else 0
+            series['seconds'] += seconds
+            series['buckets'][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series['request_bytes'] += request_bytes
+            series['response_bytes'] += response_bytes
+
+    def middleware(self, service):
+        """Onion entry for w3.middleware_onion.inject(..., layer=0): fn(w3) -> middleware"""
+        return lambda w3: RPCMetricsMiddleware(w3, self, service)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            series = sorted((key, dict(value, buckets=list(value['buckets']))) for key, value in self._series.items())
+
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(key, **extra):
+            service, route, method = key
+            pairs = dict(service=service, route=route, method=method, **extra)
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs.items()) + '}'
+
+        metric('web3_rpc_requests_total', 'counter', 'JSON-RPC requests by method and calling route')
+        lines += [f"web3_rpc_requests_total{labels(key)} {s['count']}" for key, s in series]
+
+        metric('web3_rpc_errors_total', 'counter', 'JSON-RPC requests that raised or returned an error')
+        lines += [f"web3_rpc_errors_total{labels(key)} {s['errors']}" for key, s in series]
+
+        metric('web3_rpc_duration_seconds', 'histogram', 'JSON-RPC round-trip latency')
+        for key, s in series:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), s['buckets']):
+                cumulative += count
+                lines.append(f"web3_rpc_duration_seconds_bucket{labels(key, le=bound)} {cumulative}")
+            lines.append(f"web3_rpc_duration_seconds_sum{labels(key)} {s['seconds']}")
+            lines.append(f"web3_rpc_duration_seconds_count{labels(key)} {s['count']}")
+
+        metric('web3_rpc_request_bytes_total', 'counter', 'JSON-RPC request payload bytes')
+        lines += [f"web3_rpc_request_bytes_total{labels(key)} {s['request_bytes']}" for key, s in series]
+
+        metric('web3_rpc_response_bytes_total', 'counter', 'JSON-RPC response payload bytes')
+        lines += [f"web3_rpc_response_bytes_total{labels(key)} {s['response_bytes']}" for key, s in series]
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RPCMetricsMiddleware(Web3Middleware):
+    """Times every provider request; inject at layer 0 so it sees the raw payloads"""
+
+    def __init__(self, w3, metrics, service):
+        super().__init__(w3)
+        self.metrics = metrics
+        self.service = service
+        _measure_payloads(w3.provider)
+
+    def _record(self, method, started, sizes, response, error):
+        self.metrics.record(
+            self.service,
+            _current_route.get(),
+            method,
+            time.perf_counter() - started,
+            sizes[0],
+            sizes[1],
+            error or (isinstance(response, dict) and 'error' in response),
+        )
+
+    def wrap_make_request(self, make_request):
+        def middleware(method, params):
+            started = time.perf_counter()
+            sizes = [0, 0]
+            token = _payload_bytes.set(sizes)
+            try:
+                response = make_request(method, params)
+            except Exception:
+                self._record(method, started, sizes, None, True)
+                raise
+            finally:
+                _payload_bytes.reset(token)
+            self._record(method, started, sizes, response, False)
+            return response
+
+        return middleware
+
+    async def async_wrap_make_request(self, make_request):
+        async def middleware(method, params):
+            started = time.perf_counter()
+            sizes = [0, 0]
+            token = _payload_bytes.set(sizes)
+            try:
+                response = await make_request(method, params)
+            except Exception:
+                self._record(method, started, sizes, None, True)
+                raise
+            finally:
+                _payload_bytes.reset(token)
+            self._record(method, started, sizes, response, False)
+            return response
+
+        return middleware
+
+
+# Shared by every web3 instance in the process
+rpc_metrics = RPCMetrics()
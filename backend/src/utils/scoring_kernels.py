@@ -0,0 +1,151 @@
+"""
+Vectorized versions of the agents' rule-based scoring.
+
+Each kernel takes columnar feature arrays (one element per borrower) and
+reproduces the scalar code in TradFiAgent._calculate_score,
+OnChainAgent._calculate_score and RiskAgent._calculate_rule_based exactly:
+same float operation order, same truncation, same ladders. Use these for
+batch re-scoring; the agents keep the scalar versions for single requests.
+"""
+
+import numpy as np
+
+WEI = 10**18
+
+
+def tradfi_scores(fico, on_time, late, missed, checking, savings, utilization_pct):
+    """TradFi score 0-1000 per borrower (TradFiAgent._calculate_score)"""
+    fico = np.asarray(fico, dtype=np.int64)
+    on_time = np.asarray(on_time, dtype=np.int64)
+    total_payments = on_time + np.asarray(late, dtype=np.int64) + np.asarray(missed, dtype=np.int64)
+
+    # Base from FICO (40% weight)
+    fico_component = (fico - 300) / 550 * 400
+
+    # Payment history (30% weight)
+    payment_pct = np.divide(
+        on_time, total_payments,
+        out=np.zeros(len(fico), dtype=np.float64),
+        where=total_payments > 0,
+    )
+    payment_component = payment_pct * 300
+
+    # Banking health (20% weight)
+    # float64 like the scalar sum: balances come back from FDC in cents / 100
+    total_savings = np.asarray(checking, dtype=np.float64) + np.asarray(savings, dtype=np.float64)
+    savings_component = np.minimum(total_savings / 25000, 1) * 200
+
+    # Credit utilization penalty (10% weight)
+    utilization_penalty = np.asarray(utilization_pct, dtype=np.float64) * -1
+
+    score = fico_component + payment_component + savings_component + utilization_penalty
+    return np.trunc(np.clip(score, 0, 1000)).astype(np.int64)
+
+
+def wallet_ages(tx_count):
+    """Estimated wallet age in days (OnChainAgent._estimate_wallet_age)"""
+    tx_count = np.asarray(tx_count, dtype=np.int64)
+    return np.where(tx_count == 0, 0, np.minimum(tx_count * 7, 730))
+
+
+def onchain_scores(tx_count, balance_eth, balance_usd, wallet_age_days, is_active):
+    """
+    On-chain score 0-100 per borrower (OnChainAgent._calculate_score).
+    balance_usd is NaN where no FTSO price was available.
+    """
+    tx_count = np.asarray(tx_count, dtype=np.int64)
+    balance_eth = np.asarray(balance_eth, dtype=np.float64)
+    balance_usd = np.asarray(balance_usd, dtype=np.float64)
+    age = np.asarray(wallet_age_days, dtype=np.int64)
+
+    # Transaction count (30 points max)
+    score = np.select(
+        [tx_count > 100, tx_count > 50, tx_count > 20, tx_count > 10, tx_count > 5],
+        [30, 25, 20, 15, 10],
+        0,
+    )
+
+    # Balance (30 points max) — USD value where available
+    usd_points = np.select(
+        [balance_usd > 500, balance_usd > 200, balance_usd > 50,
+         balance_usd > 20, balance_usd > 5, balance_usd > 0.5],
+        [30, 25, 20, 15, 10, 5],
+        0,
+    )
+    flr_points = np.select(
+        [balance_eth > 100, balance_eth > 50, balance_eth > 10,
+         balance_eth > 5, balance_eth > 1, balance_eth > 0.1],
+        [30, 25, 20, 15, 10, 5],
+        0,
+    )
+    score = score + np.where(np.isnan(balance_usd), flr_points, usd_points)
+
+    # Wallet age (25 points max)
+    score = score + np.select(
+        [age > 365, age > 180, age > 90, age > 30, age > 7],
+        [25, 20, 15, 10, 5],
+        0,
+    )
+
+    # Active user bonus (15 points)
+    score = score + np.where(np.asarray(is_active, dtype=bool), 15, 0)
+
+    return np.minimum(100, score).astype(np.int64)
+
+
+def combined_risk_scores(tradfi, onchain):
+    """Combined risk 0-100, lower = better (60% TradFi, 40% OnChain)"""
+    tradfi_risk = (1000 - np.asarray(tradfi, dtype=np.int64)) / 10
+    onchain_risk = 100 - np.asarray(onchain, dtype=np.int64)
+    return np.trunc(tradfi_risk * 0.6 + onchain_risk * 0.4).astype(np.int64)
+
+
+def max_borrow_tokens(risk):
+    """
+    Max borrow in whole tokens (RiskAgent._max_borrow). Wei amounts overflow
+    int64, so callers convert with int(tokens) * WEI.
+    """
+    risk = np.asarray(risk, dtype=np.int64)
+    return np.select(
+        [risk <= 20, risk <= 40, risk <= 60, risk <= 80],
+        [50000, 25000, 10000, 5000],
+        1000,
+    ).astype(np.int64)
+
+
+def base_aprs(risk):
+    """Base APR in basis points (RiskAgent._calculate_apr)"""
+    return 300 + np.asarray(risk, dtype=np.int64) * 3
+
+
+def aprs(risk, max_tokens, requested_wei=None):
+    """
+    APR in basis points, with the utilization and amount premiums of
+    RiskAgent._calculate_apr_with_amount where a request amount is given.
+
+    Wei amounts don't fit float64/int64 exactly, so borrowers with a
+    non-zero request take the premium path element by element in Python
+    ints, the same arithmetic as the scalar code.
+    """
+    apr = base_aprs(risk)
+    if requested_wei is None:
+        return apr
+
+    apr = apr.copy()
+    for i, requested in enumerate(requested_wei):
+        if not requested:
+            continue
+        max_amount = int(max_tokens[i]) * WEI
+        utilization = min(requested / max_amount, 1.0)
+        utilization_premium = int(utilization * 200)
+
+        amount_in_tokens = requested / WEI
+        if amount_in_tokens > 20000:
+            amount_premium = 50
+        elif amount_in_tokens > 10000:
+            amount_premium = 25
+        else:
+            amount_premium = 0
+
+        apr[i] += utilization_premium + amount_premium
+    return apr
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    The first caller for a key starts the work as its own task; everyone
+    arriving while it runs awaits that same task. With a grace window the
+    finished result is also served to late arrivals for a few seconds
+    (double clicks, frontend retries). Failures are never kept.
+    """
+
+    def __init__(self, grace_seconds=0):
+        self.grace_seconds = grace_seconds
+        self._in_flight = {}   # key -> task
+        self._recent = {}      # key -> (finished_at, result)
+
+        self.calls = 0
+        self.coalesced = 0
+        self.grace_hits = 0
+
+    async def do(self, key, fn):
+        """Return the result of fn() (a coroutine function), shared per key"""
+        self.calls += 1
+
+        recent = self._recent.get(key)
+        if recent is not None:
+            finished_at, result = recent
+            if time.monotonic() - finished_at <= self.grace_seconds:
+                self.grace_hits += 1
+                return result
+            del self._recent[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+
+        # A disconnecting caller must not cancel the run others are waiting on
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self._in_flight.pop(key, None)
+        if self.grace_seconds and not task.cancelled() and task.exception() is None:
+            self._recent[key] = (time.monotonic(), task.result())
+
+        # Drop expired results so the map doesn't grow with every address
+        now = time.monotonic()
+        for stale in [k for k, (t, _) in self._recent.items() if now - t > self.grace_seconds]:
+            del self._recent[stale]
+
+    def stats(self):
+        return {
+            'in_flight': len(self._in_flight),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'grace_hits': self.grace_hits,
+        }
@@ -0,0 +1,78 @@
+"""
+Background writer for the SQLite files the agents append to from the
+event loop (LLM result cache, distillation samples).
+
+execute() only enqueues the statement; a daemon thread drains the queue,
+runs everything pending under the owner's lock and commits once per
+batch, so a put() on the hot path never waits on disk.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+
+
+def connect(db_path):
+    """sqlite3 connection usable from the writer thread, creating the parent directory"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return sqlite3.connect(db_path, check_same_thread=False)
+
+
+class SQLiteWriter:
+    """Queue of (sql, params) applied to `db` by one background thread"""
+
+    def __init__(self, db, lock, name):
+        self.db = db
+        self.lock = lock
+        self.name = name
+        self.written = 0
+        self.failed = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-writer", daemon=True)
+        self._thread.start()
+
+    def execute(self, sql, params=()):
+        self._queue.put((sql, params))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every statement enqueued so far is committed"""
+        self._queue.join()
+
+    def close(self):
+        """Write what is pending and stop the thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            statements = [item for item in batch if item is not None]
+            if statements:
+                with self.lock:
+                    try:
+                        for sql, params in statements:
+                            self.db.execute(sql, params)
+                        self.db.commit()
+                        self.written += len(statements)
+                    except Exception as e:
+                        self.db.rollback()
+                        self.failed += len(statements)
+                        print(f"[{self.name}] SQLite write of {len(statements)} statements failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+
+            if len(statements) < len(batch):
+                return
@@ -0,0 +1,114 @@
+"""
+Declarative stage DAG for the scoring pipeline.
+
+Stages are async functions over one shared state dict, each naming the
+stages it depends on. A run starts every stage as soon as its
+dependencies are done, so independent work (FDC fetch, wallet reads, RNG)
+overlaps without being hand-ordered. The first stage to fail or time out
+cancels everything still running and the run raises StageFailed.
+"""
+
+import asyncio
+import time
+from src.utils.tracing import span
+
+
+class StageFailed(Exception):
+    """A pipeline stage raised or hit its timeout; `cause` is the original error"""
+
+    def __init__(self, stage, cause):
+        self.stage = stage
+        self.cause = cause
+        reason = 'timed out' if isinstance(cause, asyncio.TimeoutError) else str(cause)
+        super().__init__(f"{stage} stage failed: {reason}")
+
+
+class Stage:
+    """fn(state, context) coroutine run once `deps` have finished"""
+
+    def __init__(self, name, fn, deps=(), timeout=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout  # seconds, None = no limit
+
+
+class StageGraph:
+    """A fixed set of stages, reused for every run, with per-stage metrics"""
+
+    def __init__(self, stages):
+        self.stages = []
+        seen = set()
+        # Stages must come after their dependencies, which also rules out cycles
+        for stage in stages:
+            missing = [dep for dep in stage.deps if dep not in seen]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown or later stages: {missing}")
+            seen.add(stage.name)
+            self.stages.append(stage)
+
+        self._metrics = {
+            stage.name: {'runs': 0, 'errors': 0, 'timeouts': 0, 'cancelled': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+            for stage in self.stages
+        }
+
+    async def run(self, state, **context):
+        """Run every stage over `state`; returns state or raises StageFailed"""
+        tasks = {}
+        for stage in self.stages:
+            deps = [tasks[dep] for dep in stage.deps]
+            tasks[stage.name] = asyncio.create_task(self._run_stage(stage, deps, state, context))
+
+        try:
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+            failed = next((task for task in done if task.exception()), None)
+            if failed:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                raise failed.exception()
+        finally:
+            # Also reached when the caller itself is cancelled
+            for task in tasks.values():
+                task.cancel()
+
+        return state
+
+    async def _run_stage(self, stage, deps, state, context):
+        if deps:
+            await asyncio.gather(*deps)
+
+        metrics = self._metrics[stage.name]
+        started = time.perf_counter()
+        try:
+            with span(f"stage.{stage.name}"):
+                await asyncio.wait_for(stage.fn(state, context), stage.timeout)
+        except asyncio.CancelledError:
+            metrics['cancelled'] += 1
+            raise
+        except asyncio.TimeoutError as e:
+            metrics['timeouts'] += 1
+            raise StageFailed(stage.name, e) from e
+        except StageFailed:
+            raise
+        except Exception as e:
+            metrics['errors'] += 1
+            raise StageFailed(stage.name, e) from e
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            metrics['runs'] += 1
+            metrics['total_ms'] += elapsed_ms
+            metrics['max_ms'] = max(metrics['max_ms'], elapsed_ms)
+
+    def stats(self):
+        return {
+            name: {
+                'runs': m['runs'],
+                'errors': m['errors'],
+                'timeouts': m['timeouts'],
+                'cancelled': m['cancelled'],
+                'avg_ms': m['total_ms'] / m['runs'] if m['runs'] else 0.0,
+                'max_ms': m['max_ms'],
+            }
+            for name, m in self._metrics.items()
+        }
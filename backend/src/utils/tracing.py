@@ -0,0 +1,308 @@
+"""
+Lightweight OpenTelemetry-style tracing.
+
+span() opens a span under whatever span is current in this context
+(asyncio tasks and asyncio.to_thread inherit it), so one /process-score
+becomes a tree: HTTP request -> pipeline stages -> agent methods -> RPC
+calls / FDC HTTP requests / LLM invocations. Finished spans go into an
+in-process ring buffer (served at /api/debug/traces) and, when
+TRACE_EXPORT_PATH is set, are appended to that file as OTLP/JSON lines by
+a background thread, one line per batch of spans.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from src.utils.config import Config
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation with attributes"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes',
+                 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = 'ok'
+        self.error = None
+
+    def set_attributes(self, **attributes):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_ns / 1e9,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+    def to_otlp(self):
+        """The span as an OTLP/JSON span object"""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': 2, 'message': self.error} if self.status == 'error' else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class SpanExporter:
+    """
+    Appends finished spans to an OTLP/JSON lines file from a daemon
+    thread: export() only enqueues, and whatever has queued up meanwhile
+    is written as one ExportTraceServiceRequest line.
+    """
+
+    def __init__(self, path, encode):
+        self.path = path
+        self.encode = encode  # encode([span, ...]) -> OTLP request dict
+        self.exported = 0
+        self.failed = False
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, span):
+        if not self.failed:
+            self._queue.put(span)
+
+    def flush(self):
+        """Block until every span exported so far is written"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if not self.failed:
+                try:
+                    with open(self.path, 'a') as f:
+                        f.write(json.dumps(self.encode(batch)) + '\n')
+                    self.exported += len(batch)
+                except OSError as e:
+                    print(f"[Trace] Export to {self.path} failed ({e}), disabling")
+                    self.failed = True
+            for _ in batch:
+                self._queue.task_done()
+
+
+class Tracer:
+    """Span factory plus the ring buffer / file exporter finished spans go to"""
+
+    def __init__(self, buffer_size=None, export_path=None, enabled=None, service_name='flare-credit-agent'):
+        self.enabled = Config.TRACING if enabled is None else enabled
+        self.export_path = export_path if export_path is not None else Config.TRACE_EXPORT_PATH
+        self.service_name = service_name
+        self._spans = deque(maxlen=buffer_size or Config.TRACE_BUFFER_SIZE)
+        self._lock = threading.Lock()
+        self._exporter = SpanExporter(self.export_path, self._otlp_request) if self.export_path else None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Context manager timing `name` as a child of the current span"""
+        if not self.enabled:
+            yield None
+            return
+
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = 'cancelled'
+            raise
+        except Exception as e:
+            span.status = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def traced(self, name=None, attributes=None):
+        """
+        Decorator wrapping every call of a sync or async function in a
+        span. attributes(*args, **kwargs) may return span attributes from
+        the call's arguments.
+        """
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+
+            def attrs(args, kwargs):
+                if attributes is None:
+                    return {}
+                try:
+                    return attributes(*args, **kwargs)
+                except Exception:
+                    return {}
+
+            if asyncio.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(span_name, **attrs(args, kwargs)):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attrs(args, kwargs)):
+                    return fn(*args, **kwargs)
+            return wrapper
+
+        return decorate
+
+    def _finish(self, span):
+        with self._lock:
+            self._spans.append(span)
+        if self._exporter is not None:
+            self._exporter.export(span)
+
+    def _otlp_request(self, spans):
+        """An OTLP ExportTraceServiceRequest (JSON encoding) for `spans`"""
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': [
+                    {'key': 'service.name', 'value': {'stringValue': self.service_name}},
+                ]},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.to_otlp() for span in spans],
+                }],
+            }],
+        }
+
+    def traces(self, limit=20, trace_id=None):
+        """Most recent traces first, each with its spans in start order"""
+        with self._lock:
+            spans = list(self._spans)
+
+        by_trace = {}
+        for span in spans:
+            by_trace.setdefault(span.trace_id, []).append(span)
+
+        if trace_id:
+            selected = [trace_id] if trace_id in by_trace else []
+        else:
+            # Most recently finished span first
+            selected = list(dict.fromkeys(s.trace_id for s in reversed(spans)))[:limit]
+
+        result = []
+        for tid in selected:
+            trace_spans = sorted(by_trace[tid], key=lambda s: s.start_ns)
+            root = next((s for s in trace_spans if s.parent_id is None), trace_spans[0])
+            result.append({
+                'trace_id': tid,
+                'root': root.name,
+                'duration_ms': root.duration_ms,
+                'spans': [s.to_dict() for s in trace_spans],
+            })
+        return result
+
+    def summary(self):
+        """Latency per span name over the buffer, slowest total first"""
+        with self._lock:
+            spans = list(self._spans)
+
+        durations = {}
+        errors = {}
+        for span in spans:
+            durations.setdefault(span.name, []).append(span.duration_ms)
+            if span.status == 'error':
+                errors[span.name] = errors.get(span.name, 0) + 1
+
+        summary = []
+        for name, values in durations.items():
+            values.sort()
+            summary.append({
+                'name': name,
+                'count': len(values),
+                'errors': errors.get(name, 0),
+                'total_ms': sum(values),
+                'avg_ms': sum(values) / len(values),
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max_ms': values[-1],
+            })
+        summary.sort(key=lambda row: row['total_ms'], reverse=True)
+        return summary
+
+
+# Default tracer used across the app
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set_attributes(**attributes)
+
+
+def state_attributes(self, state, *args, **kwargs):
+    """traced() attributes for agent methods taking the pipeline state"""
+    return {'address': state.get('user_address')}
+
+
+def address_attributes(self, user_address, *args, **kwargs):
+    """traced() attributes for service methods taking a user address"""
+    return {'address': user_address}
@@ -0,0 +1,66 @@
+"""BatchScorer oracle writes: per-score vs batched transactions, bounded in flight"""
+
+import asyncio
+from src.services.batch_scorer import BatchScorer
+from src.utils.config import Config
+
+
+class FakeBlockchain:
+    """Records oracle writes and the peak number of them in flight"""
+
+    def __init__(self, fail=()):
+        self.single = []
+        self.batches = []
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def _send(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return {'status': 1, 'transactionHash': bytes(32)}
+
+    async def submit_credit_score(self, user_address, score_data):
+        self.single.append(user_address)
+        receipt = await self._send()
+        if user_address in self.fail:
+            raise RuntimeError('node unreachable')
+        return receipt
+
+    async def submit_credit_scores(self, submissions):
+        self.batches.append([user for user, _ in submissions])
+        return await self._send()
+
+
+def _scores(count):
+    return [{'user_address': f'0x{i:040x}'} for i in range(count)]
+
+
+def test_one_submit_credit_score_per_score_by_default(monkeypatch):
+    monkeypatch.setattr(Config, 'SUBMISSION_MAX_BATCH', 1)
+    monkeypatch.setattr(Config, 'BATCH_SUBMIT_CONCURRENCY', 3)
+    chain = FakeBlockchain(fail={'0x' + '0' * 39 + '2'})
+    scored = _scores(10)
+
+    asyncio.run(BatchScorer(chain, None, None)._submit(scored))
+
+    assert chain.batches == []
+    assert len(chain.single) == 10
+    assert chain.peak == 3
+    assert scored[2]['error'] == 'Submission failed: node unreachable'
+    assert all('tx_hash' in score for i, score in enumerate(scored) if i != 2)
+
+
+def test_submit_credit_scores_when_batching_is_enabled(monkeypatch):
+    monkeypatch.setattr(Config, 'SUBMISSION_MAX_BATCH', 4)
+    monkeypatch.setattr(Config, 'BATCH_SUBMIT_CONCURRENCY', 2)
+    chain = FakeBlockchain()
+    scored = _scores(10)
+
+    asyncio.run(BatchScorer(chain, None, None)._submit(scored))
+
+    assert chain.single == []
+    assert [len(batch) for batch in chain.batches] == [4, 4, 2]
+    assert chain.peak == 2
@@ -0,0 +1,179 @@
+"""CircuitBreaker state machine on a fake clock, and what counts as a transport failure"""
+
+import asyncio
+import types
+import aiohttp
+import pytest
+import requests
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+from web3.exceptions import ProviderConnectionError
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, is_transport_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    # Jitter at its low end, so the earliest allowed probe time is what's tested
+    monkeypatch.setattr(circuit_breaker, 'random', types.SimpleNamespace(uniform=lambda low, high: low))
+    return clock
+
+
+def _breaker():
+    return CircuitBreaker('test', failure_threshold=3, reset_timeout=10, jitter=0.2)
+
+
+def _fail(breaker, times=1):
+    for _ in range(times):
+        breaker.check()
+        breaker.record_failure(ConnectionError('refused'))
+
+
+def test_closed_open_half_open_closed(clock):
+    breaker = _breaker()
+
+    _fail(breaker, 2)
+    assert breaker.state == CLOSED
+    _fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['trips'] == 1
+
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    # Cool-down is reset_timeout * (1 - jitter) at the low end of the jitter
+    clock.advance(7.9)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    clock.advance(0.1)
+    breaker.check()
+    assert breaker.state == HALF_OPEN
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    snapshot = breaker.snapshot()
+    assert snapshot['consecutive_failures'] == 0
+    assert snapshot['rejected'] == 2
+    assert snapshot['failures'] == 3
+
+
+def test_only_consecutive_failures_trip(clock):
+    breaker = _breaker()
+    for _ in range(5):
+        _fail(breaker, 2)
+        breaker.check()
+        breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()['failures'] == 10
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = _breaker()
+    _fail(breaker, 3)
+    clock.advance(10)
+
+    breaker.check()
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    # A failed probe re-opens for another cool-down without counting a new trip
+    breaker.record_failure(TimeoutError())
+    assert breaker.state == OPEN
+    assert breaker.snapshot()['trips'] == 1
+    assert breaker.snapshot()['next_probe_in'] == pytest.approx(8.0)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+
+def test_cancelled_probe_releases_the_slot(clock):
+    breaker = _breaker()
+    _fail(breaker, 3)
+    clock.advance(10)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.Event().wait()
+
+        probe = asyncio.create_task(breaker.call(hang))
+        await started.wait()
+        with pytest.raises(CircuitOpen):
+            breaker.check()
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(scenario())
+
+    assert breaker.state == HALF_OPEN
+    breaker.check()  # the slot is free for the next probe
+
+
+def test_guard_counts_only_transport_errors(clock):
+    breaker = _breaker()
+    _fail(breaker, 2)
+
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError('bad request body')
+    assert breaker.snapshot()['consecutive_failures'] == 0
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            with breaker.guard():
+                raise requests.exceptions.ConnectionError('reset by peer')
+    assert breaker.state == OPEN
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+def _aiohttp_error(status):
+    return aiohttp.ClientResponseError(request_info=None, history=(), status=status)
+
+
+def _client_error(status):
+    return ClientError({'Error': {'Code': 'Throttling'}, 'ResponseMetadata': {'HTTPStatusCode': status}}, 'Converse')
+
+
+@pytest.mark.parametrize('error, transport', [
+    (ConnectionError(), True),
+    (asyncio.TimeoutError(), True),
+    (requests.exceptions.ConnectionError(), True),
+    (requests.exceptions.ReadTimeout(), True),
+    (aiohttp.ClientConnectionError(), True),
+    (EndpointConnectionError(endpoint_url='https://bedrock'), True),
+    (ReadTimeoutError(endpoint_url='https://bedrock'), True),
+    (ProviderConnectionError('down'), True),
+    (_http_error(503), True),
+    (_http_error(429), True),
+    (_http_error(404), False),
+    (_http_error(400), False),
+    (_aiohttp_error(502), True),
+    (_aiohttp_error(422), False),
+    (_client_error(500), True),
+    (_client_error(429), True),
+    (_client_error(400), False),
+    (ValueError('malformed JSON'), False),
+    (KeyError('score'), False),
+])
+def test_is_transport_error(error, transport):
+    assert is_transport_error(error) is transport
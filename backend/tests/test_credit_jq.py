@@ -0,0 +1,229 @@
+"""Local CREDIT_DATA_JQ execution against the verifier's semantics and encoding"""
+
+import copy
+import numpy as np
+import pytest
+from eth_abi import encode as abi_encode
+from src.services.fdc_service import FlareFDCService
+from src.utils.credit_jq import EXACT_FLOAT_LIMIT, compile_transform
+
+TRANSFORM = compile_transform(FlareFDCService.CREDIT_DATA_JQ, FlareFDCService.CREDIT_DATA_ABI_SIGNATURE)
+
+PAYLOAD = {
+    'experian': {
+        'fico_score': 712,
+        'account_age_months': 84,
+        'payment_history_percent': 0.97,
+        'credit_utilization_percent': 0.29,
+        'total_accounts': 9,
+        'derogatory_marks': 0,
+        'total_debt': 18250,
+    },
+    'plaid': {
+        'checking_balance': 4.35,
+        'savings_balance': 12000.5,
+        'avg_monthly_income': 5400.0,
+        'avg_monthly_expenses': 19.99,
+        'overdraft_count_6mo': 1,
+    },
+    'payment_history': {
+        'on_time_payments_12mo': 11,
+        'late_payments_12mo': 1,
+        'missed_payments_12mo': 0,
+        'debt_to_income_ratio': 0.57,
+    },
+}
+
+# What jq produces for PAYLOAD: `x * 100 | floor` in float64, so
+# 0.29 * 100 = 28.999999999999996 floors to 28, not 29
+EXPECTED = {
+    'fico_score': 712,
+    'account_age_months': 84,
+    'payment_history_percent': 97,
+    'credit_utilization_percent': 28,
+    'total_accounts': 9,
+    'derogatory_marks': 0,
+    'total_debt': 18250,
+    'checking_balance': 434,
+    'savings_balance': 1200050,
+    'avg_monthly_income': 540000,
+    'avg_monthly_expenses': 1998,
+    'overdraft_count_6mo': 1,
+    'on_time_payments_12mo': 11,
+    'late_payments_12mo': 1,
+    'missed_payments_12mo': 0,
+    'debt_to_income_ratio': 56,
+}
+
+
+def _with(section, key, value):
+    payload = copy.deepcopy(PAYLOAD)
+    if value is None:
+        del payload[section][key]
+    else:
+        payload[section][key] = value
+    return payload
+
+
+def _abi(flat):
+    """How the verifier encodes the filter's output object"""
+    return abi_encode([TRANSFORM.abi_type], [tuple(flat[name] for name in TRANSFORM.fields)])
+
+
+REJECTED = [
+    _with('experian', 'fico_score', None),         # missing field
+    _with('experian', 'fico_score', '712'),        # not a number
+    _with('experian', 'fico_score', True),         # bool is not a number
+    _with('experian', 'total_debt', 18250.5),      # unscaled field must be an integer
+    _with('plaid', 'checking_balance', -0.01),     # negative after scaling
+    _with('plaid', 'overdraft_count_6mo', -1),     # not a uint256
+]
+
+
+def test_compile_transform_fields_follow_the_abi_signature():
+    assert list(TRANSFORM.fields) == list(EXPECTED)
+    assert TRANSFORM.paths[0] == ('experian', 'fico_score')
+    assert TRANSFORM.scales[:4] == (None, None, 100, 100)
+    assert TRANSFORM.size == 32 * 16
+    assert compile_transform(FlareFDCService.CREDIT_DATA_JQ, FlareFDCService.CREDIT_DATA_ABI_SIGNATURE) is TRANSFORM
+
+
+@pytest.mark.parametrize('jq_filter, signature', [
+    ('.experian', '(uint256 a)'),
+    ('{ a: .x | tostring }', '(uint256 a)'),
+    ('{ a: (.x * 100 | round) }', '(uint256 a)'),
+    ('{ a: .x }', '(int256 a)'),
+    ('{ a: .x }', '(uint256 b)'),
+    ('{ a: .x }', 'uint256 a'),
+])
+def test_compile_transform_rejects_unsupported_filters(jq_filter, signature):
+    with pytest.raises(ValueError):
+        compile_transform(jq_filter, signature)
+
+
+def test_apply_floors_like_jq():
+    assert TRANSFORM.apply_dict(PAYLOAD) == EXPECTED
+    assert TRANSFORM.encode(PAYLOAD) == _abi(EXPECTED)
+
+
+@pytest.mark.parametrize('payload', REJECTED)
+def test_apply_rejects_what_the_verifier_rejects(payload):
+    with pytest.raises(ValueError):
+        TRANSFORM.apply(payload)
+
+
+def test_apply_batch_matches_apply():
+    payloads = [PAYLOAD] + REJECTED + [_with('experian', 'total_debt', 18250.0)]
+    values, valid = TRANSFORM.apply_batch(payloads)
+
+    assert valid.tolist() == [True] + [False] * len(REJECTED) + [True]
+    assert values[0].tolist() == list(EXPECTED.values())
+    assert values[-1].tolist() == list(EXPECTED.values())
+
+
+def test_encode_batch_matches_abi_encoding():
+    other = _with('experian', 'fico_score', 580)
+    values, valid = TRANSFORM.apply_batch([PAYLOAD, other])
+
+    assert valid.all()
+    assert TRANSFORM.encode_batch(values) == [
+        _abi(EXPECTED),
+        _abi(dict(EXPECTED, fico_score=580)),
+    ]
+
+
+def test_big_values_fall_back_to_exact_ints():
+    huge = EXACT_FLOAT_LIMIT + 1  # not representable as float64
+    payload = _with('experian', 'total_debt', huge)
+
+    _, valid = TRANSFORM.apply_batch([payload])
+    assert not valid[0]
+    assert TRANSFORM.apply_dict(payload)['total_debt'] == huge
+
+    assert TRANSFORM.verify_batch([payload], [_abi(dict(EXPECTED, total_debt=huge))]) == [True]
+    assert TRANSFORM.verify_batch([payload], [_abi(dict(EXPECTED, total_debt=huge - 1))]) == [False]
+
+
+def test_verify_batch():
+    good = _abi(EXPECTED)
+    tampered = _abi(dict(EXPECTED, credit_utilization_percent=29))
+    payloads = [PAYLOAD, PAYLOAD, PAYLOAD, PAYLOAD, REJECTED[0], PAYLOAD]
+    bodies = [
+        good,                   # ABI bytes
+        '0x' + good.hex(),      # 0x hex
+        EXPECTED,               # the flat JQ object
+        tampered,               # naive round(0.29 * 100)
+        good,                   # payload the filter rejects never matches
+        '0xzz',                 # undecodable body
+    ]
+
+    assert TRANSFORM.verify_batch(payloads, bodies) == [True, True, True, False, False, False]
+
+
+# -- attested responses back in -------------------------------------------------
+
+OTHER = dict(EXPECTED, fico_score=580, total_debt=0)
+
+
+def _fdc_service():
+    """FlareFDCService with only the local transform (no RPC, no HTTP)"""
+    service = FlareFDCService.__new__(FlareFDCService)
+    service.credit_transform = TRANSFORM
+    return service
+
+
+def test_decode_reads_bytes_and_hex():
+    assert TRANSFORM.decode(_abi(EXPECTED)) == EXPECTED
+    assert TRANSFORM.decode('0x' + _abi(EXPECTED).hex()) == EXPECTED
+    # Full uint256 range, unlike decode_batch
+    assert TRANSFORM.decode(_abi(dict(EXPECTED, total_debt=2**200)))['total_debt'] == 2**200
+    with pytest.raises(ValueError):
+        TRANSFORM.decode(_abi(EXPECTED)[:-32])
+
+
+def test_decode_batch_is_a_view_over_the_buffer():
+    buffer = bytearray(_abi(EXPECTED) + _abi(OTHER))
+    records = TRANSFORM.decode_batch(buffer)
+
+    assert len(records) == 2
+    assert [TRANSFORM.record_dict(record) for record in records] == [EXPECTED, OTHER]
+    assert np.shares_memory(records, np.frombuffer(buffer, dtype=np.uint8))
+
+    # No copy: rewriting the buffer shows through the decoded records
+    buffer[TRANSFORM.size - 1] = 7  # last byte of the first body: debt_to_income_ratio
+    assert records[0]['debt_to_income_ratio'] == 7
+
+
+def test_decode_batch_reads_hex_and_bytes_lists():
+    bodies = ['0x' + _abi(EXPECTED).hex(), _abi(OTHER)]
+    records = TRANSFORM.decode_batch(bodies)
+    assert [TRANSFORM.record_dict(record) for record in records] == [EXPECTED, OTHER]
+    assert len(TRANSFORM.decode_batch([])) == 0
+
+
+def test_decode_batch_rejects_ragged_buffers_and_wide_words():
+    with pytest.raises(ValueError, match='whole number'):
+        TRANSFORM.decode_batch(_abi(EXPECTED) + b'\x00' * 31)
+    with pytest.raises(ValueError, match='64 bits'):
+        TRANSFORM.decode_batch(_abi(EXPECTED) + _abi(dict(OTHER, total_debt=2**64)))
+    # 2**64 - 1 still fits
+    records = TRANSFORM.decode_batch(_abi(dict(OTHER, total_debt=2**64 - 1)))
+    assert int(records[0]['total_debt']) == 2**64 - 1
+
+
+def test_fdc_batch_wrappers_round_trip():
+    service = _fdc_service()
+    payloads = [PAYLOAD, REJECTED[0]]
+
+    encoded = service.encode_credit_data_batch(payloads)
+    assert encoded == [service.encode_credit_data(PAYLOAD), None]
+    assert encoded[0] == '0x' + _abi(EXPECTED).hex()
+
+    records = service.decode_attested_batch([encoded[0]])
+    data = service.credit_data_from_record(records[0])
+    assert data == service._decode_attested_response(encoded[0])
+    assert data['experian']['fico_score'] == 712
+    assert data['experian']['credit_utilization_percent'] == 0.28
+    assert data['plaid']['savings_balance'] == 12000.5
+
+    assert service.verify_attested_batch(payloads, [encoded[0], encoded[0]]) == [True, False]
@@ -0,0 +1,78 @@
+"""Score requests indexed but not finished survive a restart of the indexer"""
+
+import asyncio
+from web3 import Web3
+from src.services.log_indexer import LogIndexer
+from src.services.request_queue import RequestQueue
+
+USER = '0x' + '11' * 20
+OTHER = '0x' + '22' * 20
+
+
+def _indexer(db_path):
+    return LogIndexer(w3=None, contracts=[], event_names=[], db_path=str(db_path))
+
+
+def test_pending_is_committed_with_the_checkpoint(tmp_path):
+    indexer = _indexer(tmp_path / 'indexer.sqlite3')
+    indexer.add_pending(USER, 10)
+    indexer.add_pending(OTHER, 12)
+    indexer._save_checkpoint(12, '0xaa')
+    indexer.close()
+
+    reopened = _indexer(tmp_path / 'indexer.sqlite3')
+    assert reopened._checkpoint() == (12, '0xaa')
+    assert reopened.pending() == [USER, OTHER]
+
+    # The queue reports checksummed addresses
+    reopened.done(Web3.to_checksum_address(USER))
+    reopened.close()
+    assert _indexer(tmp_path / 'indexer.sqlite3').pending() == [OTHER]
+
+
+def test_queue_marks_requests_done_only_once_processed(tmp_path):
+    indexer = _indexer(tmp_path / 'indexer.sqlite3')
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def handler(user_address):
+            await release.wait()
+            if user_address == OTHER:
+                raise RuntimeError('scoring failed')
+
+        queue = RequestQueue(handler, workers=2, max_size=4, on_done=indexer.done)
+        queue.start()
+        for user_address in (USER, OTHER):
+            indexer.add_pending(user_address, 1)
+            await queue.submit(user_address)
+
+        await asyncio.sleep(0)
+        assert indexer.pending() == [USER, OTHER]
+
+        release.set()
+        await queue._queue.join()
+        await asyncio.sleep(0)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    # A failed request is processed too: it is not replayed forever
+    assert indexer.pending() == []
+
+
+def test_stopped_queue_leaves_requests_pending(tmp_path):
+    indexer = _indexer(tmp_path / 'indexer.sqlite3')
+
+    async def scenario():
+        async def handler(user_address):
+            await asyncio.Event().wait()
+
+        queue = RequestQueue(handler, workers=1, max_size=4, on_done=indexer.done)
+        queue.start()
+        indexer.add_pending(USER, 1)
+        await queue.submit(USER)
+        await asyncio.sleep(0)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert indexer.pending() == [USER]
@@ -0,0 +1,86 @@
+"""Bedrock cache points on the agent system prompts, against a stubbed Converse client"""
+
+import asyncio
+import json
+import pytest
+from langchain_aws import ChatBedrockConverse
+from langchain_core.messages import HumanMessage
+from src.agents import prompts
+from src.agents.prompts import Prompt
+from src.services.llm_registry import llm_registry
+from src.utils.config import Config
+from src.utils.llm_json import complete_json
+
+CACHE_POINT = {'cachePoint': {'type': 'default'}}
+
+
+class StubConverseClient:
+    """bedrock-runtime client stand-in: records requests, reports cache usage"""
+
+    def __init__(self, cache_read=0, cache_write=0):
+        self.requests = []
+        self.cache_read = cache_read
+        self.cache_write = cache_write
+
+    def converse(self, **request):
+        self.requests.append(request)
+        return {
+            'output': {'message': {'role': 'assistant', 'content': [{'text': json.dumps({'score': 7})}]}},
+            'stopReason': 'end_turn',
+            'usage': {
+                'inputTokens': 12,
+                'outputTokens': 5,
+                'totalTokens': 17,
+                'cacheReadInputTokens': self.cache_read,
+                'cacheWriteInputTokens': self.cache_write,
+            },
+            'metrics': {'latencyMs': 1},
+        }
+
+
+def _llm(client):
+    return ChatBedrockConverse(
+        model=Config.BEDROCK_MODEL_ID, region_name='us-east-1', client=client, bedrock_client=object()
+    )
+
+
+def _score(llm, prompt):
+    messages = [prompt.system_message(), HumanMessage(content='borrower data')]
+    return asyncio.run(complete_json(llm, messages, ('score',), 'Test', mode='off', prompt=prompt.version))
+
+
+@pytest.mark.parametrize('prompt', [
+    prompts.TRADFI, prompts.ONCHAIN, prompts.RISK, prompts.COMBINED,
+    prompts.TRADFI_BATCH, prompts.ONCHAIN_BATCH, prompts.RISK_BATCH,
+])
+def test_short_agent_prompts_send_no_cache_point(prompt):
+    client = StubConverseClient()
+    assert not prompt.cacheable
+    assert _score(_llm(client), prompt) == {'score': 7}
+    assert client.requests[0]['system'] == [{'text': prompt.text}]
+
+
+def test_long_prompt_is_sent_with_a_cache_point_and_records_cache_usage():
+    prompt = Prompt('test-long', 'Scoring rubric. ' * Config.LLM_PROMPT_CACHE_MIN_TOKENS)
+    assert prompt.cacheable
+
+    write = StubConverseClient(cache_write=1100)
+    _score(_llm(write), prompt)
+    assert write.requests[0]['system'] == [{'text': prompt.text}, CACHE_POINT]
+
+    read = StubConverseClient(cache_read=1100)
+    _score(_llm(read), prompt)
+    assert read.requests[0]['system'] == [{'text': prompt.text}, CACHE_POINT]
+
+    usage = llm_registry.stats()['usage'][prompt.version]
+    assert usage['calls'] == 2
+    assert usage['cache_write_tokens'] == 1100
+    assert usage['cache_read_tokens'] == 1100
+
+
+def test_prompt_cache_can_be_switched_off(monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_PROMPT_CACHE', False)
+    prompt = Prompt('test-off', 'Scoring rubric. ' * Config.LLM_PROMPT_CACHE_MIN_TOKENS)
+    client = StubConverseClient()
+    _score(_llm(client), prompt)
+    assert client.requests[0]['system'] == [{'text': prompt.text}]
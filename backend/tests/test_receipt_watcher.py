@@ -0,0 +1,139 @@
+"""ReceiptWatcher against a fake chain, including reorgs under a pending transaction"""
+
+import asyncio
+from web3.exceptions import TransactionNotFound
+from src.services.receipt_watcher import ReceiptWatcher
+
+TX = '0x' + 'ab' * 32
+
+
+class FakeEth:
+    """Just enough of w3.eth: a head, blocks with tx hashes, and receipts"""
+
+    def __init__(self):
+        self.head = 100
+        self.blocks = {}    # number -> [tx hash]
+        self.receipts = {}  # tx hash -> receipt
+
+    @property
+    async def block_number(self):
+        return self.head
+
+    async def get_block(self, number):
+        return {'number': number, 'transactions': self.blocks.get(number, [])}
+
+    async def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.receipts[tx_hash]
+
+    def mine(self, tx_hash, number, block_hash):
+        self.blocks[number] = [tx_hash]
+        self.receipts[tx_hash] = {'blockNumber': number, 'blockHash': block_hash, 'status': 1}
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+def _watcher(confirmations=3):
+    w3 = FakeWeb3()
+    return w3, ReceiptWatcher(w3, confirmations=confirmations, poll_interval=1, stuck_after=3600)
+
+
+def test_resolves_after_confirmations():
+    async def run():
+        w3, watcher = _watcher()
+        future = watcher.watch(TX)
+        await watcher._poll_once()
+
+        w3.eth.head = 101
+        w3.eth.mine(TX, 101, '0x01')
+        await watcher._poll_once()
+        assert not future.done()
+
+        w3.eth.head = 103
+        await watcher._poll_once()
+        assert future.done()
+        assert future.result()['blockHash'] == '0x01'
+        assert watcher.stats()['pending'] == 0
+
+    asyncio.run(run())
+
+
+def test_reorg_at_the_same_height_follows_the_replacement_block():
+    async def run():
+        w3, watcher = _watcher()
+        future = watcher.watch(TX)
+        await watcher._poll_once()
+
+        w3.eth.head = 101
+        w3.eth.mine(TX, 101, '0xold')
+        await watcher._poll_once()
+
+        # Block 101 is replaced; the transaction is re-mined in the new 101,
+        # which sits below the last scanned block and is never scanned again
+        w3.eth.head = 103
+        w3.eth.mine(TX, 101, '0xnew')
+        await watcher._poll_once()
+        assert not future.done()
+        assert watcher._mined[TX]['blockHash'] == '0xnew'
+
+        await watcher._poll_once()
+        assert future.done()
+        assert future.result()['blockHash'] == '0xnew'
+
+    asyncio.run(run())
+
+
+def test_reorg_to_a_later_block_recounts_confirmations():
+    async def run():
+        w3, watcher = _watcher()
+        future = watcher.watch(TX)
+        await watcher._poll_once()
+
+        w3.eth.head = 101
+        w3.eth.mine(TX, 101, '0xold')
+        await watcher._poll_once()
+
+        w3.eth.head = 103
+        w3.eth.blocks[101] = []
+        w3.eth.mine(TX, 102, '0xnew')
+        await watcher._poll_once()
+        assert not future.done()
+
+        # Only two confirmations on block 102 so far
+        await watcher._poll_once()
+        assert not future.done()
+
+        w3.eth.head = 104
+        await watcher._poll_once()
+        assert future.result()['blockNumber'] == 102
+
+    asyncio.run(run())
+
+
+def test_reorged_back_to_the_mempool_is_found_when_mined_again():
+    async def run():
+        w3, watcher = _watcher()
+        future = watcher.watch(TX)
+        await watcher._poll_once()
+
+        w3.eth.head = 101
+        w3.eth.mine(TX, 101, '0xold')
+        await watcher._poll_once()
+
+        w3.eth.head = 103
+        w3.eth.blocks[101] = []
+        del w3.eth.receipts[TX]
+        await watcher._poll_once()
+        assert TX not in watcher._mined
+
+        w3.eth.head = 106
+        w3.eth.mine(TX, 104, '0xagain')
+        await watcher._poll_once()
+        await watcher._poll_once()
+        assert future.result()['blockHash'] == '0xagain'
+
+    asyncio.run(run())
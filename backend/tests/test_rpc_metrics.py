@@ -0,0 +1,78 @@
+"""RPC byte counts come from the provider's raw JSON-RPC bodies"""
+
+import asyncio
+from web3 import AsyncWeb3, Web3
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.providers.base import JSONBaseProvider
+from src.utils.rpc_metrics import RPCMetrics, reset_route, tag_route
+
+RAW_RESPONSE = b'{"jsonrpc":"2.0","id":0,"result":"0x10"}'
+
+
+class FakeProvider(JSONBaseProvider):
+    """Encodes the request and decodes a canned body, like HTTPProvider minus HTTP"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    def make_request(self, method, params):
+        self.sent.append(self.encode_rpc_request(method, params))
+        return self.decode_rpc_response(RAW_RESPONSE)
+
+    def is_connected(self, show_traceback=False):
+        return True
+
+
+class AsyncFakeProvider(AsyncJSONBaseProvider):
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def make_request(self, method, params):
+        self.sent.append(self.encode_rpc_request(method, params))
+        return self.decode_rpc_response(RAW_RESPONSE)
+
+    async def is_connected(self, show_traceback=False):
+        return True
+
+
+def _series(metrics):
+    return {key: value for key, value in metrics._series.items()}
+
+
+def test_sync_provider_bytes():
+    metrics = RPCMetrics()
+    provider = FakeProvider()
+    w3 = Web3(provider)
+    w3.middleware_onion.inject(metrics.middleware('faucet'), name='rpc_metrics', layer=0)
+
+    token = tag_route('test')
+    try:
+        assert w3.eth.block_number == 16
+    finally:
+        reset_route(token)
+
+    series = _series(metrics)[('faucet', 'test', 'eth_blockNumber')]
+    assert series['count'] == 1
+    assert series['request_bytes'] == len(provider.sent[0])
+    assert series['response_bytes'] == len(RAW_RESPONSE)
+
+
+def test_async_provider_bytes():
+    metrics = RPCMetrics()
+    provider = AsyncFakeProvider()
+    w3 = AsyncWeb3(provider)
+    w3.middleware_onion.inject(metrics.middleware('backend'), name='rpc_metrics', layer=0)
+
+    async def scenario():
+        tag_route('indexer')
+        return await asyncio.gather(w3.eth.block_number, w3.eth.block_number)
+
+    assert asyncio.run(scenario()) == [16, 16]
+
+    series = _series(metrics)[('backend', 'indexer', 'eth_blockNumber')]
+    assert series['count'] == 2
+    assert series['request_bytes'] == sum(len(data) for data in provider.sent)
+    assert series['response_bytes'] == 2 * len(RAW_RESPONSE)
+    assert 'web3_rpc_response_bytes_total{service="backend",route="indexer",method="eth_blockNumber"} ' + str(2 * len(RAW_RESPONSE)) in metrics.render()
@@ -0,0 +1,122 @@
+"""The numpy scoring kernels must match the agents' scalar rule-based code"""
+
+import random
+import numpy as np
+import pytest
+from src.agents.tradfi_agent import TradFiAgent
+from src.agents.onchain_agent import OnChainAgent
+from src.agents.risk_agent import RiskAgent
+from src.utils import scoring_kernels
+
+WEI = 10**18
+
+# Only the pure scoring methods are exercised, so skip __init__ (LLM client)
+tradfi_agent = object.__new__(TradFiAgent)
+onchain_agent = object.__new__(OnChainAgent)
+risk_agent = object.__new__(RiskAgent)
+
+
+def _address(rng):
+    return '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))
+
+
+def _tradfi_states(rng, count=2000):
+    states = []
+    for _ in range(count):
+        data = tradfi_agent._generate_data(_address(rng))
+        states.append({
+            'experian_data': data['experian'],
+            'plaid_data': data['plaid'],
+            'payment_data': data['payment_history'],
+        })
+    # Edges: no payment history, cents balances as FDC returns them, extremes
+    for fico, balances, payments, utilization in [
+        (300, (0, 0), (0, 0, 0), 0.0),
+        (850, (12345.67, 0.01), (12, 0, 0), 100.0),
+        (700, (24999.99, 0.01), (0, 0, 3), 33.33),
+        (300, (0, 0), (0, 5, 5), 99.99),
+        (850, (10**6, 10**6), (0, 0, 0), 0.01),
+    ]:
+        states.append({
+            'experian_data': {'fico_score': fico, 'credit_utilization_percent': utilization},
+            'plaid_data': {'checking_balance': balances[0], 'savings_balance': balances[1]},
+            'payment_data': {
+                'on_time_payments_12mo': payments[0],
+                'late_payments_12mo': payments[1],
+                'missed_payments_12mo': payments[2],
+            },
+        })
+    return states
+
+
+def test_tradfi_scores_match_scalar():
+    states = _tradfi_states(random.Random(1))
+    kernel = scoring_kernels.tradfi_scores(
+        [s['experian_data']['fico_score'] for s in states],
+        [s['payment_data']['on_time_payments_12mo'] for s in states],
+        [s['payment_data']['late_payments_12mo'] for s in states],
+        [s['payment_data']['missed_payments_12mo'] for s in states],
+        [s['plaid_data']['checking_balance'] for s in states],
+        [s['plaid_data']['savings_balance'] for s in states],
+        [s['experian_data']['credit_utilization_percent'] for s in states],
+    )
+    assert kernel.tolist() == [tradfi_agent._calculate_score(s) for s in states]
+
+
+def test_onchain_scores_match_scalar():
+    rng = random.Random(2)
+    states = []
+    for _ in range(3000):
+        tx_count = rng.choice([0, 1, 5, 6, 10, 11, 20, 21, 50, 51, 100, 101, rng.randint(0, 500)])
+        balance = rng.choice([0.0, 0.1, 0.10001, 1.0, 5.0, 10.0, 50.0, 100.0, rng.uniform(0, 300)])
+        state = {
+            'transaction_count': tx_count,
+            'balance_eth': balance,
+            'wallet_age_days': onchain_agent._estimate_wallet_age(None, tx_count),
+            'is_active_user': tx_count > 0,
+        }
+        if rng.random() < 0.5:
+            state['balance_usd'] = balance * rng.choice([0.01, 0.02, 0.5, 5.0])
+        states.append(state)
+
+    kernel = scoring_kernels.onchain_scores(
+        [s['transaction_count'] for s in states],
+        [s['balance_eth'] for s in states],
+        [s.get('balance_usd', float('nan')) for s in states],
+        scoring_kernels.wallet_ages([s['transaction_count'] for s in states]),
+        [s['is_active_user'] for s in states],
+    )
+    assert kernel.tolist() == [onchain_agent._calculate_score(s) for s in states]
+
+
+@pytest.mark.parametrize('with_amount', [False, True])
+def test_risk_terms_match_scalar(with_amount):
+    rng = random.Random(3)
+    states = []
+    for tradfi in range(0, 1001, 7):
+        for onchain in range(0, 101, 9):
+            requested = 0
+            if with_amount:
+                requested = rng.choice([0, 1, 10**17, 15000 * WEI, 20000 * WEI + 1, rng.randint(0, 60000) * WEI])
+            states.append({'tradfi_score': tradfi, 'onchain_score': onchain, 'requested_amount': requested})
+
+    risk = scoring_kernels.combined_risk_scores(
+        [s['tradfi_score'] for s in states], [s['onchain_score'] for s in states]
+    )
+    max_tokens = scoring_kernels.max_borrow_tokens(risk)
+    apr = scoring_kernels.aprs(
+        risk, max_tokens, [s['requested_amount'] for s in states] if with_amount else None
+    )
+
+    for i, state in enumerate(states):
+        risk_agent._calculate_rule_based(state)
+        assert int(risk[i]) == state['combined_risk_score']
+        assert int(max_tokens[i]) * WEI == state['max_borrow_amount']
+        assert int(apr[i]) == state['apr']
+
+
+def test_wallet_ages_match_scalar():
+    counts = list(range(0, 200))
+    assert np.asarray(scoring_kernels.wallet_ages(counts)).tolist() == [
+        onchain_agent._estimate_wallet_age(None, count) for count in counts
+    ]
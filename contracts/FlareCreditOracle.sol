@@ -64,6 +64,19 @@ contract FlareCreditOracle {
         emit CreditScoreSubmitted(user, combinedRiskScore, maxBorrowAmount);
     }
 
+    // Agent submits many scores in one transaction (e.g. draining a request backlog)
+    function submitCreditScores(
+        address[] calldata users,
+        CreditScore[] calldata newScores
+    ) external onlyAgent {
+        require(users.length == newScores.length, "Length mismatch");
+
+        for (uint256 i = 0; i < users.length; i++) {
+            scores[users[i]] = newScores[i];
+            emit CreditScoreSubmitted(users[i], newScores[i].combinedRiskScore, newScores[i].maxBorrowAmount);
+        }
+    }
+
     function getScore(address user) external view returns (
         uint256 tradFiScore,
         uint256 onChainScore,
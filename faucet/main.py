@@ -1,14 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 from web3 import Web3
 from web3.middleware import ExtraDataToPOAMiddleware
 import os
+import sys
 from dotenv import load_dotenv
 
+try:
+    # Copied into the image from backend/src/utils by the Dockerfile
+    from rpc_metrics import rpc_metrics, tag_route
+except ImportError:
+    # Running from a checkout: use the backend's module in place
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "src", "utils"))
+    from rpc_metrics import rpc_metrics, tag_route
+
 load_dotenv()
 
-app = FastAPI(title="FlareCredit Faucet", description="Mint mUSDC test tokens on Coston2")
+
+async def tag_rpc_route(request: Request):
+    """Tag the endpoint's RPC calls with its route template (sync endpoints inherit it)"""
+    route = request.scope.get("route")
+    tag_route(f"{request.method} {getattr(route, 'path', request.url.path)}")
+
+
+app = FastAPI(
+    title="FlareCredit Faucet",
+    description="Mint mUSDC test tokens on Coston2",
+    dependencies=[Depends(tag_rpc_route)],
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +48,7 @@ if not PRIVATE_KEY:
 
 w3 = Web3(Web3.HTTPProvider(RPC_URL))
 w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+w3.middleware_onion.inject(rpc_metrics.middleware("faucet"), name="rpc_metrics", layer=0)
 account = w3.eth.account.from_key(PRIVATE_KEY)
 
 # Minimal ERC-20 ABI with mint
@@ -116,6 +138,12 @@ def get_balance(address: str):
     return {"address": addr, "balance": balance / 10**18}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """JSON-RPC call counts, latency and bytes per method and route (Prometheus text format)."""
+    return PlainTextResponse(rpc_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)